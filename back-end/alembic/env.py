@@ -31,6 +31,7 @@ from src.modules.auth.models import (
 from src.modules.customers.models import Customer
 from src.modules.media.models import MediaFile
 from src.modules.catalog import models
+from src.modules.notifications.models import EmailOutbox
 
 # Đặt target_metadata từ ứng dụng FastAPI (dùng để autogenerate)
 target_metadata = SQLModel.metadata
@@ -0,0 +1,69 @@
+"""Add customer search_name column and pg_trgm indexes for search
+
+Revision ID: 5b2e8f4c1d7a
+Revises: 7651a379fe7c
+Create Date: 2025-10-19 09:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8f4c1d7a'
+down_revision: Union[str, Sequence[str], None] = '7651a379fe7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('customer', sa.Column('search_name', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True))
+    # Chỉ đổi schema; dữ liệu hiện có được điền theo lô sau khi migrate bằng
+    # `python -m src.modules.customers.backfill` (không giữ khóa suốt migration)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Tạo index CONCURRENTLY để không khóa bảng customer khi deploy
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_customer_search_name_trgm', 'customer', ['search_name'],
+            postgresql_using='gin', postgresql_ops={'search_name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+        # Giúp ILIKE '%q%' (chế độ contains) trên full_name/phone_number dùng index
+        op.create_index(
+            'ix_customer_full_name_trgm', 'customer', ['full_name'],
+            postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_customer_phone_number_trgm', 'customer', ['phone_number'],
+            postgresql_using='gin', postgresql_ops={'phone_number': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+        # LIKE '09xx%' chỉ dùng được btree với pattern_ops (collation khác "C")
+        op.create_index(
+            'ix_customer_phone_number_prefix', 'customer', ['phone_number'],
+            postgresql_ops={'phone_number': 'varchar_pattern_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for index_name in (
+                'ix_customer_phone_number_prefix',
+                'ix_customer_phone_number_trgm',
+                'ix_customer_full_name_trgm',
+                'ix_customer_search_name_trgm',
+            ):
+                op.drop_index(index_name, table_name='customer', postgresql_concurrently=True)
+    op.drop_column('customer', 'search_name')
@@ -0,0 +1,109 @@
+"""Store refresh tokens as SHA-256 digests with family and expiry
+
+Revision ID: 2f6d9b1c4e8a
+Revises: 5b2e8f4c1d7a
+Create Date: 2025-10-19 10:00:00.000000
+
+"""
+import hashlib
+import uuid
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+from src.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6d9b1c4e8a'
+down_revision: Union[str, Sequence[str], None] = '5b2e8f4c1d7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+refreshtoken_table = sa.table(
+    'refreshtoken',
+    sa.column('id', sa.Integer),
+    sa.column('token', sa.String),
+    sa.column('token_hash', sa.LargeBinary),
+    sa.column('family_id', sa.String),
+    sa.column('expires_at', sa.DateTime),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _backfill_refresh_tokens() -> None:
+    """Băm token hiện có, mỗi token một family, hạn = created_at + REFRESH_TOKEN_EXPIRE_DAYS."""
+    bind = op.get_bind()
+    lifetime = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(
+                refreshtoken_table.c.id,
+                refreshtoken_table.c.token,
+                refreshtoken_table.c.created_at,
+            )
+            .where(refreshtoken_table.c.id > last_id)
+            .order_by(refreshtoken_table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            refreshtoken_table.update()
+            .where(refreshtoken_table.c.id == sa.bindparam('_id'))
+            .values(
+                token_hash=sa.bindparam('_token_hash'),
+                family_id=sa.bindparam('_family_id'),
+                expires_at=sa.bindparam('_expires_at'),
+            ),
+            [
+                {
+                    '_id': row.id,
+                    '_token_hash': hashlib.sha256(row.token.encode('utf-8')).digest(),
+                    '_family_id': uuid.uuid4().hex,
+                    '_expires_at': row.created_at + lifetime,
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refreshtoken', sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+    op.add_column('refreshtoken', sa.Column('family_id', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=True))
+    op.add_column('refreshtoken', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    _backfill_refresh_tokens()
+
+    op.alter_column('refreshtoken', 'token_hash', nullable=False)
+    op.alter_column('refreshtoken', 'family_id', nullable=False)
+    op.alter_column('refreshtoken', 'expires_at', nullable=False)
+    op.create_index(op.f('ix_refreshtoken_token_hash'), 'refreshtoken', ['token_hash'], unique=True)
+    op.create_index(op.f('ix_refreshtoken_family_id'), 'refreshtoken', ['family_id'], unique=False)
+    op.create_index(op.f('ix_refreshtoken_expires_at'), 'refreshtoken', ['expires_at'], unique=False)
+
+    # Không còn lưu token thô
+    op.drop_index(op.f('ix_refreshtoken_token'), table_name='refreshtoken')
+    op.drop_column('refreshtoken', 'token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Không khôi phục được token thô từ digest: xóa toàn bộ, người dùng đăng nhập lại
+    op.execute(refreshtoken_table.delete())
+    op.add_column('refreshtoken', sa.Column('token', sqlmodel.sql.sqltypes.AutoString(), nullable=False))
+    op.create_index(op.f('ix_refreshtoken_token'), 'refreshtoken', ['token'], unique=True)
+
+    op.drop_index(op.f('ix_refreshtoken_expires_at'), table_name='refreshtoken')
+    op.drop_index(op.f('ix_refreshtoken_family_id'), table_name='refreshtoken')
+    op.drop_index(op.f('ix_refreshtoken_token_hash'), table_name='refreshtoken')
+    op.drop_column('refreshtoken', 'expires_at')
+    op.drop_column('refreshtoken', 'family_id')
+    op.drop_column('refreshtoken', 'token_hash')
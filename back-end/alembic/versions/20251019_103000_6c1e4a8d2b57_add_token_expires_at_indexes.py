@@ -0,0 +1,44 @@
+"""Add expires_at indexes for chunked token cleanup
+
+Revision ID: 6c1e4a8d2b57
+Revises: 2f6d9b1c4e8a
+Create Date: 2025-10-19 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1e4a8d2b57'
+down_revision: Union[str, Sequence[str], None] = '2f6d9b1c4e8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Job dọn dẹp xóa theo lô `expires_at < now() LIMIT n`; tạo CONCURRENTLY để không khóa bảng
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_verificationtoken_expires_at'), 'verificationtoken', ['expires_at'],
+            unique=False, postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_resetpasswordtoken_expires_at'), 'resetpasswordtoken', ['expires_at'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_resetpasswordtoken_expires_at'), table_name='resetpasswordtoken',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f('ix_verificationtoken_expires_at'), table_name='verificationtoken',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,48 @@
+"""Create email outbox table
+
+Revision ID: 9a3f7e2c5d14
+Revises: 6c1e4a8d2b57
+Create Date: 2025-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f7e2c5d14'
+down_revision: Union[str, Sequence[str], None] = '6c1e4a8d2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('emailoutbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('to_email', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('html_body', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('text_body', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(length=1000), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_emailoutbox_status'), 'emailoutbox', ['status'], unique=False)
+    op.create_index(op.f('ix_emailoutbox_next_attempt_at'), 'emailoutbox', ['next_attempt_at'], unique=False)
+    op.create_index(op.f('ix_emailoutbox_sent_at'), 'emailoutbox', ['sent_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_emailoutbox_sent_at'), table_name='emailoutbox')
+    op.drop_index(op.f('ix_emailoutbox_next_attempt_at'), table_name='emailoutbox')
+    op.drop_index(op.f('ix_emailoutbox_status'), table_name='emailoutbox')
+    op.drop_table('emailoutbox')
@@ -0,0 +1,45 @@
+"""Add status to mediafile for direct-to-storage uploads
+
+Revision ID: 3b7d5e9a1c42
+Revises: 9a3f7e2c5d14
+Create Date: 2025-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d5e9a1c42'
+down_revision: Union[str, Sequence[str], None] = '9a3f7e2c5d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ảnh hiện có đều đã tải lên xong: mặc định 'active'
+    op.add_column(
+        'mediafile',
+        sa.Column(
+            'status', sqlmodel.sql.sqltypes.AutoString(length=20),
+            nullable=False, server_default='active',
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_mediafile_status'), 'mediafile', ['status'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_mediafile_status'), table_name='mediafile', postgresql_concurrently=True,
+        )
+    op.drop_column('mediafile', 'status')
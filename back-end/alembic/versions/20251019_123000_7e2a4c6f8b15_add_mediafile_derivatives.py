@@ -0,0 +1,45 @@
+"""Add parent_id/width/height to mediafile for image derivatives
+
+Revision ID: 7e2a4c6f8b15
+Revises: 3b7d5e9a1c42
+Create Date: 2025-10-19 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2a4c6f8b15'
+down_revision: Union[str, Sequence[str], None] = '3b7d5e9a1c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('mediafile', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.add_column('mediafile', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('mediafile', sa.Column('height', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        op.f('fk_mediafile_parent_id_mediafile'), 'mediafile', 'mediafile', ['parent_id'], ['id']
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_mediafile_parent_id'), 'mediafile', ['parent_id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_mediafile_parent_id'), table_name='mediafile', postgresql_concurrently=True,
+        )
+    op.drop_constraint(op.f('fk_mediafile_parent_id_mediafile'), 'mediafile', type_='foreignkey')
+    op.drop_column('mediafile', 'height')
+    op.drop_column('mediafile', 'width')
+    op.drop_column('mediafile', 'parent_id')
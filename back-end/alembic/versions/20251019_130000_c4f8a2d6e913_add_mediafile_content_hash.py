@@ -0,0 +1,56 @@
+"""Add content_hash to mediafile and allow shared file paths
+
+Revision ID: c4f8a2d6e913
+Revises: 7e2a4c6f8b15
+Create Date: 2025-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8a2d6e913'
+down_revision: Union[str, Sequence[str], None] = '7e2a4c6f8b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'mediafile',
+        sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_mediafile_content_hash'), 'mediafile', ['content_hash'],
+            unique=False, postgresql_concurrently=True,
+        )
+        # Lưu theo nội dung: nhiều record có thể cùng trỏ tới một file
+        op.drop_index(
+            op.f('ix_mediafile_file_path'), table_name='mediafile', postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_mediafile_file_path'), 'mediafile', ['file_path'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_mediafile_file_path'), table_name='mediafile', postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_mediafile_file_path'), 'mediafile', ['file_path'],
+            unique=True, postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f('ix_mediafile_content_hash'), table_name='mediafile', postgresql_concurrently=True,
+        )
+    op.drop_column('mediafile', 'content_hash')
@@ -0,0 +1,37 @@
+"""Drop public_url from mediafile (URLs are built from file_path)
+
+Revision ID: 5d9b3f1e7a26
+Revises: c4f8a2d6e913
+Create Date: 2025-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9b3f1e7a26'
+down_revision: Union[str, Sequence[str], None] = 'c4f8a2d6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_column('mediafile', 'public_url')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # URL cũ không khôi phục được; điền chuỗi rỗng cho các dòng hiện có
+    op.add_column(
+        'mediafile',
+        sa.Column(
+            'public_url', sqlmodel.sql.sqltypes.AutoString(length=1000),
+            nullable=False, server_default='',
+        ),
+    )
+    op.alter_column('mediafile', 'public_url', server_default=None)
@@ -0,0 +1,33 @@
+"""Chọn `BCRYPT_ROUNDS` cho máy chủ: cost bcrypt lớn nhất mà một lần hash không
+vượt thời gian mục tiêu.
+
+Cost phải giống nhau trên mọi worker/instance, nên chạy script này một lần trên
+cấu hình máy production rồi đặt kết quả vào biến môi trường `BCRYPT_ROUNDS`.
+Chạy từ thư mục back-end:
+
+    python scripts/benchmark_bcrypt_rounds.py               # mục tiêu 250ms
+    python scripts/benchmark_bcrypt_rounds.py --target-ms 400
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.security import benchmark_bcrypt_rounds  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=int, default=250)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    args = parser.parse_args()
+
+    rounds = benchmark_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Benchmark render email: template f-string cũ + MIMEText dựng từ đầu so với
+template biên dịch sẵn (`email_templates`) + `build_email_message`.
+
+Đo số email/giây cho hai bước: chỉ render nội dung, và render + dựng message
+MIME hoàn chỉnh (serialize như khi gửi SMTP). Chạy từ thư mục back-end:
+
+    python scripts/benchmark_email_templates.py            # 20.000 email
+    python scripts/benchmark_email_templates.py -n 100000
+"""
+
+import argparse
+import secrets
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.email import build_email_message  # noqa: E402
+from src.core.email_templates import render_bulk  # noqa: E402
+
+FRONTEND_URL = "https://spa.example.com"
+
+
+def legacy_verification_template(
+    user_email: str, token: str, frontend_url: str
+) -> str:
+    """Bản trước khi tối ưu (f-string dựng lại toàn bộ HTML mỗi lần), giữ nguyên để so sánh.
+
+    Args:
+        user_email: Email người dùng
+        token: Token xác minh
+        frontend_url: URL frontend để tạo link xác minh
+
+    Returns:
+        HTML content của email
+    """
+    verify_link = f"{frontend_url}/auth/verify-email?token={token}"
+    html_content = f"""
+    <html>
+        <head>
+            <meta charset="UTF-8">
+            <style>
+                body {{
+                    font-family: Arial, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                }}
+                .container {{
+                    max-width: 600px;
+                    margin: 0 auto;
+                    padding: 20px;
+                    background-color: #f5f5f5;
+                }}
+                .content {{
+                    background-color: #ffffff;
+                    padding: 30px;
+                    border-radius: 8px;
+                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                }}
+                .header {{
+                    text-align: center;
+                    margin-bottom: 20px;
+                }}
+                .header h2 {{
+                    color: #2c3e50;
+                    margin: 0;
+                }}
+                .button {{
+                    display: inline-block;
+                    background-color: #3498db;
+                    color: #ffffff;
+                    padding: 12px 30px;
+                    border-radius: 5px;
+                    text-decoration: none;
+                    margin: 20px 0;
+                    font-weight: bold;
+                }}
+                .footer {{
+                    text-align: center;
+                    margin-top: 30px;
+                    padding-top: 20px;
+                    border-top: 1px solid #ddd;
+                    font-size: 12px;
+                    color: #7f8c8d;
+                }}
+                .expiry-notice {{
+                    background-color: #fff3cd;
+                    border-left: 4px solid #ffc107;
+                    padding: 10px;
+                    margin: 15px 0;
+                    border-radius: 3px;
+                    font-size: 14px;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="content">
+                    <div class="header">
+                        <h2>Xác minh Email của Bạn</h2>
+                    </div>
+
+                    <p>Xin chào,</p>
+                    <p>Cảm ơn bạn đã đăng ký tài khoản với chúng tôi.
+                    Để hoàn tất quá trình đăng ký, vui lòng xác minh
+                    địa chỉ email của bạn bằng cách nhấp vào nút dưới đây:</p>
+
+                    <center>
+                        <a href="{verify_link}" class="button">Xác minh Email</a>
+                    </center>
+
+                    <div class="expiry-notice">
+                        <strong>⏱️ Lưu ý:</strong> Link xác minh sẽ hết hạn
+                        sau 24 giờ. Nếu bạn không xác minh trong thời gian này,
+                        vui lòng yêu cầu gửi lại email.
+                    </div>
+
+                    <p>Hoặc sao chép link dưới đây vào trình duyệt:</p>
+                    <p style="word-break: break-all; background-color: #f9f9f9;
+                    padding: 10px; border-radius: 3px; font-size: 12px;">
+                        {verify_link}
+                    </p>
+
+                    <p>Nếu bạn không yêu cầu đăng ký, vui lòng bỏ qua email này.</p>
+
+                    <div class="footer">
+                        <p>© 2025 Spa Online CRM. Tất cả quyền được bảo lưu.</p>
+                        <p>Nếu bạn có thắc mắc, vui lòng liên hệ:
+                        <a href="mailto:support@spa-crm.local">support@spa-crm.local</a></p>
+                    </div>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    return html_content
+
+
+def legacy_build_message(to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+    """Dựng message như `send_email_async` cũ."""
+    message = MIMEMultipart("alternative")
+    message["From"] = "noreply@spa.example.com"
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
+
+def make_recipients(count: int) -> list[tuple[str, str]]:
+    return [(f"customer{i}@example.com", secrets.token_urlsafe(32)) for i in range(count)]
+
+
+def bench_legacy(recipients: list[tuple[str, str]], with_mime: bool) -> float:
+    subject = "Xác minh Email của Bạn - Spa Online CRM"
+    start = time.perf_counter()
+    for email, token in recipients:
+        html_content = legacy_verification_template(email, token, FRONTEND_URL)
+        if with_mime:
+            legacy_build_message(email, subject, html_content).as_bytes()
+    return time.perf_counter() - start
+
+
+def bench_compiled(recipients: list[tuple[str, str]], with_mime: bool) -> float:
+    contexts = (
+        {"link": f"{FRONTEND_URL}/auth/verify-email?token={token}"} for _, token in recipients
+    )
+    start = time.perf_counter()
+    for (email, _), rendered in zip(recipients, render_bulk("verification", contexts)):
+        if with_mime:
+            build_email_message(email, rendered.subject, rendered.html, rendered.text)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=20_000, help="Số email")
+    args = parser.parse_args()
+
+    recipients = make_recipients(args.n)
+    for label, with_mime in (("render", False), ("render + MIME", True)):
+        legacy = bench_legacy(recipients, with_mime)
+        compiled = bench_compiled(recipients, with_mime)
+        print(
+            f"{label:>14}: cũ {args.n / legacy:>10,.0f} email/s | "
+            f"mới {args.n / compiled:>10,.0f} email/s | x{legacy / compiled:.2f}"
+        )
+    print("(bản mới có thêm phần plain-text trong message MIME)")
+
+
+if __name__ == "__main__":
+    main()
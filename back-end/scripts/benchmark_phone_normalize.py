@@ -0,0 +1,77 @@
+"""Micro-benchmark `normalize_phone_number`: bản cũ (re.sub/re.match mỗi lần gọi)
+so với bản hiện tại (regex biên dịch sẵn, fast-path cho số đã chuẩn).
+
+Chạy từ thư mục back-end:
+
+    python scripts/benchmark_phone_normalize.py            # 1.000.000 số
+    python scripts/benchmark_phone_normalize.py -n 200000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.utils import normalize_phone_number  # noqa: E402
+
+
+def legacy_normalize_phone_number(phone: str) -> str:
+    """Bản trước khi tối ưu, giữ nguyên để so sánh."""
+    phone = phone.strip()
+    phone = re.sub(r"\D", "", phone)
+    if phone.startswith("84"):
+        phone = "0" + phone[2:]
+    if phone.startswith("884"):
+        phone = "0" + phone[3:]
+    if not phone.startswith("0") or len(phone) != 10:
+        raise ValueError(f"Số điện thoại không hợp lệ: {phone}")
+    if not re.match(r"^0\d{9}$", phone):
+        raise ValueError(f"Số điện thoại không hợp lệ: {phone}")
+    return phone
+
+
+def make_numbers(count: int, seed: int = 42) -> list[str]:
+    """Sinh dữ liệu giống thực tế: đa số đã chuẩn, phần còn lại có +84/khoảng trắng."""
+    rng = random.Random(seed)
+    formats = ["0{}", "0{}", "0{}", "0{}", "+84{}", "84{}", "+84 {}"]
+    numbers = []
+    for _ in range(count):
+        body = f"{rng.randrange(10**8, 10**9):09d}"
+        fmt = rng.choice(formats)
+        if fmt == "+84 {}":
+            numbers.append(f"+84 {body[:2]} {body[2:5]} {body[5:]}")
+        else:
+            numbers.append(fmt.format(body))
+    return numbers
+
+
+def run(func, numbers: list[str]) -> float:
+    start = time.perf_counter()
+    for number in numbers:
+        func(number)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    numbers = make_numbers(args.count)
+    for number in numbers[:1000]:
+        assert normalize_phone_number(number) == legacy_normalize_phone_number(number)
+
+    legacy = run(legacy_normalize_phone_number, numbers)
+    current = run(normalize_phone_number, numbers)
+    print(f"{args.count:,} số điện thoại")
+    print(f"  legacy : {legacy:.3f}s ({legacy / args.count * 1e9:.0f} ns/số)")
+    print(f"  current: {current:.3f}s ({current / args.count * 1e9:.0f} ns/số)")
+    print(f"  nhanh hơn {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
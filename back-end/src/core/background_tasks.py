@@ -1,64 +1,251 @@
 """Các background tasks định kỳ cho hệ thống.
 
-Chứa các hàm cần chạy định kỳ như xóa token hết hạn, cleanup cache, v.v.
+Chứa các job dọn dẹp (token hết hạn, email outbox đã gửi, upload ảnh bỏ dở, ...) và `scheduler` chạy chúng theo chu kỳ
+trong lifespan của ứng dụng (xem `src/main.py`). Mỗi job:
+- xóa theo lô `CLEANUP_BATCH_SIZE` dòng, mỗi lô một transaction và nghỉ
+  `CLEANUP_BATCH_PAUSE_SECONDS` giữa các lô, để không khóa bảng token lâu;
+- giữ advisory lock (PostgreSQL) trong lúc chạy, nên khi có nhiều worker chỉ một
+  worker thực sự chạy job, các worker còn lại bỏ qua lượt đó;
+- ghi lại số dòng đã xóa và thời gian chạy (xem `scheduler.stats()` trên `/health`).
 """
 
+import asyncio
 import logging
+import random
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from typing import Callable, Optional
 
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
 
-from src.core.db import SessionLocal
+from src.core.config import settings
+from src.core.db import engine
+from src.core.utils import get_utc_now
 from src.modules.auth import crud
+from src.modules.media import service as media_service
+from src.modules.notifications import crud as notifications_crud
 
 
 logger = logging.getLogger(__name__)
 
+# Hàm xóa một lô: (session, batch_size) -> số dòng đã xóa
+DeleteBatch = Callable[[Session, int], int]
 
-def cleanup_expired_tokens():
-	"""Xóa tất cả token xác minh hết hạn.
 
-	Hàm này nên được chạy định kỳ (ví dụ: mỗi giờ, mỗi ngày).
-	Có thể sử dụng APScheduler, Celery, hoặc task scheduler khác.
+# --- Advisory lock ---
+
+def _lock_key(job_name: str) -> int:
+	"""Khóa advisory (bigint) cố định theo tên job."""
+	return zlib.crc32(f"background_tasks:{job_name}".encode("utf-8"))
+
+
+def _try_advisory_lock(job_name: str) -> tuple[bool, Optional[Connection]]:
+	"""Thử lấy advisory lock cho job, không chờ.
+
+	Lock gắn với connection trả về, phải được giải phóng bằng `_release_advisory_lock`.
+	Với DB không phải PostgreSQL (SQLite khi dev) luôn coi như lấy được.
 	"""
-	db: Session = SessionLocal()
+	if engine.dialect.name != "postgresql":
+		return True, None
+
+	conn = engine.connect()
 	try:
-		deleted_count = crud.delete_expired_tokens(db)
-		logger.info(f"Xóa {deleted_count} token xác minh hết hạn")
-		return deleted_count
-	except Exception as e:
-		logger.error(f"Lỗi khi xóa token xác minh hết hạn: {str(e)}")
-		return 0
-	finally:
-		db.close()
+		acquired = conn.execute(
+			text("SELECT pg_try_advisory_lock(:key)"), {"key": _lock_key(job_name)}
+		).scalar()
+		# Không giữ transaction mở suốt thời gian chạy job (lock ở mức session)
+		conn.commit()
+	except Exception:
+		conn.close()
+		raise
 
+	if not acquired:
+		conn.close()
+		return False, None
+	return True, conn
 
-def cleanup_revoked_refresh_tokens():
-	"""Xóa refresh tokens đã bị thu hồi cổ hơn 7 ngày.
 
-	Hàm này nên được chạy định kỳ (ví dụ: hàng tuần).
-	"""
-	db: Session = SessionLocal()
+def _release_advisory_lock(job_name: str, conn: Optional[Connection]) -> None:
+	"""Giải phóng advisory lock và trả connection về pool."""
+	if conn is None:
+		return
 	try:
-		deleted_count = crud.cleanup_old_refresh_tokens(db, days=7)
-		logger.info(f"Xóa {deleted_count} refresh tokens đã bị thu hồi")
-		return deleted_count
+		conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _lock_key(job_name)})
+		conn.commit()
 	except Exception as e:
-		logger.error(f"Lỗi khi xóa refresh tokens: {str(e)}")
-		return 0
+		# Không trả connection còn giữ lock về pool
+		logger.error(f"✗ Không giải phóng được advisory lock của job {job_name}: {e}")
+		conn.invalidate()
 	finally:
-		db.close()
+		conn.close()
+
+
+def _delete_batch(delete_batch: DeleteBatch, batch_size: int) -> int:
+	"""Chạy một lô xóa trong session riêng (một transaction)."""
+	with Session(engine) as db:
+		return delete_batch(db, batch_size)
+
+
+# --- Scheduler ---
+
+@dataclass
+class JobStats:
+	"""Số liệu của một job."""
+	runs: int = 0
+	skipped: int = 0
+	failures: int = 0
+	total_deleted: int = 0
+	last_deleted: int = 0
+	last_duration_ms: float = 0.0
+	last_started_at: Optional[datetime] = None
+	last_error: Optional[str] = None
+
+
+@dataclass
+class Job:
+	"""Một job dọn dẹp: chạy lần lượt từng hàm xóa theo lô cho tới khi hết dữ liệu."""
+	name: str
+	batches: list[DeleteBatch]
+	interval_seconds: float
+	stats: JobStats = field(default_factory=JobStats)
+
+
+class CleanupScheduler:
+	"""Scheduler async in-process chạy các job dọn dẹp theo chu kỳ.
+
+	Attributes:
+		batch_size: Số dòng tối đa mỗi lô (mỗi transaction)
+		batch_pause: Thời gian nghỉ (giây) giữa hai lô liên tiếp
+	"""
 
+	def __init__(self, batch_size: int, batch_pause: float):
+		self.batch_size = batch_size
+		self.batch_pause = batch_pause
+		self._jobs: dict[str, Job] = {}
+		self._tasks: list[asyncio.Task] = []
 
-def run_all_cleanup_tasks():
-	"""Chạy tất cả background cleanup tasks."""
+	def add_job(self, name: str, batches: list[DeleteBatch], interval_seconds: float) -> None:
+		"""Đăng ký job (gọi trước `start`)."""
+		self._jobs[name] = Job(name=name, batches=batches, interval_seconds=interval_seconds)
+
+	async def run_job(self, name: str) -> int:
+		"""Chạy job ngay (nếu lấy được lock); trả về tổng số dòng đã xóa."""
+		job = self._jobs[name]
+		acquired, lock_conn = await run_in_threadpool(_try_advisory_lock, name)
+		if not acquired:
+			job.stats.skipped += 1
+			logger.info(f"Bỏ qua job {name}: worker khác đang chạy")
+			return 0
+
+		job.stats.runs += 1
+		job.stats.last_started_at = get_utc_now()
+		started = time.perf_counter()
+		deleted = 0
+		try:
+			for delete_batch in job.batches:
+				while True:
+					count = await run_in_threadpool(_delete_batch, delete_batch, self.batch_size)
+					deleted += count
+					if count < self.batch_size:
+						break
+					await asyncio.sleep(self.batch_pause)
+			job.stats.last_error = None
+		except Exception as e:
+			job.stats.failures += 1
+			job.stats.last_error = str(e)
+			logger.error(f"✗ Job {name} lỗi sau khi xóa {deleted} dòng: {e}")
+		finally:
+			await run_in_threadpool(_release_advisory_lock, name, lock_conn)
+			duration_ms = (time.perf_counter() - started) * 1000
+			job.stats.last_duration_ms = round(duration_ms, 1)
+			job.stats.last_deleted = deleted
+			job.stats.total_deleted += deleted
+
+		logger.info(f"✓ Job {name}: xóa {deleted} dòng trong {duration_ms:.0f}ms")
+		return deleted
+
+	async def run_all(self) -> dict[str, int]:
+		"""Chạy ngay lần lượt mọi job; trả về số dòng đã xóa theo từng job."""
+		return {name: await self.run_job(name) for name in self._jobs}
+
+	async def _loop(self, job: Job) -> None:
+		# Lệch pha ngẫu nhiên để các worker không cùng tranh lock một lúc
+		await asyncio.sleep(random.uniform(0, min(job.interval_seconds, 60)))
+		while True:
+			await self.run_job(job.name)
+			await asyncio.sleep(job.interval_seconds)
+
+	def start(self) -> None:
+		"""Khởi động vòng lặp của mọi job (gọi trong event loop của ứng dụng)."""
+		if self._tasks:
+			return
+		for job in self._jobs.values():
+			self._tasks.append(asyncio.create_task(self._loop(job), name=f"cleanup:{job.name}"))
+		logger.info(f"✓ Đã khởi động {len(self._tasks)} background job")
+
+	async def stop(self) -> None:
+		"""Dừng mọi job (job đang chạy dở sẽ giải phóng lock trước khi dừng)."""
+		for task in self._tasks:
+			task.cancel()
+		await asyncio.gather(*self._tasks, return_exceptions=True)
+		self._tasks = []
+
+	def stats(self) -> dict:
+		"""Số liệu các job (dùng cho health/metrics)."""
+		return {name: asdict(job.stats) for name, job in self._jobs.items()}
+
+
+scheduler = CleanupScheduler(
+	batch_size=settings.CLEANUP_BATCH_SIZE,
+	batch_pause=settings.CLEANUP_BATCH_PAUSE_SECONDS,
+)
+scheduler.add_job(
+	"expired_tokens",
+	[crud.delete_expired_verification_tokens, crud.delete_expired_reset_tokens],
+	interval_seconds=settings.CLEANUP_EXPIRED_TOKENS_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+	"refresh_tokens",
+	[crud.delete_expired_refresh_tokens],
+	interval_seconds=settings.CLEANUP_REFRESH_TOKENS_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+	"email_outbox",
+	[
+		lambda db, batch_size: notifications_crud.delete_sent_emails(
+			db, batch_size, older_than_days=settings.EMAIL_OUTBOX_RETENTION_DAYS
+		)
+	],
+	interval_seconds=settings.CLEANUP_EMAIL_OUTBOX_INTERVAL_SECONDS,
+)
+scheduler.add_job(
+	"pending_media",
+	[media_service.delete_stale_pending_uploads],
+	interval_seconds=settings.CLEANUP_PENDING_MEDIA_INTERVAL_SECONDS,
+)
+
+
+async def cleanup_expired_tokens() -> int:
+	"""Xóa tất cả token xác minh email/đặt lại mật khẩu hết hạn."""
+	return await scheduler.run_job("expired_tokens")
+
+
+async def cleanup_revoked_refresh_tokens() -> int:
+	"""Xóa refresh token đã hết hạn (kể cả đã bị thu hồi)."""
+	return await scheduler.run_job("refresh_tokens")
+
+
+async def run_all_cleanup_tasks() -> dict[str, int]:
+	"""Chạy ngay mọi job dọn dẹp đã đăng ký; trả về số dòng đã xóa theo từng job."""
 	logger.info("Bắt đầu chạy cleanup tasks...")
-	
-	verify_deleted = cleanup_expired_tokens()
-	refresh_deleted = cleanup_revoked_refresh_tokens()
-	
-	logger.info(f"Cleanup tasks hoàn thành. Xóa: {verify_deleted} verify tokens, {refresh_deleted} refresh tokens")
-	return {
-		"verification_tokens_deleted": verify_deleted,
-		"refresh_tokens_deleted": refresh_deleted,
-	}
+
+	results = await scheduler.run_all()
+
+	summary = ", ".join(f"{name}={deleted}" for name, deleted in results.items())
+	logger.info(f"Cleanup tasks hoàn thành. Xóa: {summary}")
+	return results
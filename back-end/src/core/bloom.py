@@ -0,0 +1,64 @@
+"""Bloom filter in-memory dùng để loại nhanh các truy vấn chắc chắn không có kết quả.
+
+`might_contain` trả về False nghĩa là phần tử CHẮC CHẮN chưa được thêm; True
+nghĩa là "có thể có" (xác suất dương tính giả ≈ `error_rate` khi số phần tử
+không vượt `capacity`). Không hỗ trợ xóa phần tử.
+"""
+
+import hashlib
+import math
+import threading
+from typing import Iterable
+
+
+class BloomFilter:
+    """Bloom filter dùng double hashing trên một digest BLAKE2b 128-bit.
+
+    Attributes:
+        capacity: Số phần tử dự kiến
+        error_rate: Xác suất dương tính giả mong muốn
+        size: Số bit của filter
+        hash_count: Số hàm băm (k)
+        count: Số lần `add` (xấp xỉ số phần tử)
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0:
+            raise ValueError("capacity phải lớn hơn 0")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate phải nằm trong khoảng (0, 1)")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        """Thêm một phần tử."""
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def update(self, items: Iterable[str]) -> None:
+        """Thêm nhiều phần tử."""
+        for item in items:
+            self.add(item)
+
+    def might_contain(self, item: str) -> bool:
+        """False nếu phần tử chắc chắn chưa được thêm."""
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __contains__(self, item: str) -> bool:
+        return self.might_contain(item)
@@ -0,0 +1,110 @@
+"""Cache in-process (TTL + LRU) dùng chung cho các endpoint đọc nhiều.
+
+Mỗi key là một tuple với phần tử đầu tiên là namespace (ví dụ: "product"),
+cho phép vô hiệu hóa theo nhóm. Mỗi namespace có một version counter, tăng mỗi
+khi bị invalidate, để tránh ghi đè cache bằng dữ liệu cũ khi có ghi đồng thời.
+`invalidate_all` tăng một generation chung, có tác dụng như invalidate mọi
+namespace cùng lúc.
+
+Lưu ý: cache nằm trong bộ nhớ của từng worker. Invalidate chỉ có hiệu lực trên
+worker thực hiện ghi; các worker khác dựa vào TTL để làm mới.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Cache có giới hạn số phần tử (LRU) và thời gian sống (TTL).
+
+    Attributes:
+        maxsize: Số phần tử tối đa, vượt quá sẽ loại phần tử ít dùng nhất
+        ttl: Thời gian sống của mỗi phần tử (giây)
+        hits: Số lần đọc trúng cache
+        misses: Số lần đọc trượt cache
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[Hashable, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, default: Any = None) -> Any:
+        """Lấy giá trị theo key; trả về `default` nếu không có hoặc đã hết hạn."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: Any, version: Optional[tuple[int, int]] = None) -> None:
+        """Lưu giá trị vào cache.
+
+        Args:
+            key: Tuple key, phần tử đầu là namespace
+            value: Giá trị cần lưu
+            version: Version của namespace tại thời điểm bắt đầu đọc DB. Nếu
+                namespace đã bị invalidate từ đó, giá trị sẽ không được lưu.
+        """
+        with self._lock:
+            if version is not None and version != self.version(key[0]):
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def version(self, namespace: Hashable) -> tuple[int, int]:
+        """Version hiện tại của namespace (gồm generation chung của cache)."""
+        return self._generation, self._versions.get(namespace, 0)
+
+    def invalidate(self, *namespaces: Hashable) -> None:
+        """Xóa mọi key thuộc các namespace và tăng version của chúng."""
+        stale_namespaces = set(namespaces)
+        with self._lock:
+            for namespace in stale_namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            stale_keys = [key for key in self._data if key[0] in stale_namespaces]
+            for key in stale_keys:
+                del self._data[key]
+
+    def invalidate_all(self) -> None:
+        """Xóa mọi key và tăng generation (vô hiệu hóa mọi version đang đọc dở)."""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def clear(self) -> None:
+        """Xóa toàn bộ cache và thống kê (không reset version)."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Thống kê hit/miss và kích thước hiện tại."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
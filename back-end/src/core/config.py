@@ -6,14 +6,59 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # URL async (asyncpg/aiosqlite); nếu bỏ trống sẽ suy ra từ DATABASE_URL
+    ASYNC_DATABASE_URL: str | None = None
+
+    # Connection pool settings (áp dụng cho cả engine sync và async)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # giây chờ lấy connection từ pool
+    DB_POOL_RECYCLE: int = 1800  # giây, tránh connection bị server đóng ngầm
+    DB_POOL_PRE_PING: bool = True
+
+    # Read replicas cho truy vấn chỉ đọc (catalog, tìm kiếm khách hàng)
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_EJECT_SECONDS: int = 30  # thời gian loại replica lỗi khỏi vòng quay
 
     # JWT settings
     SECRET_KEY: str
-    ALGORITHM: str
+    ALGORITHM: str  # HS256 (SECRET_KEY) hoặc RS256/EdDSA (key ring)
+    # Key ring cho RS256/EdDSA: thư mục chứa <kid>.pem, xoay bằng `python -m src.core.jwt_keys rotate`
+    JWT_KEYS_DIR: str | None = None
+    JWT_KEY_ROTATION_DAYS: int = 30
+    # Khóa mới được công bố trên JWKS trước khi dùng để ký (nên > JWT_JWKS_MAX_AGE)
+    JWT_KEY_ACTIVATION_DELAY_SECONDS: int = 3600
+    JWT_KEY_RELOAD_SECONDS: int = 60
+    JWT_JWKS_MAX_AGE: int = 300
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     REFRESH_TOKEN_COOKIE_NAME: str = "refresh_token"
 
+    # Cache principal (user + roles) theo user_id, mỗi worker một cache
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+    # True: endpoint chỉ đọc tin hoàn toàn vào claims đã ký, không kiểm tra DB
+    # (user bị khóa/đổi role vẫn dùng được token cũ tới khi hết hạn)
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+
+    # Password hashing (bcrypt chạy trên process pool riêng)
+    PASSWORD_HASH_WORKERS: int = 2  # 0: chạy trên threadpool thay vì process pool
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 100
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt" | "argon2id" (cần argon2-cffi)
+    # Cost bcrypt dùng chung cho mọi worker (chọn bằng scripts/benchmark_bcrypt_rounds.py)
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 1
+
+    # Background jobs dọn dẹp (scheduler chạy trong lifespan của ứng dụng)
+    CLEANUP_JOBS_ENABLED: bool = True
+    CLEANUP_EXPIRED_TOKENS_INTERVAL_SECONDS: int = 3600
+    CLEANUP_REFRESH_TOKENS_INTERVAL_SECONDS: int = 6 * 3600
+    CLEANUP_BATCH_SIZE: int = 5000  # số dòng xóa mỗi transaction
+    CLEANUP_BATCH_PAUSE_SECONDS: float = 0.2
+
     # Token expiry settings
     VERIFICATION_TOKEN_EXPIRE_HOURS: int = 24
     RESET_TOKEN_EXPIRE_HOURS: int = 1
@@ -27,6 +72,24 @@ class Settings(BaseSettings):
     MAIL_STARTTLS: bool
     MAIL_SSL_TLS: bool
 
+    EMAIL_DEFAULT_LOCALE: str = "vi"  # locale template email khi không chỉ định
+
+    # Email outbox: gửi nền qua pool kết nối SMTP giữ mở
+    EMAIL_OUTBOX_ENABLED: bool = True
+    EMAIL_SENDER_CONNECTIONS: int = 2
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 120  # email đã nhận nhưng chưa xong sẽ được gửi lại sau
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7  # giữ email đã gửi trước khi dọn
+    CLEANUP_EMAIL_OUTBOX_INTERVAL_SECONDS: int = 3600  # Chu kỳ dọn email đã gửi
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_SECONDS: int = 30  # backoff: base * 2^(lần thử - 1), tối đa MAX
+    EMAIL_RETRY_MAX_SECONDS: int = 3600
+    EMAIL_DOMAIN_RATE_PER_MINUTE: int = 60  # mỗi worker; 0: không giới hạn
+    EMAIL_DOMAIN_RATE_LIMITS: dict[str, int] = {}  # ghi đè theo domain, vd {"gmail.com": 120}
+    EMAIL_SMTP_TIMEOUT_SECONDS: int = 30
+    EMAIL_SMTP_IDLE_SECONDS: int = 30  # kiểm tra NOOP nếu kết nối nhàn rỗi lâu hơn
+
     # Google OAuth settings
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
@@ -38,8 +101,36 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_BUCKET_NAME: str
+    SUPABASE_JWT_SECRET: str | None = None  # Ký URL có hạn cục bộ (bucket private, không CDN)
+
+    # Storage backend: "supabase" hoặc "local" (thư mục trên đĩa, dùng khi dev/test)
+    STORAGE_BACKEND: str = "supabase"
+    MEDIA_LOCAL_DIR: str = "media"
+    STORAGE_HTTP_TIMEOUT_SECONDS: float = 30.0
+    # Pool kết nối HTTP tới Supabase Storage (giữ kết nối keep-alive giữa các request)
+    STORAGE_HTTP_MAX_CONNECTIONS: int = 20
+    STORAGE_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    STORAGE_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    # Supabase resumable upload yêu cầu mọi khối (trừ khối cuối) đúng 6MB
+    SUPABASE_UPLOAD_CHUNK_SIZE: int = 6 * 1024 * 1024
+
+    # URL ảnh: DB chỉ lưu đường dẫn, URL được dựng lại mỗi khi trả về
+    MEDIA_CDN_BASE_URL: str | None = None  # Ví dụ https://cdn.example.com (trỏ tới gốc bucket)
+    MEDIA_SIGNED_URLS: bool = False  # True: bucket private, trả URL ký có hạn
+    MEDIA_SIGNED_URL_EXPIRE_SECONDS: int = 3600
+    MEDIA_URL_SIGNING_KEY: str | None = None  # Khóa HMAC dùng chung với CDN (mặc định SECRET_KEY)
 
     # Media settings
+    MEDIA_UPLOAD_URL_EXPIRE_SECONDS: int = 900  # Hạn của URL tải lên trực tiếp
+    MEDIA_UPLOAD_CHUNK_SIZE: int = 256 * 1024  # Kích thước chunk khi đọc/gửi file
+    CLEANUP_PENDING_MEDIA_INTERVAL_SECONDS: int = 3600  # Chu kỳ dọn upload bỏ dở
+
+    # Ảnh phái sinh (thumbnail) tạo sau khi tải lên, chạy trên process pool riêng
+    MEDIA_DERIVATIVES_ENABLED: bool = True
+    MEDIA_DERIVATIVE_WIDTHS: list[int] = [64, 256, 1024]
+    MEDIA_DERIVATIVE_FORMATS: list[str] = ["avif", "webp"]  # avif | webp | jpeg
+    MEDIA_DERIVATIVE_QUALITY: int = 75
+    MEDIA_DERIVATIVE_WORKERS: int = 2
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
     ALLOWED_IMAGE_TYPES: set[str] = {
         "image/jpeg",
@@ -49,6 +140,23 @@ class Settings(BaseSettings):
         "image/bmp",
     }
 
+    # Catalog cache settings (in-process, mỗi worker một cache)
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    CATALOG_CACHE_MAX_ENTRIES: int = 1024
+    CATALOG_HTTP_MAX_AGE: int = 60  # Cache-Control max-age cho GET catalog (giây)
+    # Sau một lần ghi, kết quả đọc từ replica trong khoảng này không được lưu cache
+    CATALOG_REPLICA_LAG_SECONDS: float = 5.0
+
+    # Bloom filter SĐT khách hàng (bỏ qua truy vấn DB khi SĐT chắc chắn chưa có)
+    PHONE_BLOOM_ENABLED: bool = True
+    PHONE_BLOOM_CAPACITY: int = 1_000_000
+    PHONE_BLOOM_ERROR_RATE: float = 0.001
+
+    # Import khách hàng hàng loạt (CSV/XLSX)
+    CUSTOMER_IMPORT_BATCH_SIZE: int = 2000  # Số dòng mỗi lô (chuẩn hóa, khử trùng, INSERT)
+    CUSTOMER_IMPORT_MAX_ERRORS: int = 1000  # Số lỗi tối đa trả về trong báo cáo
+    CUSTOMER_EXPORT_BATCH_SIZE: int = 2000  # Số dòng mỗi lần fetch khi xuất (yield_per)
+
     FRONTEND_URL: str = "http://localhost:3000"
     BACKEND_URL: str = "http://localhost:8000"
 
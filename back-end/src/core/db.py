@@ -1,18 +1,143 @@
-"""Cấu hình database (placeholder).
+"""Cấu hình database.
 
-File này chỉ tạo engine, session factory và xuất `metadata` để
-Alembic có thể import và autogenerate migrations.
+File này tạo engine (sync và async), session factory, định tuyến truy vấn chỉ
+đọc sang read replica và xuất `metadata` để Alembic có thể import và
+autogenerate migrations.
 Không chứa logic nghiệp vụ.
 """
 
-import os
-from sqlmodel import SQLModel, create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import AsyncGenerator, Optional
+
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
 from src.core.config import settings
 
-# Đọc DATABASE_URL từ biến môi trường. Nếu không có, dùng SQLite file dev.
+logger = logging.getLogger(__name__)
+
+# Đọc DATABASE_URL từ biến môi trường.
 DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+
+# Driver async tương ứng cho từng backend
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_pool_options(url: str) -> dict:
+    """Trả về các tham số connection pool cho engine theo cấu hình.
+
+    SQLite dùng pool riêng (SingletonThreadPool/NullPool) nên bỏ qua các tham số
+    pool_size, max_overflow.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def to_async_url(url: str) -> str:
+    """Chuyển một database URL sync sang driver async tương ứng.
+
+    - postgresql://, postgresql+psycopg2:// → postgresql+asyncpg://
+    - sqlite:// → sqlite+aiosqlite://
+
+    Raises:
+        ValueError: Nếu backend không hỗ trợ async
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"Không hỗ trợ async cho database backend: {backend}")
+    parsed = parsed.set(drivername=_ASYNC_DRIVERS[backend])
+    return parsed.render_as_string(hide_password=False)
+
+
+engine = create_engine(
+    DATABASE_URL, echo=False, future=True, **get_pool_options(DATABASE_URL)
+)
+
+# Engine async được khởi tạo lười (lazy) để app vẫn chạy khi chưa cài driver async
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+class ReplicaSet:
+    """Quản lý các read replica: chọn theo round-robin và loại tạm thời replica lỗi.
+
+    Engine của từng replica được tạo lười khi lần đầu được chọn. Replica không
+    kết nối được sẽ bị loại khỏi vòng quay trong `eject_seconds` giây.
+    """
+
+    def __init__(self, urls: list[str], eject_seconds: int):
+        self.urls = list(urls)
+        self.eject_seconds = eject_seconds
+        self._engines: dict[str, Engine] = {}
+        self._async_engines: dict[str, AsyncEngine] = {}
+        self._ejected_until: dict[str, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def candidates(self) -> list[str]:
+        """Danh sách replica đang khỏe, bắt đầu từ replica kế tiếp trong vòng quay."""
+        if not self.urls:
+            return []
+        start = next(self._counter) % len(self.urls)
+        ordered = self.urls[start:] + self.urls[:start]
+        now = time.monotonic()
+        return [url for url in ordered if self._ejected_until.get(url, 0.0) <= now]
+
+    def eject(self, url: str) -> None:
+        """Loại replica khỏi vòng quay sau khi không kết nối được."""
+        self._ejected_until[url] = time.monotonic() + self.eject_seconds
+        logger.warning(
+            f"✗ Replica không khả dụng, tạm loại {self.eject_seconds}s: "
+            f"{make_url(url).render_as_string(hide_password=True)}"
+        )
+
+    def get_engine(self, url: str) -> Engine:
+        """Lấy (hoặc tạo) engine sync cho replica."""
+        with self._lock:
+            if url not in self._engines:
+                self._engines[url] = create_engine(
+                    url, echo=False, future=True, **get_pool_options(url)
+                )
+            return self._engines[url]
+
+    def get_async_engine(self, url: str) -> AsyncEngine:
+        """Lấy (hoặc tạo) engine async cho replica."""
+        with self._lock:
+            if url not in self._async_engines:
+                async_url = to_async_url(url)
+                self._async_engines[url] = create_async_engine(
+                    async_url, echo=False, **get_pool_options(async_url)
+                )
+            return self._async_engines[url]
+
+    async def dispose(self) -> None:
+        """Đóng connection pool của tất cả replica."""
+        for replica_engine in self._engines.values():
+            replica_engine.dispose()
+        for replica_engine in self._async_engines.values():
+            await replica_engine.dispose()
+        self._engines.clear()
+        self._async_engines.clear()
+
+
+replica_set = ReplicaSet(settings.DATABASE_REPLICA_URLS, settings.DB_REPLICA_EJECT_SECONDS)
 
 
 # Metadata dùng bởi Alembic autogenerate
@@ -29,3 +154,85 @@ def get_session():
             yield session
         finally:
             session.close()
+
+
+def get_async_engine() -> AsyncEngine:
+    """Khởi tạo và trả về AsyncEngine (singleton)."""
+    global _async_engine, _async_session_factory
+
+    if _async_engine is None:
+        url = settings.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+        _async_engine = create_async_engine(url, echo=False, **get_pool_options(url))
+        _async_session_factory = async_sessionmaker(
+            _async_engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+    return _async_engine
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """Cung cấp một AsyncSession cho dependency injection.
+
+    Dùng cho các endpoint `async def` để truy vấn không chiếm slot threadpool.
+    Lưu ý: quan hệ lazy-load không hoạt động với AsyncSession, cần eager load
+    (selectinload) khi response có lồng quan hệ.
+    """
+    get_async_engine()
+    async with _async_session_factory() as session:
+        yield session
+
+
+def get_read_session():
+    """Cung cấp session chỉ đọc, ưu tiên read replica.
+
+    Chỉ dùng cho endpoint thuần đọc (listing, lấy theo ID, tìm kiếm). Các luồng
+    ghi hoặc đọc-sau-ghi phải dùng `get_session` để luôn chạy trên primary.
+    Nếu không có replica nào khả dụng sẽ fallback về primary. Session trên replica
+    được đánh dấu `session.info["replica"] = True`.
+    """
+    session: Optional[Session] = None
+    for url in replica_set.candidates():
+        candidate = Session(replica_set.get_engine(url), info={"replica": True})
+        try:
+            candidate.connection()
+        except DBAPIError:
+            candidate.close()
+            replica_set.eject(url)
+            continue
+        session = candidate
+        break
+
+    with session or Session(engine) as read_session:
+        yield read_session
+
+
+async def get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Phiên bản AsyncSession của `get_read_session`."""
+    for url in replica_set.candidates():
+        candidate = AsyncSession(
+            replica_set.get_async_engine(url), expire_on_commit=False, info={"replica": True}
+        )
+        try:
+            await candidate.connection()
+        except (DBAPIError, OSError):
+            await candidate.close()
+            replica_set.eject(url)
+            continue
+        async with candidate as read_session:
+            yield read_session
+        return
+
+    async for read_session in get_async_session():
+        yield read_session
+
+
+async def dispose_engines() -> None:
+    """Đóng toàn bộ connection pool (gọi khi ứng dụng shutdown)."""
+    global _async_engine, _async_session_factory
+
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+    await replica_set.dispose()
+    engine.dispose()
@@ -4,29 +4,30 @@
 """Các dependency dùng chung cho FastAPI: xác thực và phân quyền.
 
 Bao gồm:
-- get_current_user: Lấy user từ JWT Bearer token.
+- get_current_user: Lấy principal từ JWT Bearer token (đối chiếu cache/DB).
+- get_read_principal: Như trên nhưng có thể tin hoàn toàn claims (endpoint chỉ đọc).
 - require_roles: Kiểm tra RBAC theo danh sách roles yêu cầu.
 """
 
-from typing import Callable, Iterable
+from typing import Any, Callable
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlmodel import Session
 
+from src.core.config import settings
 from src.core.db import get_session
 from src.core.security import decode_jwt_token
-from src.modules.auth.models import User
+from src.modules.auth.principal import Principal, load_principal, principal_from_claims
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-	db: Session = Depends(get_session),
+def get_token_payload(
 	creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
-) -> User:
-	"""Giải mã JWT từ header Authorization và trả về đối tượng User.
+) -> dict[str, Any]:
+	"""Giải mã và xác minh JWT từ header Authorization.
 
 	- Trả 401 nếu không có hoặc token không hợp lệ.
 	"""
@@ -35,30 +36,63 @@ def get_current_user(
 		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Thiếu token")
 
 	try:
-		payload = decode_jwt_token(creds.credentials)
+		return decode_jwt_token(creds.credentials)
 	except Exception:
 		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token không hợp lệ")
 
+
+def get_current_user(
+	db: Session = Depends(get_session),
+	payload: dict[str, Any] = Depends(get_token_payload),
+) -> Principal:
+	"""Trả về principal của người dùng đang đăng nhập.
+
+	User và roles được đối chiếu qua cache (TTL ngắn, vô hiệu hóa khi đổi
+	trạng thái/vai trò) nên đa số request không truy vấn DB.
+	- Trả 401 nếu user không tồn tại hoặc không hoạt động.
+	"""
+
 	user_id = payload.get("sub")
 	if not user_id:
 		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token thiếu sub")
 
-	user = db.get(User, int(user_id))
-	if not user or not user.is_active:
+	principal = load_principal(db, int(user_id))
+	if not principal or not principal.is_active:
 		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Người dùng không tồn tại/không hoạt động")
-	return user
+	return principal
 
 
-def require_roles(*required_roles: str) -> Callable[[User], User]:
+def get_read_principal(
+	db: Session = Depends(get_session),
+	payload: dict[str, Any] = Depends(get_token_payload),
+) -> Principal:
+	"""Principal cho endpoint chỉ đọc.
+
+	Khi bật `AUTH_TRUST_TOKEN_CLAIMS`, dựng thẳng từ claims đã ký (không chạm
+	DB/cache); ngược lại hoạt động như `get_current_user`.
+	"""
+
+	if not settings.AUTH_TRUST_TOKEN_CLAIMS:
+		return get_current_user(db=db, payload=payload)
+
+	try:
+		return principal_from_claims(payload)
+	except ValueError as e:
+		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+
+def require_roles(*required_roles: str, trust_claims: bool = False) -> Callable[[Principal], Principal]:
     """Factory tạo dependency kiểm tra quyền truy cập theo roles.
 
     Sử dụng: Depends(require_roles("admin", "manager"))
+
+    Args:
+        trust_claims: Dùng `get_read_principal` (chỉ nên bật cho endpoint chỉ đọc)
     """
+    principal_dependency = get_read_principal if trust_claims else get_current_user
 
-    def _checker(user: User = Depends(get_current_user)) -> User:
-        # Lấy tên các role của user từ CSDL
-        user_roles: set[str] = {role.name for role in user.roles}
-        if not user_roles.intersection(set(required_roles)):
+    def _checker(user: Principal = Depends(principal_dependency)) -> Principal:
+        if not user.has_any_role(*required_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Không đủ quyền truy cập"
             )
@@ -67,6 +101,6 @@ def require_roles(*required_roles: str) -> Callable[[User], User]:
     return _checker
 
 
-def get_admin_user(user: User = Depends(require_roles("admin"))) -> User:
+def get_admin_user(user: Principal = Depends(require_roles("admin"))) -> Principal:
     """Dependency tiện ích để yêu cầu quyền admin."""
     return user
@@ -1,326 +1,145 @@
 """Module xử lý gửi email cho hệ thống.
 
-Chứa các hàm để gửi email xác minh đăng ký và đặt lại mật khẩu.
+Chứa các hàm xếp email xác minh đăng ký / đặt lại mật khẩu (và email hàng loạt)
+vào outbox. Nội dung render từ template biên dịch sẵn (xem `email_templates`);
+việc gửi qua SMTP do bộ gửi nền đảm nhiệm (xem `src.modules.notifications.outbox`),
+không chạy trong request.
 """
 
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from typing import Optional
+import binascii
+import secrets
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, Optional
 
-from src.core.config import settings
-
-
-def _get_verification_email_template(
-    user_email: str, token: str, frontend_url: str
-) -> str:
-    """Tạo HTML template cho email xác minh đăng ký.
+from sqlmodel import Session
 
-    Args:
-        user_email: Email người dùng
-        token: Token xác minh
-        frontend_url: URL frontend để tạo link xác minh
+from src.core.config import settings
+from src.core.email_templates import render_bulk, render_email
+from src.modules.notifications.crud import enqueue_email, enqueue_emails
 
-    Returns:
-        HTML content của email
-    """
-    verify_link = f"{frontend_url}/auth/verify-email?token={token}"
-    html_content = f"""
-    <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    background-color: #f5f5f5;
-                }}
-                .content {{
-                    background-color: #ffffff;
-                    padding: 30px;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    text-align: center;
-                    margin-bottom: 20px;
-                }}
-                .header h2 {{
-                    color: #2c3e50;
-                    margin: 0;
-                }}
-                .button {{
-                    display: inline-block;
-                    background-color: #3498db;
-                    color: #ffffff;
-                    padding: 12px 30px;
-                    border-radius: 5px;
-                    text-decoration: none;
-                    margin: 20px 0;
-                    font-weight: bold;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    font-size: 12px;
-                    color: #7f8c8d;
-                }}
-                .expiry-notice {{
-                    background-color: #fff3cd;
-                    border-left: 4px solid #ffc107;
-                    padding: 10px;
-                    margin: 15px 0;
-                    border-radius: 3px;
-                    font-size: 14px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="content">
-                    <div class="header">
-                        <h2>Xác minh Email của Bạn</h2>
-                    </div>
 
-                    <p>Xin chào,</p>
-                    <p>Cảm ơn bạn đã đăng ký tài khoản với chúng tôi.
-                    Để hoàn tất quá trình đăng ký, vui lòng xác minh
-                    địa chỉ email của bạn bằng cách nhấp vào nút dưới đây:</p>
+@lru_cache(maxsize=256)
+def _encode_subject(subject: str) -> str:
+    """Mã hóa tiêu đề theo RFC 2047 (cache: mỗi template thường chỉ có vài tiêu đề)."""
+    return Header(subject, "utf-8").encode()
 
-                    <center>
-                        <a href="{verify_link}" class="button">Xác minh Email</a>
-                    </center>
 
-                    <div class="expiry-notice">
-                        <strong>⏱️ Lưu ý:</strong> Link xác minh sẽ hết hạn
-                        sau 24 giờ. Nếu bạn không xác minh trong thời gian này,
-                        vui lòng yêu cầu gửi lại email.
-                    </div>
+@lru_cache(maxsize=1)
+def _msgid_domain() -> str:
+    # Tránh make_msgid() tự tra socket.getfqdn() ở mỗi email
+    return settings.MAIL_FROM.rpartition("@")[2] or "localhost"
 
-                    <p>Hoặc sao chép link dưới đây vào trình duyệt:</p>
-                    <p style="word-break: break-all; background-color: #f9f9f9;
-                    padding: 10px; border-radius: 3px; font-size: 12px;">
-                        {verify_link}
-                    </p>
 
-                    <p>Nếu bạn không yêu cầu đăng ký, vui lòng bỏ qua email này.</p>
+def _qp(content: str) -> str:
+    return binascii.b2a_qp(content.encode("utf-8"), istext=True).decode("ascii")
 
-                    <div class="footer">
-                        <p>© 2025 Spa Online CRM. Tất cả quyền được bảo lưu.</p>
-                        <p>Nếu bạn có thắc mắc, vui lòng liên hệ:
-                        <a href="mailto:support@spa-crm.local">support@spa-crm.local</a></p>
-                    </div>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
-    return html_content
 
+def build_email_message(
+    to_email: str, subject: str, html_content: str, text_content: Optional[str] = None
+) -> bytes:
+    """Tạo message MIME multipart/alternative (HTML, kèm plain-text nếu có).
 
-def _get_password_reset_email_template(
-    token: str, frontend_url: str
-) -> str:
-    """Tạo HTML template cho email đặt lại mật khẩu.
-
-    Args:
-        token: Token đặt lại mật khẩu
-        frontend_url: URL frontend để tạo link reset
-
-    Returns:
-        HTML content của email
-    """
-    reset_link = f"{frontend_url}/auth/reset-password?token={token}"
-    html_content = f"""
-    <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    background-color: #f5f5f5;
-                }}
-                .content {{
-                    background-color: #ffffff;
-                    padding: 30px;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    text-align: center;
-                    margin-bottom: 20px;
-                }}
-                .header h2 {{
-                    color: #e74c3c;
-                    margin: 0;
-                }}
-                .button {{
-                    display: inline-block;
-                    background-color: #e74c3c;
-                    color: #ffffff;
-                    padding: 12px 30px;
-                    border-radius: 5px;
-                    text-decoration: none;
-                    margin: 20px 0;
-                    font-weight: bold;
-                }}
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    font-size: 12px;
-                    color: #7f8c8d;
-                }}
-                .security-notice {{
-                    background-color: #f8d7da;
-                    border-left: 4px solid #f5c6cb;
-                    padding: 10px;
-                    margin: 15px 0;
-                    border-radius: 3px;
-                    font-size: 14px;
-                    color: #721c24;
-                }}
-                .expiry-notice {{
-                    background-color: #fff3cd;
-                    border-left: 4px solid #ffc107;
-                    padding: 10px;
-                    margin: 15px 0;
-                    border-radius: 3px;
-                    font-size: 14px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="content">
-                    <div class="header">
-                        <h2>Đặt lại Mật khẩu của Bạn</h2>
-                    </div>
-
-                    <p>Xin chào,</p>
-                    <p>Chúng tôi nhận được yêu cầu đặt lại mật khẩu cho
-                    tài khoản của bạn. Để đặt lại mật khẩu, vui lòng
-                    nhấp vào nút dưới đây:</p>
-
-                    <center>
-                        <a href="{reset_link}" class="button">Đặt lại Mật khẩu</a>
-                    </center>
-
-                    <div class="expiry-notice">
-                        <strong>⏱️ Lưu ý:</strong> Link đặt lại mật khẩu
-                        sẽ hết hạn sau 1 giờ. Vui lòng thực hiện thay đổi
-                        trong thời gian này.
-                    </div>
-
-                    <p>Hoặc sao chép link dưới đây vào trình duyệt:</p>
-                    <p style="word-break: break-all; background-color: #f9f9f9;
-                    padding: 10px; border-radius: 3px; font-size: 12px;">
-                        {reset_link}
-                    </p>
-
-                    <div class="security-notice">
-                        <strong>🔒 Cảnh báo bảo mật:</strong> Nếu bạn không yêu cầu
-                        đặt lại mật khẩu, vui lòng bỏ qua email này hoặc thay đổi
-                        mật khẩu ngay để bảo vệ tài khoản của bạn.
-                    </div>
-
-                    <div class="footer">
-                        <p>© 2025 Spa Online CRM. Tất cả quyền được bảo lưu.</p>
-                        <p>Nếu bạn có thắc mắc về bảo mật, vui lòng liên hệ:
-                        <a href="mailto:security@spa-crm.local">security@spa-crm.local</a></p>
-                    </div>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
-    return html_content
-
-
-def send_email_async(to_email: str, subject: str, html_content: str) -> bool:
-    """Gửi email không đồng bộ thông qua SMTP.
+    Message được ghép trực tiếp thành bytes (quoted-printable, UTF-8) thay vì dựng
+    cây `email.mime` cho từng email: dựng và serialize cây MIME tốn hơn nhiều so
+    với render nội dung khi gửi hàng loạt.
 
     Args:
         to_email: Email người nhận
         subject: Tiêu đề email
         html_content: Nội dung HTML của email
+        text_content: Nội dung plain-text thay thế (tùy chọn)
 
     Returns:
-        True nếu gửi thành công, False nếu thất bại
+        Message (CRLF) sẵn sàng để gửi qua SMTP `sendmail`
     """
-    try:
-        # Tạo message MIME
-        message = MIMEMultipart("alternative")
-        message["From"] = f"{settings.MAIL_USERNAME}"
-        message["To"] = to_email
-        message["Subject"] = subject
-
-        # Gắn HTML content
-        part = MIMEText(html_content, "html")
-        message.attach(part)
-
-        # Kết nối SMTP và gửi
-        if settings.MAIL_SSL_TLS:
-            server = smtplib.SMTP_SSL(settings.MAIL_SERVER, settings.MAIL_PORT)
-        else:
-            server = smtplib.SMTP(settings.MAIL_SERVER, settings.MAIL_PORT)
-            if settings.MAIL_STARTTLS:
-                server.starttls()
-
-        server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
-        server.send_message(message)
-        server.quit()
-
-        return True
-    except Exception as e:
-        # Log lỗi nhưng không expose chi tiết lỗi SMTP
-        print(f"Lỗi gửi email: {str(e)}")
-        return False
-
-
-def send_verification_email(email: str, token: str) -> bool:
-    """Gửi email xác minh đăng ký.
+    boundary = f"=_{secrets.token_hex(16)}"
+    lines = [
+        f"From: {settings.MAIL_USERNAME}",
+        f"To: {to_email}",
+        f"Subject: {_encode_subject(subject)}",
+        f"Date: {formatdate()}",
+        f"Message-ID: {make_msgid(domain=_msgid_domain())}",
+        "MIME-Version: 1.0",
+        f'Content-Type: multipart/alternative; boundary="{boundary}"',
+        "",
+    ]
+    # Phần plain-text đứng trước: client chọn phần cuối cùng mà nó hiển thị được
+    for subtype, content in (("plain", text_content), ("html", html_content)):
+        if not content:
+            continue
+        lines += [
+            f"--{boundary}",
+            f'Content-Type: text/{subtype}; charset="utf-8"',
+            "Content-Transfer-Encoding: quoted-printable",
+            "",
+            _qp(content),
+        ]
+    lines += [f"--{boundary}--", ""]
+    return "\n".join(lines).replace("\r\n", "\n").replace("\n", "\r\n").encode("ascii")
+
+
+def _queue_rendered(
+    db: Session, template: str, email: str, context: Mapping[str, Any], locale: Optional[str]
+) -> None:
+    rendered = render_email(template, context, locale)
+    enqueue_email(db, email, rendered.subject, rendered.html, rendered.text)
+
+
+def queue_verification_email(
+    db: Session, email: str, token: str, locale: Optional[str] = None
+) -> None:
+    """Ghi email xác minh đăng ký vào outbox (gửi nền sau khi commit).
 
     Args:
+        db: Session của transaction tạo token (không commit ở đây)
         email: Email người dùng cần xác minh
         token: Token xác minh để tạo link
-
-    Returns:
-        True nếu gửi thành công, False nếu thất bại
+        locale: Ngôn ngữ email (mặc định EMAIL_DEFAULT_LOCALE)
     """
-    subject = "Xác minh Email của Bạn - Spa Online CRM"
-    html_content = _get_verification_email_template(
-        email, token, settings.FRONTEND_URL
-    )
-    return send_email_async(email, subject, html_content)
+    link = f"{settings.FRONTEND_URL}/auth/verify-email?token={token}"
+    _queue_rendered(db, "verification", email, {"link": link}, locale)
 
 
-def send_password_reset_email(email: str, token: str) -> bool:
-    """Gửi email đặt lại mật khẩu.
+def queue_password_reset_email(
+    db: Session, email: str, token: str, locale: Optional[str] = None
+) -> None:
+    """Ghi email đặt lại mật khẩu vào outbox (gửi nền sau khi commit).
 
     Args:
+        db: Session của transaction tạo token (không commit ở đây)
         email: Email người dùng cần reset mật khẩu
         token: Token đặt lại mật khẩu để tạo link
+        locale: Ngôn ngữ email (mặc định EMAIL_DEFAULT_LOCALE)
+    """
+    link = f"{settings.FRONTEND_URL}/auth/reset-password?token={token}"
+    _queue_rendered(db, "password_reset", email, {"link": link}, locale)
+
+
+def queue_bulk_emails(
+    db: Session,
+    template: str,
+    recipients: Iterable[tuple[str, Mapping[str, Any]]],
+    locale: Optional[str] = None,
+) -> int:
+    """Render và ghi hàng loạt email (chiến dịch) vào outbox, chèn theo lô.
+
+    Args:
+        db: Session (không commit ở đây)
+        template: Tên template đã đăng ký (xem `email_templates.register_template`)
+        recipients: Các cặp (email, context) của từng người nhận
+        locale: Ngôn ngữ email (mặc định EMAIL_DEFAULT_LOCALE)
 
     Returns:
-        True nếu gửi thành công, False nếu thất bại
+        Số email đã ghi vào outbox
     """
-    subject = "Đặt lại Mật khẩu - Spa Online CRM"
-    html_content = _get_password_reset_email_template(token, settings.FRONTEND_URL)
-    return send_email_async(email, subject, html_content)
+    recipients = list(recipients)
+    rendered = render_bulk(template, (context for _, context in recipients), locale)
+    return enqueue_emails(
+        db,
+        (
+            (email, message.subject, message.html, message.text)
+            for (email, _), message in zip(recipients, rendered)
+        ),
+    )
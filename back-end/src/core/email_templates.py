@@ -0,0 +1,369 @@
+"""Template email biên dịch sẵn, có biến thể theo locale và bản plain-text.
+
+Mỗi template (tiêu đề, HTML, plain-text) được biên dịch một lần khi import:
+layout, CSS và các giá trị cố định theo cấu hình được ghép sẵn, chỉ còn lại các
+biến `{{ ten_bien }}` được điền khi render (giá trị trong HTML được escape).
+`render_bulk` dùng lại cùng template cho hàng nghìn người nhận.
+
+Template mới (ví dụ email chiến dịch) đăng ký bằng `register_template`.
+"""
+
+import html
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Mapping
+
+from src.core.config import settings
+
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class CompiledTemplate:
+    """Chuỗi template đã tách sẵn thành các đoạn tĩnh xen kẽ tên biến.
+
+    Render chỉ nối các đoạn tĩnh có sẵn với giá trị biến (một lần `str.join`),
+    không phân tích lại template.
+
+    Attributes:
+        names: Tên các biến cần truyền khi render
+        escape: Có escape HTML giá trị biến hay không
+    """
+
+    __slots__ = ("_head", "_pairs", "names", "escape")
+
+    def __init__(self, source: str, escape: bool):
+        pieces = _PLACEHOLDER_RE.split(source)
+        self._head = pieces[0]
+        self._pairs = tuple(zip(pieces[1::2], pieces[2::2]))
+        self.names = frozenset(pieces[1::2])
+        self.escape = escape
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        """Điền biến; ném KeyError nếu thiếu biến."""
+        if self.escape:
+            values = {name: html.escape(str(context[name])) for name in self.names}
+        else:
+            values = {name: str(context[name]) for name in self.names}
+        parts = [self._head]
+        for name, literal in self._pairs:
+            parts.append(values[name])
+            parts.append(literal)
+        return "".join(parts)
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    """Email đã render, sẵn sàng ghi vào outbox."""
+
+    subject: str
+    html: str
+    text: str
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    """Một template email đã biên dịch (một locale)."""
+
+    subject: CompiledTemplate
+    html: CompiledTemplate
+    text: CompiledTemplate
+
+    def render(self, context: Mapping[str, Any]) -> RenderedEmail:
+        return RenderedEmail(
+            subject=self.subject.render(context),
+            html=self.html.render(context),
+            text=self.text.render(context),
+        )
+
+
+# --- Layout dùng chung ---
+
+_LAYOUT = """<html>
+    <head>
+        <meta charset="UTF-8">
+        <style>
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f5f5f5; }
+            .content { background-color: #ffffff; padding: 30px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+            .header { text-align: center; margin-bottom: 20px; }
+            .header h2 { color: [[accent]]; margin: 0; }
+            .button { display: inline-block; background-color: [[button]]; color: #ffffff; padding: 12px 30px; border-radius: 5px; text-decoration: none; margin: 20px 0; font-weight: bold; }
+            .footer { text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #7f8c8d; }
+            .link-box { word-break: break-all; background-color: #f9f9f9; padding: 10px; border-radius: 3px; font-size: 12px; }
+            .expiry-notice { background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 10px; margin: 15px 0; border-radius: 3px; font-size: 14px; }
+            .security-notice { background-color: #f8d7da; border-left: 4px solid #f5c6cb; padding: 10px; margin: 15px 0; border-radius: 3px; font-size: 14px; color: #721c24; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="content">
+                <div class="header">
+                    <h2>[[title]]</h2>
+                </div>
+[[body]]
+                <div class="footer">
+                    [[footer]]
+                </div>
+            </div>
+        </div>
+    </body>
+</html>
+"""
+
+_FOOTERS = {
+    "vi": "<p>© 2025 Spa Online CRM. Tất cả quyền được bảo lưu.</p>\n"
+    "                    <p>Nếu bạn có thắc mắc, vui lòng liên hệ: "
+    '<a href="mailto:[[contact]]">[[contact]]</a></p>',
+    "en": "<p>© 2025 Spa Online CRM. All rights reserved.</p>\n"
+    "                    <p>If you have any questions, please contact: "
+    '<a href="mailto:[[contact]]">[[contact]]</a></p>',
+}
+
+# Màu (tiêu đề, nút) theo kiểu email
+_THEMES = {
+    "info": ("#2c3e50", "#3498db"),
+    "alert": ("#e74c3c", "#e74c3c"),
+}
+
+
+def _fill(source: str, **static: Any) -> str:
+    """Điền các phần cố định `[[ten]]` lúc biên dịch (không escape)."""
+    for key, value in static.items():
+        source = source.replace(f"[[{key}]]", str(value))
+    return source
+
+
+def compile_email(
+    *,
+    locale: str,
+    subject: str,
+    title: str,
+    body_html: str,
+    body_text: str,
+    theme: str = "info",
+    contact: str = "support@spa-crm.local",
+) -> EmailTemplate:
+    """Ghép nội dung vào layout chung và biên dịch thành EmailTemplate.
+
+    `body_html`/`body_text`/`subject` có thể chứa biến `{{ ten_bien }}`.
+    """
+    accent, button = _THEMES[theme]
+    footer = _fill(_FOOTERS.get(locale, _FOOTERS["vi"]), contact=contact)
+    html_source = _fill(
+        _LAYOUT, accent=accent, button=button, title=title, body=body_html, footer=footer
+    )
+    return EmailTemplate(
+        subject=CompiledTemplate(subject, escape=False),
+        html=CompiledTemplate(html_source, escape=True),
+        text=CompiledTemplate(body_text, escape=False),
+    )
+
+
+# --- Registry ---
+
+_TEMPLATES: dict[tuple[str, str], EmailTemplate] = {}
+
+
+def register_template(name: str, locale: str, template: EmailTemplate) -> None:
+    """Đăng ký (hoặc thay) template `name` cho `locale`."""
+    _TEMPLATES[(name, locale)] = template
+
+
+def get_template(name: str, locale: str | None = None) -> EmailTemplate:
+    """Template theo tên và locale; không có locale đó thì dùng locale mặc định.
+
+    Raises:
+        KeyError: Nếu template không tồn tại
+    """
+    locale = locale or settings.EMAIL_DEFAULT_LOCALE
+    template = _TEMPLATES.get((name, locale))
+    if template is None:
+        template = _TEMPLATES[(name, settings.EMAIL_DEFAULT_LOCALE)]
+    return template
+
+
+def render_email(
+    name: str, context: Mapping[str, Any], locale: str | None = None
+) -> RenderedEmail:
+    """Render một email."""
+    return get_template(name, locale).render(context)
+
+
+def render_bulk(
+    name: str, contexts: Iterable[Mapping[str, Any]], locale: str | None = None
+) -> Iterator[RenderedEmail]:
+    """Render hàng loạt (chiến dịch): tra template một lần, render lười từng người nhận."""
+    template = get_template(name, locale)
+    for context in contexts:
+        yield template.render(context)
+
+
+# --- Template hệ thống ---
+
+_VERIFY_HOURS = settings.VERIFICATION_TOKEN_EXPIRE_HOURS
+_RESET_HOURS = settings.RESET_TOKEN_EXPIRE_HOURS
+
+register_template("verification", "vi", compile_email(
+    locale="vi",
+    subject="Xác minh Email của Bạn - Spa Online CRM",
+    title="Xác minh Email của Bạn",
+    body_html=f"""
+                <p>Xin chào,</p>
+                <p>Cảm ơn bạn đã đăng ký tài khoản với chúng tôi.
+                Để hoàn tất quá trình đăng ký, vui lòng xác minh
+                địa chỉ email của bạn bằng cách nhấp vào nút dưới đây:</p>
+
+                <center>
+                    <a href="{{{{ link }}}}" class="button">Xác minh Email</a>
+                </center>
+
+                <div class="expiry-notice">
+                    <strong>⏱️ Lưu ý:</strong> Link xác minh sẽ hết hạn
+                    sau {_VERIFY_HOURS} giờ. Nếu bạn không xác minh trong thời gian này,
+                    vui lòng yêu cầu gửi lại email.
+                </div>
+
+                <p>Hoặc sao chép link dưới đây vào trình duyệt:</p>
+                <p class="link-box">{{{{ link }}}}</p>
+
+                <p>Nếu bạn không yêu cầu đăng ký, vui lòng bỏ qua email này.</p>
+""",
+    body_text=f"""Xin chào,
+
+Cảm ơn bạn đã đăng ký tài khoản với chúng tôi. Để hoàn tất quá trình đăng ký,
+vui lòng xác minh địa chỉ email của bạn qua link sau:
+
+{{{{ link }}}}
+
+Link xác minh sẽ hết hạn sau {_VERIFY_HOURS} giờ.
+Nếu bạn không yêu cầu đăng ký, vui lòng bỏ qua email này.
+
+Spa Online CRM
+""",
+))
+
+register_template("verification", "en", compile_email(
+    locale="en",
+    subject="Verify your email - Spa Online CRM",
+    title="Verify your email",
+    body_html=f"""
+                <p>Hello,</p>
+                <p>Thank you for signing up. To complete your registration,
+                please verify your email address by clicking the button below:</p>
+
+                <center>
+                    <a href="{{{{ link }}}}" class="button">Verify email</a>
+                </center>
+
+                <div class="expiry-notice">
+                    <strong>⏱️ Note:</strong> This link expires in {_VERIFY_HOURS} hours.
+                    If it expires, please request a new verification email.
+                </div>
+
+                <p>Or copy the link below into your browser:</p>
+                <p class="link-box">{{{{ link }}}}</p>
+
+                <p>If you did not sign up, please ignore this email.</p>
+""",
+    body_text=f"""Hello,
+
+Thank you for signing up. To complete your registration, please verify your
+email address using the link below:
+
+{{{{ link }}}}
+
+This link expires in {_VERIFY_HOURS} hours.
+If you did not sign up, please ignore this email.
+
+Spa Online CRM
+""",
+))
+
+register_template("password_reset", "vi", compile_email(
+    locale="vi",
+    subject="Đặt lại Mật khẩu - Spa Online CRM",
+    title="Đặt lại Mật khẩu của Bạn",
+    theme="alert",
+    contact="security@spa-crm.local",
+    body_html=f"""
+                <p>Xin chào,</p>
+                <p>Chúng tôi nhận được yêu cầu đặt lại mật khẩu cho
+                tài khoản của bạn. Để đặt lại mật khẩu, vui lòng
+                nhấp vào nút dưới đây:</p>
+
+                <center>
+                    <a href="{{{{ link }}}}" class="button">Đặt lại Mật khẩu</a>
+                </center>
+
+                <div class="expiry-notice">
+                    <strong>⏱️ Lưu ý:</strong> Link đặt lại mật khẩu
+                    sẽ hết hạn sau {_RESET_HOURS} giờ. Vui lòng thực hiện thay đổi
+                    trong thời gian này.
+                </div>
+
+                <p>Hoặc sao chép link dưới đây vào trình duyệt:</p>
+                <p class="link-box">{{{{ link }}}}</p>
+
+                <div class="security-notice">
+                    <strong>🔒 Cảnh báo bảo mật:</strong> Nếu bạn không yêu cầu
+                    đặt lại mật khẩu, vui lòng bỏ qua email này hoặc thay đổi
+                    mật khẩu ngay để bảo vệ tài khoản của bạn.
+                </div>
+""",
+    body_text=f"""Xin chào,
+
+Chúng tôi nhận được yêu cầu đặt lại mật khẩu cho tài khoản của bạn.
+Để đặt lại mật khẩu, vui lòng mở link sau:
+
+{{{{ link }}}}
+
+Link sẽ hết hạn sau {_RESET_HOURS} giờ.
+Nếu bạn không yêu cầu đặt lại mật khẩu, vui lòng bỏ qua email này hoặc
+thay đổi mật khẩu ngay để bảo vệ tài khoản của bạn.
+
+Spa Online CRM
+""",
+))
+
+register_template("password_reset", "en", compile_email(
+    locale="en",
+    subject="Reset your password - Spa Online CRM",
+    title="Reset your password",
+    theme="alert",
+    contact="security@spa-crm.local",
+    body_html=f"""
+                <p>Hello,</p>
+                <p>We received a request to reset the password for your account.
+                To choose a new password, click the button below:</p>
+
+                <center>
+                    <a href="{{{{ link }}}}" class="button">Reset password</a>
+                </center>
+
+                <div class="expiry-notice">
+                    <strong>⏱️ Note:</strong> This link expires in {_RESET_HOURS} hour(s).
+                </div>
+
+                <p>Or copy the link below into your browser:</p>
+                <p class="link-box">{{{{ link }}}}</p>
+
+                <div class="security-notice">
+                    <strong>🔒 Security notice:</strong> If you did not request a
+                    password reset, ignore this email or change your password
+                    right away to protect your account.
+                </div>
+""",
+    body_text=f"""Hello,
+
+We received a request to reset the password for your account.
+To choose a new password, open the link below:
+
+{{{{ link }}}}
+
+This link expires in {_RESET_HOURS} hour(s).
+If you did not request a password reset, ignore this email or change your
+password right away to protect your account.
+
+Spa Online CRM
+""",
+))
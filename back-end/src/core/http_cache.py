@@ -0,0 +1,132 @@
+"""HTTP conditional caching: ETag, Last-Modified và Cache-Control.
+
+Hai cách gắn vào endpoint GET:
+
+- `conditional_cache`: dependency chạy trước khi mở session DB, dùng khi phiên
+  bản tài nguyên có nguồn chung cho mọi worker (ví dụ tập khóa JWKS). Nếu client
+  gửi `If-None-Match` (hoặc `If-Modified-Since`) khớp, trả ngay 304 mà không
+  truy vấn DB hay serialize response.
+- `body_etag_route`: route class tính ETag từ nội dung response sau khi handler
+  chạy xong. Worker nào cũng cho cùng ETag với cùng nội dung, và response lỗi
+  (404, ...) không bao giờ thành 304.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+
+def make_etag(*parts: object) -> str:
+    """Tạo strong ETag (chuỗi có dấu nháy kép) từ các thành phần phiên bản."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """So khớp If-None-Match (weak comparison theo RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    """Kiểm tra If-Modified-Since (độ phân giải giây)."""
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Client đã có bản mới nhất hay chưa.
+
+    If-None-Match được ưu tiên; chỉ xét If-Modified-Since khi không có nó.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        return _not_modified_since(if_modified_since, last_modified)
+    return False
+
+
+def conditional_cache(
+    get_validators: Callable[[], tuple[str, datetime]], max_age: int
+) -> Callable[[Request, Response], None]:
+    """Factory tạo dependency xử lý conditional GET.
+
+    Sử dụng: `dependencies=[Depends(conditional_cache(lambda: (etag, ts), 60))]`
+
+    Args:
+        get_validators: Hàm trả về (etag, last_modified) hiện tại của tài nguyên
+        max_age: Giá trị max-age (giây) cho header Cache-Control
+
+    Raises:
+        HTTPException 304: Nếu client đã có bản mới nhất
+    """
+
+    def _dependency(request: Request, response: Response) -> None:
+        etag, last_modified = get_validators()
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": f"public, max-age={max_age}",
+        }
+        if is_not_modified(request, etag, last_modified):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return _dependency
+
+
+def body_etag_route(max_age: int) -> type[APIRoute]:
+    """Factory tạo route class gắn ETag theo nội dung cho các GET trả về 200.
+
+    Sử dụng: `APIRouter(..., route_class=body_etag_route(60))`. Response stream
+    và method khác GET được giữ nguyên.
+
+    Không gửi Last-Modified: nội dung không mang mốc thời gian chung cho mọi
+    worker, còn mốc theo bộ nhớ từng worker sẽ làm `If-Modified-Since` trả 304
+    sai. Client dùng `If-None-Match`.
+
+    Args:
+        max_age: Giá trị max-age (giây) cho header Cache-Control
+    """
+
+    class BodyETagRoute(APIRoute):
+        def get_route_handler(self) -> Callable:
+            handler = super().get_route_handler()
+
+            async def route_handler(request: Request) -> Response:
+                response = await handler(request)
+                body = getattr(response, "body", None)
+                if request.method != "GET" or response.status_code != 200 or body is None:
+                    return response
+
+                etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+                headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+                if is_not_modified(request, etag):
+                    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+                response.headers.update(headers)
+                return response
+
+            return route_handler
+
+    return BodyETagRoute
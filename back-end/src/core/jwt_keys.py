@@ -0,0 +1,307 @@
+"""Key ring ký JWT bất đối xứng (RS256/EdDSA) có `kid` và xoay vòng khóa.
+
+Mỗi khóa là một file PEM (private key) `<kid>.pem` trong `JWT_KEYS_DIR`. Token
+được ký bằng khóa mới nhất đã qua thời gian chờ kích hoạt và mang `kid` trong
+header; mọi khóa còn trong thư mục đều dùng để xác minh và được công bố tại
+`/.well-known/jwks.json`, nên gateway có thể tự xác minh token mà không cần
+SECRET_KEY hay gọi lại backend.
+
+Xoay vòng theo lịch (ví dụ cron hằng ngày, chỉ tạo khóa khi đến hạn):
+
+    python -m src.core.jwt_keys rotate --if-due
+
+Khóa mới được công bố trên JWKS ngay nhưng chỉ dùng để ký sau
+`JWT_KEY_ACTIVATION_DELAY_SECONDS` (để cache JWKS phía gateway kịp làm mới);
+khóa cũ bị xóa khi mọi token nó đã ký chắc chắn hết hạn. Các worker tự nạp lại
+thư mục mỗi `JWT_KEY_RELOAD_SECONDS`, chỉ parse file mới/đổi.
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
+
+# Định dạng thời điểm tạo ở đầu kid: 20251019T091500Z-1a2b3c4d
+_KID_TIME_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+@dataclass(frozen=True)
+class JWTKey:
+    """Một khóa trong key ring (đã parse sẵn, dùng lại cho mọi request)."""
+
+    kid: str
+    algorithm: str
+    private_key: Any
+    public_key: Any
+    created_at: datetime
+
+    def to_jwk(self) -> Dict[str, Any]:
+        """Public key dạng JWK."""
+        if self.algorithm == "EdDSA":
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+def _algorithm_for(private_key: Any) -> str:
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return "RS256"
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return "EdDSA"
+    raise ValueError(f"Loại khóa không hỗ trợ: {type(private_key).__name__}")
+
+
+def _created_at(kid: str, path: Optional[Path]) -> datetime:
+    """Thời điểm tạo lấy từ kid; nếu kid không theo định dạng thì dùng mtime."""
+    try:
+        return datetime.strptime(kid.split("-", 1)[0], _KID_TIME_FORMAT).replace(
+            tzinfo=timezone.utc
+        )
+    except ValueError:
+        mtime = path.stat().st_mtime if path else time.time()
+        return datetime.fromtimestamp(mtime, tz=timezone.utc)
+
+
+def generate_private_key(algorithm: str) -> Any:
+    """Sinh private key mới cho thuật toán `algorithm`."""
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    raise ValueError(f"Thuật toán không hỗ trợ: {algorithm}")
+
+
+def _new_kid(now: datetime) -> str:
+    return f"{now.strftime(_KID_TIME_FORMAT)}-{secrets.token_hex(4)}"
+
+
+class KeyRing:
+    """Tập khóa ký/xác minh JWT, nạp từ thư mục PEM và cache khóa đã parse.
+
+    Attributes:
+        directory: Thư mục chứa `<kid>.pem` (bắt buộc khi ký/xác minh)
+        algorithm: Thuật toán dùng khi sinh khóa mới
+        activation_delay: Thời gian (giây) từ lúc tạo đến lúc khóa được dùng để ký
+        reload_interval: Chu kỳ (giây) quét lại thư mục
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        algorithm: str,
+        activation_delay: int,
+        reload_interval: int,
+    ):
+        self.directory = Path(directory) if directory else None
+        self.algorithm = algorithm
+        self.activation_delay = activation_delay
+        self.reload_interval = reload_interval
+        self._keys: Dict[str, JWTKey] = {}
+        # path -> (mtime, key): chỉ parse lại file mới hoặc đã thay đổi
+        self._parsed: Dict[str, tuple[float, JWTKey]] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # --- Nạp khóa ---
+
+    def _load_file(self, path: Path) -> JWTKey:
+        private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+        kid = path.stem
+        return JWTKey(
+            kid=kid,
+            algorithm=_algorithm_for(private_key),
+            private_key=private_key,
+            public_key=private_key.public_key(),
+            created_at=_created_at(kid, path),
+        )
+
+    def reload(self) -> None:
+        """Quét lại thư mục khóa.
+
+        Raises:
+            RuntimeError: Nếu chưa cấu hình thư mục khóa. Không sinh khóa tạm vì
+                mỗi worker sẽ có khóa riêng và không xác minh được token của nhau.
+        """
+        if self.directory is None:
+            raise RuntimeError(
+                f"Cần cấu hình JWT_KEYS_DIR khi ALGORITHM={self.algorithm} "
+                "(tạo khóa đầu tiên: python -m src.core.jwt_keys rotate)"
+            )
+        with self._lock:
+            parsed: Dict[str, tuple[float, JWTKey]] = {}
+            for path in sorted(self.directory.glob("*.pem")):
+                try:
+                    mtime = path.stat().st_mtime
+                    cached = self._parsed.get(str(path))
+                    if cached and cached[0] == mtime:
+                        parsed[str(path)] = cached
+                    else:
+                        parsed[str(path)] = (mtime, self._load_file(path))
+                except (OSError, ValueError, TypeError) as e:
+                    # File đang bị xóa/ghi dở hoặc không phải private key hợp lệ
+                    logger.warning(f"✗ Bỏ qua khóa JWT {path.name}: {e}")
+
+            self._parsed = parsed
+            self._keys = {key.kid: key for _, key in parsed.values()}
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self, force: bool = False) -> Dict[str, JWTKey]:
+        if force or time.monotonic() - self._loaded_at >= self.reload_interval:
+            self.reload()
+        return self._keys
+
+    # --- Ký / xác minh ---
+
+    def signing_key(self) -> JWTKey:
+        """Khóa mới nhất đã qua thời gian chờ kích hoạt (hoặc cũ nhất nếu chưa có)."""
+        keys = self.keys()
+        if not keys:
+            raise RuntimeError("Key ring JWT không có khóa nào để ký")
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.activation_delay)
+        active = [key for key in keys if key.created_at <= cutoff]
+        return active[-1] if active else keys[0]
+
+    def sign(self, payload: Dict[str, Any]) -> str:
+        """Ký payload, gắn `kid` của khóa đang hoạt động vào header."""
+        key = self.signing_key()
+        return jwt.encode(
+            payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid}
+        )
+
+    def get_key(self, kid: str) -> Optional[JWTKey]:
+        """Khóa xác minh theo kid; nạp lại thư mục ngay nếu gặp kid lạ."""
+        key = self._ensure_fresh().get(kid)
+        if key is None and self.directory is not None:
+            # Worker khác có thể vừa xoay khóa; chỉ quét lại nếu lần quét trước đã cũ
+            if time.monotonic() - self._loaded_at >= 1:
+                key = self._ensure_fresh(force=True).get(kid)
+        return key
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Xác minh token bằng khóa tương ứng với `kid` trong header.
+
+        - Ném `jwt.PyJWTError` nếu token không hợp lệ, hết hạn hoặc kid không tồn tại.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.get_key(kid) if kid else None
+        if key is None:
+            raise jwt.InvalidKeyError("Không tìm thấy khóa xác minh cho token")
+        # Chỉ chấp nhận đúng thuật toán của khóa (chống nhầm lẫn thuật toán)
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> Dict[str, Any]:
+        """Tập public key dạng JWKS (gồm cả khóa chưa kích hoạt và khóa cũ còn hạn)."""
+        return {"keys": [key.to_jwk() for key in self.keys()]}
+
+    def keys(self) -> list[JWTKey]:
+        """Các khóa hiện có, sắp theo thời điểm tạo."""
+        return sorted(self._ensure_fresh().values(), key=lambda k: k.created_at)
+
+    # --- Xoay vòng ---
+
+    def rotate(
+        self, *, rotation_days: int, retention_seconds: int, if_due: bool = False
+    ) -> Optional[str]:
+        """Sinh khóa mới (nếu đến hạn) và xóa các khóa không còn cần để xác minh.
+
+        Khóa cũ được giữ cho tới khi khóa kế tiếp đã ký được `retention_seconds`
+        (thời gian sống tối đa của token) kể từ lúc kích hoạt.
+
+        Returns:
+            kid của khóa mới, hoặc None nếu chưa đến hạn xoay
+        """
+        if self.directory is None:
+            raise RuntimeError("Cần cấu hình JWT_KEYS_DIR để xoay vòng khóa")
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        now = datetime.now(timezone.utc)
+        keys = sorted(self._ensure_fresh(force=True).values(), key=lambda k: k.created_at)
+        new_kid = None
+        if not (if_due and keys and now - keys[-1].created_at < timedelta(days=rotation_days)):
+            new_kid = _new_kid(now)
+            private_key = generate_private_key(self.algorithm)
+            pem = private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            )
+            # Ghi file tạm rồi rename để worker khác không đọc phải file ghi dở
+            tmp_path = self.directory / f".{new_kid}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(pem)
+            os.replace(tmp_path, self.directory / f"{new_kid}.pem")
+            logger.info(f"✓ Đã tạo khóa JWT mới: {new_kid}")
+
+        # Khóa i hết cần thiết khi khóa i+1 đã kích hoạt quá retention_seconds
+        delay = timedelta(seconds=self.activation_delay)
+        retention = timedelta(seconds=retention_seconds)
+        for key, successor in zip(keys, keys[1:]):
+            if successor.created_at + delay + retention < now:
+                (self.directory / f"{key.kid}.pem").unlink(missing_ok=True)
+                logger.info(f"✓ Đã xóa khóa JWT hết hạn: {key.kid}")
+
+        self.reload()
+        return new_kid
+
+
+key_ring = KeyRing(
+    directory=settings.JWT_KEYS_DIR,
+    algorithm=settings.ALGORITHM,
+    activation_delay=settings.JWT_KEY_ACTIVATION_DELAY_SECONDS,
+    reload_interval=settings.JWT_KEY_RELOAD_SECONDS,
+)
+
+
+def is_asymmetric() -> bool:
+    """Cấu hình hiện tại có dùng key ring bất đối xứng hay không."""
+    return settings.ALGORITHM in ASYMMETRIC_ALGORITHMS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quản lý key ring ký JWT")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rotate_parser = subparsers.add_parser("rotate", help="Tạo khóa mới và dọn khóa hết hạn")
+    rotate_parser.add_argument(
+        "--if-due",
+        action="store_true",
+        help="Chỉ tạo khóa khi khóa mới nhất đã quá JWT_KEY_ROTATION_DAYS",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "rotate":
+        if not is_asymmetric():
+            parser.error(f"ALGORITHM={settings.ALGORITHM} không dùng key ring")
+        # Token dài nhất do key ring ký là access token; cộng thêm biên lệch đồng hồ
+        retention = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 300
+        kid = key_ring.rotate(
+            rotation_days=settings.JWT_KEY_ROTATION_DAYS,
+            retention_seconds=retention,
+            if_due=args.if_due,
+        )
+        if kid is None:
+            logger.info("✓ Chưa đến hạn xoay khóa")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Keyset (cursor) pagination dùng chung cho các endpoint danh sách.
+
+Thay vì OFFSET (chi phí tăng tuyến tính theo số trang và bị lệch khi có bản ghi
+mới chèn vào), trang kế tiếp được lọc theo giá trị khóa sắp xếp của bản ghi
+cuối trang trước: `(sort_col, id) > (last_value, last_id)`. Cursor là chuỗi
+base64 "mờ" (opaque) chứa khóa sắp xếp, chiều sắp xếp và giá trị cuối trang.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursorError(ValueError):
+    """Cursor không hợp lệ hoặc không khớp tham số sắp xếp."""
+
+    pass
+
+
+def encode_cursor(sort: str, order: str, value: Any, last_id: int) -> str:
+    """Mã hóa vị trí cuối trang thành cursor opaque."""
+    payload = {"s": sort, "o": order, "id": last_id, "v": value}
+    if isinstance(value, (datetime, date)):
+        payload["v"] = value.isoformat()
+        payload["t"] = "dt" if isinstance(value, datetime) else "d"
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Giải mã cursor.
+
+    Raises:
+        InvalidCursorError: Nếu cursor sai định dạng
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, dict):
+            raise InvalidCursorError("Cursor không hợp lệ")
+        if payload.get("t") == "dt":
+            payload["v"] = datetime.fromisoformat(payload["v"])
+        elif payload.get("t") == "d":
+            payload["v"] = date.fromisoformat(payload["v"])
+        payload["id"] = int(payload["id"])
+        payload["s"], payload["o"]
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise InvalidCursorError("Cursor không hợp lệ")
+    return payload
+
+
+def apply_keyset(
+    statement,
+    sort_columns: dict,
+    id_column,
+    *,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+):
+    """Thêm ORDER BY (và điều kiện keyset nếu có cursor) vào câu truy vấn.
+
+    Args:
+        statement: Câu lệnh select gốc
+        sort_columns: Map tên khóa sắp xếp → cột (các cột phải NOT NULL)
+        id_column: Cột khóa chính, dùng làm tie-breaker
+        sort: Khóa sắp xếp
+        order: "asc" hoặc "desc"
+        cursor: Cursor của trang trước (None nếu là trang đầu)
+
+    Raises:
+        InvalidCursorError: Nếu khóa sắp xếp không hỗ trợ hoặc cursor không khớp
+    """
+    if sort not in sort_columns:
+        raise InvalidCursorError(
+            f"Không hỗ trợ sắp xếp theo '{sort}'. Hỗ trợ: {', '.join(sort_columns)}"
+        )
+    if order not in ("asc", "desc"):
+        raise InvalidCursorError("Chiều sắp xếp chỉ nhận 'asc' hoặc 'desc'")
+
+    column = sort_columns[sort]
+    descending = order == "desc"
+
+    if cursor:
+        position = decode_cursor(cursor)
+        if position["s"] != sort or position["o"] != order:
+            raise InvalidCursorError("Cursor không khớp với tham số sắp xếp")
+
+        last_id = position["id"]
+        if column is id_column:
+            condition = id_column < last_id if descending else id_column > last_id
+        else:
+            value = position["v"]
+            after = column < value if descending else column > value
+            tie = id_column < last_id if descending else id_column > last_id
+            condition = or_(after, and_(column == value, tie))
+        statement = statement.where(condition)
+
+    if column is id_column:
+        return statement.order_by(id_column.desc() if descending else id_column.asc())
+    if descending:
+        return statement.order_by(column.desc(), id_column.desc())
+    return statement.order_by(column.asc(), id_column.asc())
+
+
+def build_next_cursor(
+    items: Sequence[Any], *, sort: str, order: str, limit: int
+) -> Optional[str]:
+    """Tạo cursor cho trang kế tiếp; None nếu đã là trang cuối."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(sort, order, getattr(last, sort), last.id)
@@ -0,0 +1,134 @@
+"""Hash/verify mật khẩu bất đồng bộ trên process pool.
+
+bcrypt tốn ~250ms CPU mỗi lần gọi. Chạy trực tiếp trong handler sẽ giữ một slot
+threadpool (và GIL) suốt thời gian đó, nên một đợt đăng nhập dồn dập có thể
+làm nghẽn mọi endpoint khác của worker. `PasswordHasher` đẩy việc này sang
+`ProcessPoolExecutor` riêng, giới hạn số job chạy đồng thời và từ chối sớm khi
+hàng đợi quá dài.
+
+Cost bcrypt lấy từ `settings.BCRYPT_ROUNDS`, giống nhau trên mọi worker (dùng
+`scripts/benchmark_bcrypt_rounds.py` để chọn giá trị cho máy chủ). Cost được ghi
+trong chính chuỗi hash, nên hash cũ vẫn verify được; `needs_rehash` cho biết hash
+đã lưu có khác scheme hoặc thấp hơn cost hiện tại để hash lại khi đăng nhập.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.core.config import settings
+from src.core.security import hash_password, needs_rehash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(Exception):
+    """Hàng đợi hash mật khẩu đã đầy."""
+
+    pass
+
+
+class PasswordHasher:
+    """Hasher async-facing với process pool, giới hạn đồng thời và đếm hàng đợi.
+
+    Attributes:
+        max_workers: Số process trong pool (0: dùng threadpool mặc định của loop)
+        max_concurrency: Số job được chạy cùng lúc
+        max_queue: Số job tối đa được chờ; vượt quá sẽ ném PasswordHasherBusyError
+        in_flight: Số job đang chạy
+        queued: Số job đang chờ tới lượt (queue depth)
+        rejected: Tổng số job bị từ chối do hàng đợi đầy
+        scheme: Scheme dùng cho hash mới ("bcrypt" | "argon2id")
+        rounds: Cost bcrypt cho hash mới
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_concurrency: int,
+        max_queue: int,
+        scheme: str = "bcrypt",
+        rounds: int = 12,
+    ):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.scheme = scheme
+        self.rounds = rounds
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get_executor(self) -> Optional[Executor]:
+        """Khởi tạo process pool lười (lần gọi đầu tiên)."""
+        if self._executor is None and self.max_workers > 0:
+            # spawn: tránh fork một process đang có thread (uvicorn/anyio)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"✗ Hàng đợi hash mật khẩu đầy ({self.queued}), từ chối request")
+            raise PasswordHasherBusyError("Hệ thống đang bận, vui lòng thử lại sau")
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def hash(self, plain_password: str) -> str:
+        """Hash mật khẩu theo scheme/cost hiện tại."""
+        # Truyền cost tường minh: process con không chia sẻ trạng thái với process cha
+        return await self._run(hash_password, plain_password, self.scheme, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Kiểm tra mật khẩu thuần có khớp với hash hay không."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Hash đã lưu có cần hash lại hay không (chỉ parse, không tốn CPU)."""
+        return needs_rehash(hashed_password, self.scheme, self.rounds)
+
+    def stats(self) -> dict:
+        """Thống kê hiện tại (dùng cho health/metrics)."""
+        return {
+            "workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "scheme": self.scheme,
+            "rounds": self.rounds,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """Dừng process pool (gọi khi ứng dụng shutdown)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    scheme=settings.PASSWORD_HASH_SCHEME,
+    rounds=settings.BCRYPT_ROUNDS,
+)
@@ -1,35 +1,65 @@
 """Tiện ích bảo mật chung: JWT và hashing mật khẩu.
 
 Ghi chú:
-- Sử dụng thuật toán HS256 (được cấu hình qua settings.ALGORITHM).
-- Hash mật khẩu bằng thư viện bcrypt.
+- Thuật toán cấu hình qua settings.ALGORITHM: HS256 ký bằng SECRET_KEY; RS256/EdDSA
+  ký bằng key ring có `kid` và xoay vòng (xem `jwt_keys`).
+- Hash mật khẩu bằng bcrypt (cost theo settings.BCRYPT_ROUNDS, xem `password_hasher`)
+  hoặc argon2id (tùy chọn, cần `argon2-cffi`).
 """
 
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import bcrypt
 import jwt
 
 from src.core.config import settings
+from src.core.jwt_keys import is_asymmetric, key_ring
 
 
-def hash_password(plain_password: str) -> str:
-	"""Hash mật khẩu bằng bcrypt và trả về chuỗi đã mã hóa.
+# Tiền tố nhận diện scheme từ chuỗi hash đã lưu
+_ARGON2ID_PREFIX = "$argon2id$"
 
-	- Đầu vào: mật khẩu thuần (plain text)
-	- Đầu ra: mật khẩu đã hash (str)
+
+def _get_argon2_hasher():
+	"""Tạo argon2 PasswordHasher theo cấu hình (cần cài `argon2-cffi`)."""
+
+	try:
+		from argon2 import PasswordHasher as Argon2Hasher
+	except ImportError:
+		raise RuntimeError("Chưa cài argon2-cffi, không thể dùng scheme argon2id")
+	return Argon2Hasher(
+		time_cost=settings.ARGON2_TIME_COST,
+		memory_cost=settings.ARGON2_MEMORY_COST,
+		parallelism=settings.ARGON2_PARALLELISM,
+	)
+
+
+def hash_password(
+	plain_password: str, scheme: str = "bcrypt", rounds: Optional[int] = None
+) -> str:
+	"""Hash mật khẩu và trả về chuỗi đã mã hóa.
+
+	- Đầu vào: mật khẩu thuần (plain text), scheme ("bcrypt" | "argon2id"),
+	  cost bcrypt (`rounds`, mặc định của thư viện nếu None)
+	- Đầu ra: mật khẩu đã hash (str); cost/tham số được ghi trong chính chuỗi hash
 	"""
 
-	salt = bcrypt.gensalt()
+	if scheme == "argon2id":
+		return _get_argon2_hasher().hash(plain_password)
+
+	salt = bcrypt.gensalt(rounds) if rounds else bcrypt.gensalt()
 	hashed: bytes = bcrypt.hashpw(plain_password.encode("utf-8"), salt)
 	return hashed.decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-	"""Kiểm tra mật khẩu thuần có khớp với hash hay không."""
+	"""Kiểm tra mật khẩu thuần có khớp với hash hay không (tự nhận diện scheme)."""
 
 	try:
+		if hashed_password.startswith(_ARGON2ID_PREFIX):
+			return _get_argon2_hasher().verify(hashed_password, plain_password)
 		return bcrypt.checkpw(
 			plain_password.encode("utf-8"), hashed_password.encode("utf-8")
 		)
@@ -37,6 +67,55 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 		return False
 
 
+def get_bcrypt_rounds(hashed_password: str) -> Optional[int]:
+	"""Đọc cost từ chuỗi hash bcrypt (`$2b$12$...` → 12); None nếu không phải bcrypt."""
+
+	parts = hashed_password.split("$")
+	if len(parts) < 4 or not parts[1].startswith("2"):
+		return None
+	try:
+		return int(parts[2])
+	except ValueError:
+		return None
+
+
+def needs_rehash(hashed_password: str, scheme: str, rounds: int) -> bool:
+	"""Hash đã lưu có cần hash lại khi đăng nhập không.
+
+	Chỉ nâng cost: hash bcrypt có cost cao hơn `rounds` được giữ nguyên.
+	"""
+
+	if scheme == "argon2id":
+		if not hashed_password.startswith(_ARGON2ID_PREFIX):
+			return True
+		return _get_argon2_hasher().check_needs_rehash(hashed_password)
+
+	stored_rounds = get_bcrypt_rounds(hashed_password)
+	return stored_rounds is None or stored_rounds < rounds
+
+
+def benchmark_bcrypt_rounds(target_ms: int, min_rounds: int, max_rounds: int) -> int:
+	"""Chọn cost bcrypt lớn nhất mà thời gian hash không vượt `target_ms` trên máy này.
+
+	Đo ở `min_rounds` rồi ngoại suy (mỗi cost +1 tốn gấp đôi thời gian).
+	"""
+
+	password = b"benchmark-password"
+	salt = bcrypt.gensalt(min_rounds)
+	elapsed = float("inf")
+	for _ in range(3):
+		start = time.perf_counter()
+		bcrypt.hashpw(password, salt)
+		elapsed = min(elapsed, time.perf_counter() - start)
+
+	elapsed_ms = max(elapsed * 1000, 0.001)
+	rounds = min_rounds
+	while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+		rounds += 1
+		elapsed_ms *= 2
+	return rounds
+
+
 def create_jwt_token(subject: Dict[str, Any], expires_delta: timedelta) -> str:
 	"""Tạo JWT token với payload `subject` và thời gian hết hạn.
 
@@ -50,6 +129,8 @@ def create_jwt_token(subject: Dict[str, Any], expires_delta: timedelta) -> str:
 		"exp": int((now + expires_delta).timestamp()),
 		**subject,
 	}
+	if is_asymmetric():
+		return key_ring.sign(payload)
 	token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 	return token
 
@@ -60,5 +141,7 @@ def decode_jwt_token(token: str) -> Dict[str, Any]:
 	- Ném `jwt.PyJWTError` nếu token không hợp lệ hoặc hết hạn.
 	"""
 
+	if is_asymmetric():
+		return key_ring.decode(token)
 	payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
 	return payload
@@ -1,92 +1,498 @@
-"""Khởi tạo Supabase client và xử lý thao tác lưu trữ file.
+"""Backend lưu trữ file (async) và các hàm tiện ích dùng chung.
 
-Module này cung cấp các hàm tiện ích để tương tác với Supabase Storage,
-bao gồm tải lên, xóa và lấy URL công khai của file.
+Các endpoint media là `async def`, nên mọi thao tác storage ở đây đều không chặn
+event loop: Supabase Storage được gọi qua REST API bằng một `httpx.AsyncClient`
+dùng chung (pool kết nối keep-alive, không bắt tay TCP/TLS cho mỗi request);
+local storage đọc/ghi đĩa trong threadpool.
+
+Backend được chọn theo `STORAGE_BACKEND`:
+
+- `"supabase"`: `SupabaseStorageBackend`.
+- `"local"`: `LocalStorageBackend`, một thư mục trên đĩa (`MEDIA_LOCAL_DIR`) với
+  cùng luồng: URL tải lên có chữ ký HMAC trỏ về endpoint `PUT /media/local/...`
+  của chính ứng dụng. Chỉ dùng khi dev/test.
+
+Code nghiệp vụ dùng các hàm module (`upload_file_to_storage`, `iter_file`, ...)
+thay vì gọi backend trực tiếp. Pool kết nối được đóng khi ứng dụng dừng
+(`close_storage`).
+
+URL truy cập file được dựng cục bộ từ đường dẫn (không gọi storage): qua CDN
+nếu có `MEDIA_CDN_BASE_URL`, URL ký có hạn khi `MEDIA_SIGNED_URLS` bật (bucket
+private). DB chỉ lưu đường dẫn, nên đổi CDN không cần sửa dữ liệu.
 """
 
+import base64
+import hashlib
+import hmac
 import logging
-from typing import BinaryIO, Optional
-
-from supabase import create_client, Client
+import mimetypes
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+from urllib.parse import quote, urlencode
+
+import httpx
+import jwt
+from fastapi.concurrency import run_in_threadpool
 
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Biến toàn cục để lưu trữ client singleton
-_storage_client: Optional[Client] = None
 
+def get_local_file_path(file_path: str) -> Path:
+    """Đường dẫn trên đĩa của file trong local storage.
+
+    Raises:
+        ValueError: Nếu file_path thoát ra ngoài thư mục gốc (`..`, đường dẫn tuyệt đối)
+    """
+    root = Path(settings.MEDIA_LOCAL_DIR).resolve()
+    target = (root / file_path).resolve()
+    if root not in target.parents:
+        raise ValueError(f"Đường dẫn file không hợp lệ: {file_path}")
+    return target
 
-def get_storage_client() -> Client:
-    """Khởi tạo và trả về Supabase client (singleton).
 
-    Sử dụng caching để tái sử dụng client và tránh tạo lại nhiều lần.
+def _local_signature(file_path: str, expires: int) -> str:
+    # Tiền tố "upload:" tách biệt với chữ ký URL đọc file (`_url_signature`)
+    message = f"upload:{file_path}:{expires}".encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
 
-    Returns:
-        Client: Supabase client instance
 
-    Raises:
-        Exception: Nếu không thể kết nối tới Supabase
+def _url_signature(file_path: str, expires: int) -> str:
+    """HMAC-SHA256 (hex) của "<file_path>:<expires>" với `MEDIA_URL_SIGNING_KEY`.
+
+    CDN kiểm tra URL ký bằng cùng công thức và khóa.
+    """
+    key = settings.MEDIA_URL_SIGNING_KEY or settings.SECRET_KEY
+    message = f"{file_path}:{expires}".encode("utf-8")
+    return hmac.new(key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_url_signature(file_path: str, expires: int, signature: str) -> bool:
+    """Kiểm tra chữ ký và hạn của URL đọc file (`get_signed_url`)."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_url_signature(file_path, expires), signature)
+
+
+def verify_local_upload_signature(file_path: str, expires: int, signature: str) -> bool:
+    """Kiểm tra chữ ký và hạn của URL tải lên local."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_local_signature(file_path, expires), signature)
+
+
+class StorageUpload(ABC):
+    """Một upload ghi theo chunk: gọi `write` nhiều lần rồi `complete` hoặc `abort`.
+
+    Bộ nhớ giữ lại tối đa một khối gửi (local: không giữ gì), bất kể kích thước file.
+    """
+
+    @abstractmethod
+    async def write(self, chunk: bytes) -> None:
+        """Ghi thêm một chunk."""
+
+    @abstractmethod
+    async def complete(self) -> None:
+        """Hoàn tất upload; file chỉ xuất hiện tại đích sau bước này."""
+
+    @abstractmethod
+    async def abort(self) -> None:
+        """Hủy upload và dọn phần đã ghi."""
+
+
+class StorageBackend(ABC):
+    """Giao diện backend lưu trữ; mọi thao tác I/O đều là coroutine.
+
+    Backend thiếu phương thức nào sẽ báo `TypeError` ngay khi khởi tạo.
+    """
+
+    @abstractmethod
+    async def open_upload(self, file_path: str, content_type: Optional[str] = None) -> StorageUpload:
+        """Bắt đầu upload theo chunk tới `file_path`."""
+
+    @abstractmethod
+    async def delete(self, file_path: str) -> None:
+        """Xóa file (không báo lỗi nếu file không tồn tại)."""
+
+    @abstractmethod
+    def public_url(self, file_path: str) -> str:
+        """URL công khai của file (chỉ tính toán, không gọi mạng)."""
+
+    @abstractmethod
+    def signed_url(self, file_path: str, expires: int) -> str:
+        """URL đọc file hết hạn lúc `expires` (Unix time), ký cục bộ."""
+
+    @abstractmethod
+    async def create_signed_upload_url(self, file_path: str, content_type: str) -> dict:
+        """URL để client tải file lên trực tiếp: {"url", "method", "headers"}."""
+
+    @abstractmethod
+    async def get_file_info(self, file_path: str) -> Optional[dict]:
+        """{"size", "content_type"} của file, hoặc None nếu chưa tồn tại."""
+
+    @abstractmethod
+    def iter_file(self, file_path: str, chunk_size: int) -> AsyncIterator[bytes]:
+        """Đọc nội dung file theo chunk."""
+
+    @abstractmethod
+    async def move(self, source_path: str, destination_path: str) -> None:
+        """Di chuyển file trong storage."""
+
+    async def close(self) -> None:
+        """Giải phóng tài nguyên (pool kết nối)."""
+
+
+# --- Local ---
+
+
+class _LocalUpload(StorageUpload):
+    """Ghi ra file tạm cạnh file đích, đổi tên khi hoàn tất (không để lại file dở)."""
+
+    def __init__(self, target: Path, temp: Path, file: BinaryIO):
+        self._target = target
+        self._temp = temp
+        self._file = file
+
+    @classmethod
+    def _open(cls, file_path: str) -> "_LocalUpload":
+        target = get_local_file_path(file_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_name(f"{target.name}.{uuid.uuid4().hex}.part")
+        return cls(target, temp, open(temp, "wb"))
+
+    async def write(self, chunk: bytes) -> None:
+        await run_in_threadpool(self._file.write, chunk)
+
+    def _complete(self) -> None:
+        self._file.close()
+        self._temp.replace(self._target)
+
+    def _abort(self) -> None:
+        self._file.close()
+        self._temp.unlink(missing_ok=True)
+
+    async def complete(self) -> None:
+        await run_in_threadpool(self._complete)
+
+    async def abort(self) -> None:
+        await run_in_threadpool(self._abort)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Lưu file trong `MEDIA_LOCAL_DIR`; I/O đĩa chạy trong threadpool."""
+
+    async def open_upload(self, file_path: str, content_type: Optional[str] = None) -> StorageUpload:
+        return await run_in_threadpool(_LocalUpload._open, file_path)
+
+    async def delete(self, file_path: str) -> None:
+        await run_in_threadpool(get_local_file_path(file_path).unlink, missing_ok=True)
+
+    def public_url(self, file_path: str) -> str:
+        return f"{settings.BACKEND_URL}/media/local/{quote(file_path)}"
+
+    def signed_url(self, file_path: str, expires: int) -> str:
+        query = urlencode({"expires": expires, "signature": _url_signature(file_path, expires)})
+        return f"{self.public_url(file_path)}?{query}"
+
+    async def create_signed_upload_url(self, file_path: str, content_type: str) -> dict:
+        expires = int(time.time()) + settings.MEDIA_UPLOAD_URL_EXPIRE_SECONDS
+        query = urlencode({"expires": expires, "signature": _local_signature(file_path, expires)})
+        url = f"{settings.BACKEND_URL}/media/local/{quote(file_path)}?{query}"
+        return {"url": url, "method": "PUT", "headers": {"Content-Type": content_type}}
+
+    async def get_file_info(self, file_path: str) -> Optional[dict]:
+        def stat() -> Optional[dict]:
+            target = get_local_file_path(file_path)
+            if not target.is_file():
+                return None
+            content_type, _ = mimetypes.guess_type(target.name)
+            return {"size": target.stat().st_size, "content_type": content_type}
+
+        return await run_in_threadpool(stat)
+
+    async def iter_file(self, file_path: str, chunk_size: int) -> AsyncIterator[bytes]:
+        source = await run_in_threadpool(open, get_local_file_path(file_path), "rb")
+        try:
+            while chunk := await run_in_threadpool(source.read, chunk_size):
+                yield chunk
+        finally:
+            source.close()
+
+    async def move(self, source_path: str, destination_path: str) -> None:
+        def replace() -> None:
+            target = get_local_file_path(destination_path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            get_local_file_path(source_path).replace(target)
+
+        await run_in_threadpool(replace)
+
+
+# --- Supabase ---
+
+
+def _tus_metadata(**values: str) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+        for key, value in values.items()
+    )
+
+
+class _SupabaseResumableUpload(StorageUpload):
+    """Upload resumable (giao thức TUS) của Supabase Storage.
+
+    Dữ liệu được gửi theo khối `SUPABASE_UPLOAD_CHUNK_SIZE` (Supabase yêu cầu mọi
+    khối trừ khối cuối có đúng kích thước này); tổng kích thước chỉ khai báo ở
+    khối cuối nên không cần biết trước.
     """
-    global _storage_client
 
-    if _storage_client is None:
+    _TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+
+    def __init__(self, http: httpx.AsyncClient, location: str):
+        self._http = http
+        self._location = location
+        self._buffer = bytearray()
+        self._offset = 0
+
+    @classmethod
+    async def _open(
+        cls, http: httpx.AsyncClient, file_path: str, content_type: Optional[str]
+    ) -> "_SupabaseResumableUpload":
+        response = await http.post(
+            "/upload/resumable",
+            headers={
+                **cls._TUS_HEADERS,
+                "Upload-Defer-Length": "1",
+                # Ghi đè nếu đã có: đường dẫn theo nội dung nên cùng path là cùng bytes
+                "x-upsert": "true",
+                "Upload-Metadata": _tus_metadata(
+                    bucketName=settings.SUPABASE_BUCKET_NAME,
+                    objectName=file_path,
+                    contentType=content_type or "application/octet-stream",
+                ),
+            },
+        )
+        response.raise_for_status()
+        return cls(http, response.headers["Location"])
+
+    async def _send(self, data: bytes, final: bool) -> None:
+        headers = {
+            **self._TUS_HEADERS,
+            "Upload-Offset": str(self._offset),
+            "Content-Type": "application/offset+octet-stream",
+        }
+        if final:
+            headers["Upload-Length"] = str(self._offset + len(data))
+        response = await self._http.patch(self._location, content=data, headers=headers)
+        response.raise_for_status()
+        self._offset += len(data)
+
+    async def write(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        size = settings.SUPABASE_UPLOAD_CHUNK_SIZE
+        while len(self._buffer) > size:
+            await self._send(bytes(self._buffer[:size]), final=False)
+            del self._buffer[:size]
+
+    async def complete(self) -> None:
+        await self._send(bytes(self._buffer), final=True)
+
+    async def abort(self) -> None:
         try:
-            _storage_client = create_client(
-                supabase_url=settings.SUPABASE_URL,
-                supabase_key=settings.SUPABASE_KEY,
+            await self._http.delete(self._location, headers=self._TUS_HEADERS)
+        except httpx.HTTPError:
+            pass
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage qua REST API với một `httpx.AsyncClient` dùng chung.
+
+    Client được tạo khi dùng lần đầu (trong event loop của ứng dụng) và giữ tối
+    đa `STORAGE_HTTP_MAX_KEEPALIVE_CONNECTIONS` kết nối nhàn rỗi để dùng lại.
+    """
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def _bucket(self) -> str:
+        return settings.SUPABASE_BUCKET_NAME
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=f"{settings.SUPABASE_URL}/storage/v1",
+                headers={
+                    "apikey": settings.SUPABASE_KEY,
+                    "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+                },
+                timeout=settings.STORAGE_HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.STORAGE_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.STORAGE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.STORAGE_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                ),
             )
-            logger.info("✓ Kết nối Supabase thành công")
-        except Exception as e:
-            logger.error(f"✗ Lỗi kết nối Supabase: {str(e)}")
-            raise
+            logger.info("✓ Khởi tạo kết nối Supabase Storage")
+        return self._http
+
+    def _object_url(self, file_path: str) -> str:
+        return f"/object/{self._bucket}/{quote(file_path)}"
+
+    async def open_upload(self, file_path: str, content_type: Optional[str] = None) -> StorageUpload:
+        return await _SupabaseResumableUpload._open(self._client(), file_path, content_type)
+
+    async def delete(self, file_path: str) -> None:
+        response = await self._client().request(
+            "DELETE", f"/object/{self._bucket}", json={"prefixes": [file_path]}
+        )
+        response.raise_for_status()
+
+    def public_url(self, file_path: str) -> str:
+        return f"{settings.SUPABASE_URL}/storage/v1/object/public/{self._bucket}/{quote(file_path)}"
+
+    def signed_url(self, file_path: str, expires: int) -> str:
+        # Cùng định dạng token với API createSignedUrl: JWT ký bằng JWT secret của project
+        if not settings.SUPABASE_JWT_SECRET:
+            raise ValueError("Chưa cấu hình SUPABASE_JWT_SECRET để ký URL Supabase")
+        token = jwt.encode(
+            {"url": f"{self._bucket}/{file_path}", "exp": expires},
+            settings.SUPABASE_JWT_SECRET,
+            algorithm="HS256",
+        )
+        return (
+            f"{settings.SUPABASE_URL}/storage/v1/object/sign/{self._bucket}/"
+            f"{quote(file_path)}?{urlencode({'token': token})}"
+        )
+
+    async def create_signed_upload_url(self, file_path: str, content_type: str) -> dict:
+        response = await self._client().post(
+            f"/object/upload/sign/{self._bucket}/{quote(file_path)}"
+        )
+        response.raise_for_status()
+        url = f"{settings.SUPABASE_URL}/storage/v1{response.json()['url']}"
+        return {"url": url, "method": "PUT", "headers": {"Content-Type": content_type}}
+
+    async def get_file_info(self, file_path: str) -> Optional[dict]:
+        folder, _, name = file_path.rpartition("/")
+        response = await self._client().post(
+            f"/object/list/{self._bucket}",
+            json={"prefix": folder, "search": name, "limit": 100, "offset": 0},
+        )
+        response.raise_for_status()
+        for item in response.json():
+            if item.get("name") == name and item.get("metadata"):
+                metadata = item["metadata"]
+                return {"size": metadata.get("size", 0), "content_type": metadata.get("mimetype")}
+        return None
+
+    async def iter_file(self, file_path: str, chunk_size: int) -> AsyncIterator[bytes]:
+        async with self._client().stream("GET", self._object_url(file_path)) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+    async def move(self, source_path: str, destination_path: str) -> None:
+        response = await self._client().post(
+            "/object/move",
+            json={
+                "bucketId": self._bucket,
+                "sourceKey": source_path,
+                "destinationKey": destination_path,
+            },
+        )
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
-    return _storage_client
 
+_BACKENDS: dict[str, type[StorageBackend]] = {
+    "supabase": SupabaseStorageBackend,
+    "local": LocalStorageBackend,
+}
 
-def upload_file_to_storage(
+# Biến toàn cục để lưu trữ backend singleton
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Trả về backend lưu trữ theo `STORAGE_BACKEND` (singleton).
+
+    Raises:
+        ValueError: Nếu `STORAGE_BACKEND` không được hỗ trợ
+    """
+    global _storage
+
+    if _storage is None:
+        backend = _BACKENDS.get(settings.STORAGE_BACKEND)
+        if backend is None:
+            raise ValueError(f"STORAGE_BACKEND không hỗ trợ: {settings.STORAGE_BACKEND}")
+        _storage = backend()
+
+    return _storage
+
+
+async def close_storage() -> None:
+    """Đóng pool kết nối của backend (gọi khi shutdown)."""
+    if _storage is not None:
+        await _storage.close()
+
+
+# --- Hàm tiện ích ---
+
+
+async def open_upload(file_path: str, content_type: Optional[str] = None) -> StorageUpload:
+    """Bắt đầu upload theo chunk tới `file_path`.
+
+    Raises:
+        Exception: Nếu không khởi tạo được upload
+    """
+    return await get_storage().open_upload(file_path, content_type)
+
+
+async def upload_file_to_storage(
     file: BinaryIO, file_path: str, content_type: Optional[str] = None
-) -> str:
-    """Tải file lên Supabase Storage.
+) -> None:
+    """Tải file lên storage.
+
+    File được đọc (trong threadpool) và gửi theo chunk `MEDIA_UPLOAD_CHUNK_SIZE`,
+    không nạp cả file vào bộ nhớ. URL của file dựng bằng `get_media_url`.
 
     Args:
         file: File object từ UploadFile.file
         file_path: Đường dẫn đích trong bucket (ví dụ: customers/123/avatar.jpg)
         content_type: MIME type của file (tùy chọn)
 
-    Returns:
-        str: URL công khai của file vừa tải lên
-
     Raises:
         Exception: Nếu tải lên thất bại
     """
     try:
-        client = get_storage_client()
-
-        # Đọc nội dung file
-        file_content = file.read()
-        file.seek(0)  # Reset pointer để có thể đọc lại nếu cần
-
-        # Tải lên Supabase Storage
-        response = client.storage.from_(settings.SUPABASE_BUCKET_NAME).upload(
-            path=file_path,
-            file=file_content,
-            file_options={"content-type": content_type},
-        )
+        upload = await open_upload(file_path, content_type)
+        try:
+            while chunk := await run_in_threadpool(file.read, settings.MEDIA_UPLOAD_CHUNK_SIZE):
+                await upload.write(chunk)
+            await upload.complete()
+        except BaseException:
+            await upload.abort()
+            raise
+        finally:
+            file.seek(0)  # Reset pointer để có thể đọc lại nếu cần
 
         logger.info(f"✓ Tải file lên thành công: {file_path}")
 
-        # Lấy URL công khai
-        public_url = get_public_url(file_path)
-        return public_url
-
     except Exception as e:
         logger.error(f"✗ Lỗi tải file: {str(e)}")
         raise
 
 
-def delete_file_from_storage(file_path: str) -> bool:
-    """Xóa file khỏi Supabase Storage.
+async def delete_file_from_storage(file_path: str) -> bool:
+    """Xóa file khỏi storage.
 
     Args:
         file_path: Đường dẫn file trong bucket
@@ -95,14 +501,10 @@ def delete_file_from_storage(file_path: str) -> bool:
         bool: True nếu xóa thành công
 
     Raises:
-        Exception: Nếu file không tìm thấy hoặc xóa thất bại
+        Exception: Nếu xóa thất bại
     """
     try:
-        client = get_storage_client()
-
-        # Xóa file từ Supabase Storage
-        client.storage.from_(settings.SUPABASE_BUCKET_NAME).remove([file_path])
-
+        await get_storage().delete(file_path)
         logger.info(f"✓ Xóa file thành công: {file_path}")
         return True
 
@@ -112,28 +514,138 @@ def delete_file_from_storage(file_path: str) -> bool:
 
 
 def get_public_url(file_path: str) -> str:
-    """Lấy URL công khai của file trong Supabase Storage.
+    """Lấy URL công khai của file (dựng cục bộ, không gọi mạng).
+
+    Qua CDN nếu có `MEDIA_CDN_BASE_URL` (CDN trỏ tới gốc bucket).
 
     Args:
         file_path: Đường dẫn file trong bucket
 
     Returns:
         str: URL công khai đầy đủ
+    """
+    if settings.MEDIA_CDN_BASE_URL:
+        return f"{settings.MEDIA_CDN_BASE_URL.rstrip('/')}/{quote(file_path)}"
+    return get_storage().public_url(file_path)
+
+
+def get_signed_url(file_path: str, expires_in: Optional[int] = None) -> str:
+    """Lấy URL có hạn để đọc file trong bucket private (ký cục bộ, không gọi mạng).
+
+    Hạn được làm tròn theo cửa sổ `expires_in`: URL giữ nguyên trong suốt một
+    cửa sổ nên trình duyệt/CDN vẫn cache được, và còn hiệu lực ít nhất
+    `expires_in` giây.
+
+    Args:
+        file_path: Đường dẫn file trong bucket
+        expires_in: Thời hạn tối thiểu (giây), mặc định MEDIA_SIGNED_URL_EXPIRE_SECONDS
+
+    Returns:
+        str: URL đã ký (qua CDN: tham số `expires`, `signature`)
+
+    Raises:
+        ValueError: Nếu thiếu khóa ký của backend
+    """
+    ttl = expires_in or settings.MEDIA_SIGNED_URL_EXPIRE_SECONDS
+    expires = (int(time.time()) // ttl + 2) * ttl
+    if settings.MEDIA_CDN_BASE_URL:
+        query = urlencode({"expires": expires, "signature": _url_signature(file_path, expires)})
+        return f"{get_public_url(file_path)}?{query}"
+    return get_storage().signed_url(file_path, expires)
+
+
+def get_media_url(file_path: str) -> str:
+    """URL trả cho client: ký có hạn nếu `MEDIA_SIGNED_URLS`, ngược lại URL công khai."""
+    if settings.MEDIA_SIGNED_URLS:
+        return get_signed_url(file_path)
+    return get_public_url(file_path)
+
+
+async def create_signed_upload_url(file_path: str, content_type: str) -> dict:
+    """Tạo URL để client tải file lên trực tiếp storage (không qua API).
+
+    Args:
+        file_path: Đường dẫn đích trong bucket
+        content_type: MIME type client sẽ gửi
+
+    Returns:
+        dict: {"url", "method", "headers"} mô tả request client cần gửi
 
     Raises:
         Exception: Nếu không thể tạo URL
     """
     try:
-        client = get_storage_client()
+        return await get_storage().create_signed_upload_url(file_path, content_type)
 
-        # Lấy URL công khai
-        public_url = client.storage.from_(settings.SUPABASE_BUCKET_NAME).get_public_url(
-            file_path
-        )
+    except Exception as e:
+        logger.error(f"✗ Lỗi tạo URL tải lên: {str(e)}")
+        raise
+
+
+async def get_file_info(file_path: str) -> Optional[dict]:
+    """Lấy kích thước và MIME type của file đã có trong storage.
+
+    Args:
+        file_path: Đường dẫn file trong bucket
+
+    Returns:
+        dict {"size", "content_type"} hoặc None nếu file chưa tồn tại
+    """
+    try:
+        return await get_storage().get_file_info(file_path)
+
+    except Exception as e:
+        logger.error(f"✗ Lỗi lấy thông tin file: {str(e)}")
+        raise
+
+
+async def download_file(file_path: str) -> bytes:
+    """Tải toàn bộ nội dung file từ storage.
+
+    Args:
+        file_path: Đường dẫn file trong bucket
+
+    Returns:
+        bytes: Nội dung file
 
-        logger.info(f"✓ Lấy URL công khai: {public_url}")
-        return public_url
+    Raises:
+        Exception: Nếu file không tồn tại hoặc tải thất bại
+    """
+    try:
+        return b"".join([chunk async for chunk in iter_file(file_path)])
+
+    except Exception as e:
+        logger.error(f"✗ Lỗi tải file từ storage: {str(e)}")
+        raise
+
+
+async def move_file(source_path: str, destination_path: str) -> None:
+    """Di chuyển file trong storage (không tải qua API).
+
+    Args:
+        source_path: Đường dẫn hiện tại
+        destination_path: Đường dẫn mới
+
+    Raises:
+        Exception: Nếu di chuyển thất bại
+    """
+    try:
+        await get_storage().move(source_path, destination_path)
+        logger.info(f"✓ Di chuyển file: {source_path} -> {destination_path}")
 
     except Exception as e:
-        logger.error(f"✗ Lỗi lấy URL: {str(e)}")
+        logger.error(f"✗ Lỗi di chuyển file: {str(e)}")
         raise
+
+
+def iter_file(file_path: str, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Đọc nội dung file từ storage theo chunk (không nạp cả file vào bộ nhớ).
+
+    Args:
+        file_path: Đường dẫn file trong bucket
+        chunk_size: Kích thước chunk (mặc định MEDIA_UPLOAD_CHUNK_SIZE)
+
+    Raises:
+        Exception: Nếu file không tồn tại hoặc tải thất bại
+    """
+    return get_storage().iter_file(file_path, chunk_size or settings.MEDIA_UPLOAD_CHUNK_SIZE)
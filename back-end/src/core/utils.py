@@ -4,10 +4,18 @@ Bao gồm: phone number normalize, formatters, validators, datetime utilities, v
 """
 
 import re
+import unicodedata
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
 
+# Số đã ở dạng chuẩn (đường đi phổ biến nhất: dữ liệu từ form đã validate)
+_CANONICAL_PHONE_RE = re.compile(r"0\d{9}")
+_NON_DIGIT_RE = re.compile(r"\D")
+# Tiền tố 0 / 84 / 884 (+84 sau khi bỏ ký tự không phải số) + 9 chữ số
+_PHONE_DIGITS_RE = re.compile(r"(?:0|84|884)(\d{9})")
+
+
 def normalize_phone_number(phone: str) -> str:
     """Chuẩn hóa số điện thoại Việt Nam.
 
@@ -16,6 +24,9 @@ def normalize_phone_number(phone: str) -> str:
     - +84912345678 → 0912345678
     - 84912345678 → 0912345678
 
+    Dùng regex biên dịch sẵn; chuỗi đã chuẩn được trả về nguyên vẹn mà không
+    tạo chuỗi trung gian nào.
+
     Args:
             phone: Chuỗi số điện thoại
 
@@ -25,29 +36,20 @@ def normalize_phone_number(phone: str) -> str:
     Raises:
             ValueError: Nếu số điện thoại không hợp lệ
     """
-    # Loại bỏ khoảng trắng
-    phone = phone.strip()
-
-    # Xóa tất cả ký tự không phải số
-    phone = re.sub(r"\D", "", phone)
-
-    # Xử lý +84 → 0
-    if phone.startswith("84"):
-        phone = "0" + phone[2:]
+    if _CANONICAL_PHONE_RE.fullmatch(phone):
+        return phone
 
-    # Xử lý country code Việt Nam (84)
-    if phone.startswith("884"):
-        phone = "0" + phone[3:]
+    # Xóa tất cả ký tự không phải số (khoảng trắng, +, -, .)
+    digits = _NON_DIGIT_RE.sub("", phone)
 
-    # Kiểm tra độ dài hợp lệ (số di động VN: 10 chữ số, bắt đầu 0)
-    if not phone.startswith("0") or len(phone) != 10:
-        raise ValueError(f"Số điện thoại không hợp lệ: {phone}")
+    match = _PHONE_DIGITS_RE.fullmatch(digits)
+    if match is None:
+        raise ValueError(f"Số điện thoại không hợp lệ: {digits}")
 
-    # Kiểm tra định dạng (phải là 0 + 9 chữ số)
-    if not re.match(r"^0\d{9}$", phone):
-        raise ValueError(f"Số điện thoại không hợp lệ: {phone}")
-
-    return phone
+    # Số di động VN: 10 chữ số, bắt đầu 0
+    if digits[0] == "0":
+        return digits
+    return "0" + match.group(1)
 
 
 def validate_phone_number(phone: str) -> bool:
@@ -85,6 +87,32 @@ def validate_full_name(name: Optional[str]) -> bool:
     return True
 
 
+# ============================================================================
+# SEARCH TEXT UTILITIES
+# ============================================================================
+
+# "đ" không phải ký tự tổ hợp nên NFD không tách được, cần thay thủ công
+_VIETNAMESE_D_TABLE = str.maketrans({"đ": "d", "Đ": "D"})
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_search_text(text: str) -> str:
+    """Chuẩn hóa chuỗi để tìm kiếm không dấu.
+
+    Bỏ dấu tiếng Việt, chuyển chữ thường và gộp khoảng trắng:
+    "  Nguyễn   Văn Đức " → "nguyen van duc"
+
+    Args:
+            text: Chuỗi gốc
+
+    Returns:
+            Chuỗi đã chuẩn hóa
+    """
+    decomposed = unicodedata.normalize("NFD", text.translate(_VIETNAMESE_D_TABLE))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE_RE.sub(" ", stripped).strip().lower()
+
+
 # ============================================================================
 # DATETIME UTILITIES
 # ============================================================================
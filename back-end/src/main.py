@@ -3,17 +3,65 @@
 Bao gồm cấu hình CORS cơ bản và gắn router của module auth.
 """
 
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from fastapi import Depends, FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.core.background_tasks import scheduler
 from src.core.config import settings
+from src.core.db import dispose_engines
+from src.core.http_cache import conditional_cache, make_etag
+from src.core.jwt_keys import is_asymmetric, key_ring
+from src.core.password_hasher import password_hasher
+from src.core.storage import close_storage
 from src.modules.auth.router import router as auth_router, admin_router
+from src.modules.customers.phone_index import rebuild_phone_index
 from src.modules.customers.router import router as customers_router
+from src.modules.notifications.outbox import outbox_sender
+from src.modules.media.derivatives import derivative_pipeline
 from src.modules.media.router import router as media_router
 from src.modules.catalog.router import router as catalog_router
 
 
-app = FastAPI(title="Spa Backend API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Quản lý vòng đời ứng dụng.
+
+    - Startup: nạp key ring JWT, dựng bloom filter SĐT khách hàng, khởi động các
+      job dọn dẹp định kỳ và bộ gửi email outbox
+    - Shutdown: dừng các tác vụ nền, process pool hash mật khẩu và tạo ảnh phái
+      sinh, giải phóng connection pool (DB và storage)
+    """
+    if is_asymmetric():
+        # Parse khóa trước request đầu tiên; thiếu thư mục/khóa phải dừng khởi động
+        await run_in_threadpool(key_ring.reload)
+        await run_in_threadpool(key_ring.signing_key)
+    try:
+        await run_in_threadpool(rebuild_phone_index)
+    except Exception as e:
+        # Filter chưa sẵn sàng thì mọi tra cứu SĐT đi thẳng xuống DB
+        logger.warning(f"✗ Không dựng được bloom filter SĐT: {e}")
+    if settings.CLEANUP_JOBS_ENABLED:
+        scheduler.start()
+    if settings.EMAIL_OUTBOX_ENABLED:
+        outbox_sender.start()
+    yield
+    await outbox_sender.stop()
+    await scheduler.stop()
+    await derivative_pipeline.stop()
+    await close_storage()
+    password_hasher.shutdown()
+    await dispose_engines()
+
+
+app = FastAPI(title="Spa Backend API", lifespan=lifespan)
 
 # Cấu hình CORS
 app.add_middleware(
@@ -22,14 +70,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cho phép frontend đọc các header caching/phân trang (Last-Modified: JWKS)
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "X-Total-Count"],
 )
 
 
 @app.get("/health")
 def healthcheck():
-    """Endpoint kiểm tra tình trạng ứng dụng."""
+    """Endpoint kiểm tra tình trạng ứng dụng (kèm hàng đợi hash mật khẩu, số liệu job)."""
+
+    return {
+        "status": "ok",
+        "password_hasher": password_hasher.stats(),
+        "jobs": scheduler.stats(),
+        "email_outbox": outbox_sender.stats(),
+        "media_derivatives": derivative_pipeline.stats(),
+    }
+
+
+_JWKS_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _jwks_validators() -> tuple[str, datetime]:
+    """ETag theo tập kid hiện có; Last-Modified theo khóa mới nhất."""
+    if not is_asymmetric():
+        return make_etag("jwks"), _JWKS_EPOCH
+    keys = key_ring.keys()
+    newest = keys[-1].created_at if keys else _JWKS_EPOCH
+    return make_etag("jwks", *(key.kid for key in keys)), newest
+
+
+@app.get(
+    "/.well-known/jwks.json",
+    dependencies=[Depends(conditional_cache(_jwks_validators, settings.JWT_JWKS_MAX_AGE))],
+)
+def jwks():
+    """Public key xác minh JWT (RS256/EdDSA) cho gateway/dịch vụ khác.
+
+    Rỗng khi ALGORITHM là HS256 (khóa đối xứng không được công bố).
+    """
 
-    return {"status": "ok"}
+    if not is_asymmetric():
+        return {"keys": []}
+    return key_ring.jwks()
 
 
 # Include routers
@@ -3,23 +3,26 @@
 Đã được tái cấu trúc để hỗ trợ transaction và RBAC.
 """
 
+import logging
 import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
 from src.core.config import settings
-from src.core.email import send_verification_email
+from src.core.email import queue_verification_email
+from src.core.password_hasher import password_hasher
 from src.core.security import create_jwt_token
-from src.core.security import hash_password as _hash_password
-from src.core.security import verify_password as _verify_password
-from src.core.utils import get_expiry_time
+from src.core.utils import get_expiry_time, is_token_expired
 from . import crud
 from .models import User
 from .token_service import create_verification_token_value
 from src.modules.customers import service as customer_service
 
+logger = logging.getLogger(__name__)
+
 
 def create_access_token_for_user(user: User) -> str:
     """Tạo access token JWT chứa user_id và danh sách roles."""
@@ -31,15 +34,24 @@ def create_access_token_for_user(user: User) -> str:
     return create_jwt_token(subject, expires)
 
 
-def register_user(db: Session, email: str, password: str) -> dict:
-    """Đăng ký tài khoản mới với email verification trong một transaction."""
+async def register_user(db: Session, email: str, password: str) -> dict:
+    """Đăng ký tài khoản mới với email verification trong một transaction.
+
+    Hash mật khẩu chạy trên process pool; phần truy cập DB chạy trên threadpool
+    để không chặn event loop. Email xác minh được ghi vào outbox và gửi nền.
+    """
     # Kiểm tra email không trùng lặp
-    if crud.get_user_by_email(db, email):
+    if await run_in_threadpool(crud.get_user_by_email, db, email):
         raise ValueError("Email đã tồn tại")
 
+    pwd_hash = await password_hasher.hash(password)
+    return await run_in_threadpool(_create_registered_user, db, email, pwd_hash)
+
+
+def _create_registered_user(db: Session, email: str, pwd_hash: str) -> dict:
+    """Tạo user, vai trò mặc định, hồ sơ khách hàng, token xác minh và email xác minh."""
     try:
         # 1. Tạo User
-        pwd_hash = _hash_password(password)
         user = crud.create_user(db, email=email, password_hash=pwd_hash)
         db.flush() # Flush để user object có ID trước khi gán vào các object khác
 
@@ -59,6 +71,9 @@ def register_user(db: Session, email: str, password: str) -> dict:
             db, user_id=user.id, token=vtoken, expires_at=expires_at
         )
 
+        # 5. Ghi email xác minh vào outbox, cùng transaction với token
+        queue_verification_email(db, email, vtoken)
+
         # Commit tất cả thay đổi vào CSDL
         db.commit()
 
@@ -67,41 +82,103 @@ def register_user(db: Session, email: str, password: str) -> dict:
         db.rollback()
         raise e
 
-    # 5. Gửi email xác minh (chỉ gửi sau khi đã commit thành công)
-    send_verification_email(email, vtoken)
-
     return {
         "id": user.id,
         "email": user.email,
         "message": "Đăng ký thành công. Vui lòng xác minh email",
     }
 
-def login_user(db: Session, email: str, password: str) -> tuple[str, str, User]:
-    """Đăng nhập: trả về (access_token, refresh_token, user)."""
-    user = crud.get_user_by_email(db, email)
-    if not user or not _verify_password(password, user.password_hash):
+async def login_user(db: Session, email: str, password: str) -> tuple[str, str, User]:
+    """Đăng nhập: trả về (access_token, refresh_token, user).
+
+    Raises:
+        ValueError: Sai thông tin đăng nhập
+        PermissionError: Tài khoản chưa kích hoạt
+        PasswordHasherBusyError: Hàng đợi hash mật khẩu đã đầy
+    """
+    user = await run_in_threadpool(crud.get_user_by_email, db, email)
+    if not user or not await password_hasher.verify(password, user.password_hash):
         raise ValueError("Thông tin đăng nhập không hợp lệ")
     if not user.is_active:
         raise PermissionError("Tài khoản chưa được kích hoạt")
 
+    if password_hasher.needs_rehash(user.password_hash):
+        await _rehash_password(db, user, password)
+
+    access_token, refresh_token = await run_in_threadpool(_issue_tokens, db, user)
+    return access_token, refresh_token, user
+
+
+async def _rehash_password(db: Session, user: User, password: str) -> None:
+    """Hash lại mật khẩu theo scheme/cost hiện tại (chỉ nâng cost).
+
+    Chỉ là tối ưu: lỗi ở đây không được làm hỏng đăng nhập.
+    """
+    user_id, old_hash = user.id, user.password_hash
+    try:
+        new_hash = await password_hasher.hash(password)
+        updated = await run_in_threadpool(
+            crud.update_user_password_hash, db, user_id, old_hash, new_hash
+        )
+        if updated:
+            logger.info(f"✓ Đã hash lại mật khẩu user {user_id} (cost {password_hasher.rounds})")
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.warning(f"✗ Không hash lại được mật khẩu user {user_id}: {e}")
+
+
+def _issue_tokens(db: Session, user: User) -> tuple[str, str]:
+    """Tạo access token và lưu refresh token mới cho user."""
     access_token = create_access_token_for_user(user)
     refresh_token = secrets.token_urlsafe(48)
     crud.store_refresh_token(db, user_id=user.id, token=refresh_token)
-    return access_token, refresh_token, user
+    return access_token, refresh_token
+
 
+def rotate_refresh_token(db: Session, refresh_token: str) -> Optional[tuple[str, str]]:
+    """Đổi refresh token lấy cặp (access_token, refresh_token) mới.
 
-def refresh_access_token(db: Session, refresh_token: str) -> Optional[str]:
-    """Tạo access token mới từ refresh token hợp lệ."""
-    rt = crud.is_refresh_token_valid(db, refresh_token)
+    Token cũ bị thu hồi, token mới thuộc cùng family. Nếu token đã thu hồi bị
+    dùng lại (token bị lộ hoặc bị đánh cắp), thu hồi cả family và trả về None.
+    """
+    rt = crud.get_refresh_token(db, refresh_token)
     if not rt:
         return None
 
-    user = db.get(User, rt.user_id)
+    user_id, family_id = rt.user_id, rt.family_id
+    if rt.is_revoked:
+        logger.warning(
+            f"✗ Refresh token bị dùng lại (user {user_id}), thu hồi family {family_id}"
+        )
+        crud.revoke_refresh_token_family(db, family_id)
+        return None
+    if is_token_expired(rt.expires_at):
+        return None
+
+    user = db.get(User, user_id)
     if not user or not user.is_active:
         return None
-    return create_access_token_for_user(user)
+
+    if not crud.consume_refresh_token(db, rt):
+        # Một request khác vừa đổi chính token này: cũng là dùng lại
+        db.rollback()
+        logger.warning(
+            f"✗ Refresh token bị dùng đồng thời (user {user_id}), thu hồi family {family_id}"
+        )
+        crud.revoke_refresh_token_family(db, family_id)
+        return None
+
+    access_token = create_access_token_for_user(user)
+    new_refresh_token = secrets.token_urlsafe(48)
+    # Commit cùng lúc việc thu hồi token cũ và lưu token mới
+    crud.store_refresh_token(
+        db, user_id=user_id, token=new_refresh_token, family_id=family_id
+    )
+    return access_token, new_refresh_token
 
 
 def logout_user(db: Session, refresh_token: str) -> None:
-    """Đăng xuất: thu hồi refresh token cụ thể."""
-    crud.revoke_refresh_token(db, refresh_token)
\ No newline at end of file
+    """Đăng xuất: thu hồi refresh token và cả family của nó."""
+    rt = crud.get_refresh_token(db, refresh_token)
+    if rt:
+        crud.revoke_refresh_token_family(db, rt.family_id)
\ No newline at end of file
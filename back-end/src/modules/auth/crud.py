@@ -3,13 +3,17 @@
 Đã được tái cấu trúc để hỗ trợ RBAC.
 """
 
+import hashlib
+import uuid
 from typing import Optional, List
 from datetime import datetime, timedelta
 
 from sqlmodel import Session, select, update, delete
 
 from . import schemas # Thêm import này
+from src.core.config import settings
 from src.core.utils import get_utc_now
+from .principal import invalidate_all_principals, invalidate_principal
 from .models import (
     User,
     Role,
@@ -41,8 +45,26 @@ def update_user_active(db: Session, user_id: int, is_active: bool) -> None:
     """Cập nhật trạng thái hoạt động của người dùng."""
     stmt = update(User).where(User.id == user_id).values(is_active=is_active)
     db.exec(stmt)
+    invalidate_principal(db, [user_id])
     db.commit()
 
+def update_user_password_hash(
+    db: Session, user_id: int, old_hash: str, new_hash: str
+) -> bool:
+    """Thay hash mật khẩu nếu hash hiện tại vẫn là `old_hash`.
+
+    Điều kiện trên hash cũ tránh ghi đè một lần đổi/đặt lại mật khẩu xảy ra
+    đồng thời. Trả về True nếu đã cập nhật.
+    """
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.password_hash == old_hash)
+        .values(password_hash=new_hash)
+    )
+    result = db.exec(stmt)
+    db.commit()
+    return result.rowcount > 0
+
 
 # --- Role & Permission CRUD ---
 
@@ -58,12 +80,15 @@ def assign_role_to_user(db: Session, user: User, role: Role):
     if role not in user.roles:
         user.roles.append(role)
         db.add(user)
+        if user.id is not None:
+            invalidate_principal(db, [user.id])
 
 def revoke_role_from_user(db: Session, user: User, role: Role):
     """Thu hồi vai trò từ người dùng (không commit)."""
     if role in user.roles:
         user.roles.remove(role)
         db.add(user)
+        invalidate_principal(db, [user.id])
 
 def create_role(db: Session, role_in: schemas.RoleCreate) -> Role:
     """Tạo vai trò mới."""
@@ -84,6 +109,9 @@ def get_all_roles(db: Session) -> List[Role]:
 def update_role(db: Session, db_role: Role, role_in: schemas.RoleUpdate) -> Role:
     """Cập nhật vai trò."""
     update_data = role_in.model_dump(exclude_unset=True)
+    # Đổi tên vai trò làm thay đổi roles của mọi user đang giữ nó
+    if update_data.get("name", db_role.name) != db_role.name:
+        invalidate_all_principals(db)
     db_role.sqlmodel_update(update_data)
     db.add(db_role)
     db.commit()
@@ -94,6 +122,7 @@ def delete_role(db: Session, role_id: int):
     """Xóa vai trò."""
     role = db.get(Role, role_id)
     if role:
+        invalidate_all_principals(db)
         db.delete(role)
         db.commit()
 
@@ -149,24 +178,69 @@ def delete_permission(db: Session, permission_id: int):
 
 # --- Token CRUD ---
 
-def store_refresh_token(db: Session, user_id: int, token: str) -> RefreshToken:
-    """Lưu refresh token cho user."""
-    rt = RefreshToken(user_id=user_id, token=token)
+def hash_refresh_token(token: str) -> bytes:
+    """Digest SHA-256 (32 byte) của refresh token, là khóa tra cứu trong DB."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def store_refresh_token(
+    db: Session, user_id: int, token: str, family_id: Optional[str] = None
+) -> RefreshToken:
+    """Lưu refresh token cho user (family mới nếu không truyền `family_id`)."""
+    rt = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=get_utc_now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
     db.add(rt)
     db.commit()
     db.refresh(rt)
     return rt
 
+def get_refresh_token(db: Session, token: str) -> Optional[RefreshToken]:
+    """Lấy bản ghi refresh token theo token thô (kể cả đã thu hồi/hết hạn)."""
+    stmt = select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(token))
+    return db.exec(stmt).first()
+
 def is_refresh_token_valid(db: Session, token: str) -> Optional[RefreshToken]:
-    """Kiểm tra refresh token còn hợp lệ."""
+    """Kiểm tra refresh token còn hợp lệ (chưa thu hồi và chưa hết hạn)."""
     stmt = select(RefreshToken).where(
-        (RefreshToken.token == token) & (RefreshToken.is_revoked.is_(False))
+        RefreshToken.token_hash == hash_refresh_token(token),
+        RefreshToken.is_revoked.is_(False),
+        RefreshToken.expires_at > get_utc_now(),
     )
     return db.exec(stmt).first()
 
+def consume_refresh_token(db: Session, rt: RefreshToken) -> bool:
+    """Thu hồi token để đổi lấy token mới (không commit).
+
+    Điều kiện `is_revoked = false` đảm bảo chỉ một request đồng thời đổi được
+    token; trả về False nếu request khác đã dùng nó trước.
+    """
+    stmt = (
+        update(RefreshToken)
+        .where(RefreshToken.id == rt.id, RefreshToken.is_revoked.is_(False))
+        .values(is_revoked=True)
+    )
+    return db.exec(stmt).rowcount > 0
+
+def revoke_refresh_token_family(db: Session, family_id: str) -> None:
+    """Thu hồi mọi refresh token thuộc một family."""
+    stmt = (
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.is_revoked.is_(False))
+        .values(is_revoked=True)
+    )
+    db.exec(stmt)
+    db.commit()
+
 def revoke_refresh_token(db: Session, token: str) -> None:
     """Thu hồi một refresh token cụ thể."""
-    stmt = update(RefreshToken).where(RefreshToken.token == token).values(is_revoked=True)
+    stmt = (
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+        .values(is_revoked=True)
+    )
     db.exec(stmt)
     db.commit()
 
@@ -216,4 +290,32 @@ def delete_reset_token(db: Session, token: str) -> None:
     """Xóa token đặt lại mật khẩu sau khi sử dụng thành công."""
     stmt = delete(ResetPasswordToken).where(ResetPasswordToken.token == token)
     db.exec(stmt)
-    db.commit()
\ No newline at end of file
+    db.commit()
+
+
+# --- Dọn dẹp token hết hạn (chạy bởi src.core.background_tasks) ---
+
+def _delete_expired_batch(db: Session, model, batch_size: int) -> int:
+    """Xóa tối đa `batch_size` dòng hết hạn của `model` trong một transaction."""
+    expired_ids = (
+        select(model.id).where(model.expires_at < get_utc_now()).limit(batch_size)
+    )
+    result = db.exec(delete(model).where(model.id.in_(expired_ids)))
+    db.commit()
+    return result.rowcount
+
+def delete_expired_verification_tokens(db: Session, batch_size: int) -> int:
+    """Xóa một lô token xác minh email đã hết hạn; trả về số dòng đã xóa."""
+    return _delete_expired_batch(db, VerificationToken, batch_size)
+
+def delete_expired_reset_tokens(db: Session, batch_size: int) -> int:
+    """Xóa một lô token đặt lại mật khẩu đã hết hạn; trả về số dòng đã xóa."""
+    return _delete_expired_batch(db, ResetPasswordToken, batch_size)
+
+def delete_expired_refresh_tokens(db: Session, batch_size: int) -> int:
+    """Xóa một lô refresh token đã hết hạn; trả về số dòng đã xóa.
+
+    Token đã thu hồi nhưng chưa hết hạn được giữ lại để phát hiện dùng lại.
+    """
+    return _delete_expired_batch(db, RefreshToken, batch_size)
+
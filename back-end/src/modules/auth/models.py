@@ -6,7 +6,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Column, Field, LargeBinary, Relationship, SQLModel
 
 from src.core.utils import get_utc_now
 
@@ -68,11 +68,20 @@ class User(SQLModel, table=True):
 # --- Các bảng Token (không thay đổi) ---
 
 class RefreshToken(SQLModel, table=True):
-    """Lưu refresh token dạng opaque, có thể thu hồi."""
+    """Refresh token opaque, có thể thu hồi.
+
+    Chỉ lưu digest SHA-256 (32 byte) của token. Mỗi lần `/auth/refresh` token cũ
+    bị thu hồi và token mới cùng `family_id` được cấp; dùng lại một token đã
+    thu hồi sẽ thu hồi cả family (dấu hiệu token bị đánh cắp).
+    """
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True, nullable=False)
-    token: str = Field(index=True, unique=True, nullable=False)
+    token_hash: bytes = Field(
+        sa_column=Column(LargeBinary(32), unique=True, index=True, nullable=False)
+    )
+    family_id: str = Field(index=True, max_length=32, nullable=False)
     is_revoked: bool = Field(default=False, nullable=False)
+    expires_at: datetime = Field(index=True, nullable=False)
     created_at: datetime = Field(default_factory=get_utc_now, nullable=False)
 
 
@@ -81,7 +90,7 @@ class VerificationToken(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True, nullable=False)
     token: str = Field(index=True, unique=True, nullable=False)
-    expires_at: datetime = Field(nullable=False)
+    expires_at: datetime = Field(index=True, nullable=False)
     created_at: datetime = Field(default_factory=get_utc_now, nullable=False)
 
 
@@ -90,5 +99,5 @@ class ResetPasswordToken(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True, nullable=False)
     token: str = Field(index=True, unique=True, nullable=False)
-    expires_at: datetime = Field(nullable=False)
+    expires_at: datetime = Field(index=True, nullable=False)
     created_at: datetime = Field(default_factory=get_utc_now, nullable=False)
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""Principal: danh tính đã xác thực của request, tách khỏi ORM User.
+
+Access token đã chứa `sub` và `roles`; principal được dựng từ claims và đối
+chiếu với một cache in-process (TTL ngắn) thay vì truy vấn User + roles ở mọi
+request. Cache được vô hiệu hóa khi trạng thái hoặc vai trò của user thay đổi
+(sau khi transaction commit).
+
+Lưu ý: cache nằm trong bộ nhớ từng worker; worker khác thấy thay đổi sau tối
+đa `AUTH_PRINCIPAL_CACHE_TTL_SECONDS`.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+
+from src.core.cache import TTLCache
+from src.core.config import settings
+
+from .models import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Người dùng đã xác thực.
+
+    Attributes:
+        id: ID người dùng
+        roles: Tên các vai trò
+        email: Email (None nếu dựng thuần từ claims)
+        is_active: Trạng thái hoạt động
+        from_claims: True nếu chỉ dựa vào claims của token, chưa đối chiếu DB
+    """
+
+    id: int
+    roles: frozenset[str]
+    email: Optional[str] = None
+    is_active: bool = True
+    from_claims: bool = False
+
+    def has_any_role(self, *roles: str) -> bool:
+        return not self.roles.isdisjoint(roles)
+
+
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# Key trong Session.info chứa các user_id cần vô hiệu hóa khi commit
+_PENDING_INVALIDATIONS = "principal_invalidations"
+# Key trong Session.info đánh dấu cần xóa toàn bộ principal cache khi commit
+_PENDING_FULL_INVALIDATION = "principal_invalidate_all"
+
+
+def principal_from_claims(payload: dict[str, Any]) -> Principal:
+    """Dựng principal chỉ từ claims của access token (không truy vấn DB).
+
+    Raises:
+        ValueError: Nếu thiếu `sub` hoặc claims sai kiểu
+    """
+    user_id = payload.get("sub")
+    if not user_id:
+        raise ValueError("Token thiếu sub")
+    roles = payload.get("roles") or []
+    if not isinstance(roles, list):
+        raise ValueError("Claim roles không hợp lệ")
+    return Principal(id=int(user_id), roles=frozenset(roles), from_claims=True)
+
+
+def load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    """Lấy principal theo user_id, ưu tiên cache (kể cả user không hoạt động)."""
+    key = (user_id,)
+    cached = principal_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = principal_cache.version(user_id)
+    statement = select(User).where(User.id == user_id).options(selectinload(User.roles))
+    user = db.exec(statement).first()
+    if not user:
+        return None
+
+    principal = Principal(
+        id=user.id,
+        roles=frozenset(role.name for role in user.roles),
+        email=user.email,
+        is_active=user.is_active,
+    )
+    principal_cache.set(key, principal, version=version)
+    return principal
+
+
+def invalidate_principal(db: Session, user_ids: Iterable[int]) -> None:
+    """Đánh dấu principal của các user cần xóa khỏi cache khi `db` commit.
+
+    Vô hiệu hóa sau commit (thay vì ngay lập tức) để request đồng thời không
+    nạp lại dữ liệu cũ vào cache trước khi thay đổi được ghi.
+    """
+    db.info.setdefault(_PENDING_INVALIDATIONS, set()).update(user_ids)
+
+
+def invalidate_all_principals(db: Session) -> None:
+    """Đánh dấu xóa toàn bộ principal cache khi `db` commit.
+
+    Dùng khi thay đổi ảnh hưởng nhiều user cùng lúc (đổi tên, xóa vai trò) để
+    không phải nạp danh sách user chỉ để lấy ID.
+    """
+    db.info[_PENDING_FULL_INVALIDATION] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session: Session) -> None:
+    user_ids = session.info.pop(_PENDING_INVALIDATIONS, None)
+    if session.info.pop(_PENDING_FULL_INVALIDATION, False):
+        principal_cache.invalidate_all()
+    elif user_ids:
+        principal_cache.invalidate(*user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS, None)
+    session.info.pop(_PENDING_FULL_INVALIDATION, None)
@@ -11,9 +11,11 @@ from typing import List
 from src.core.config import settings
 from src.core.db import get_session
 from src.core.dependencies import get_current_user, get_admin_user
+from src.core.password_hasher import PasswordHasherBusyError
 from . import schemas
 from . import auth_service, token_service, crud
 from .models import User, Role, Permission
+from .principal import Principal
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -123,7 +125,7 @@ def remove_permission_from_role(role_id: int, permission_id: int, db: Session =
     status_code=status.HTTP_201_CREATED,
     response_model=schemas.MessageResponse,
 )
-def register(payload: schemas.RegisterRequest, db: Session = Depends(get_session)):
+async def register(payload: schemas.RegisterRequest, db: Session = Depends(get_session)):
     """Đăng ký tài khoản mới, gửi email xác minh.
 
     Args:
@@ -134,10 +136,12 @@ def register(payload: schemas.RegisterRequest, db: Session = Depends(get_session
             MessageResponse với thông tin đăng ký thành công
     """
     try:
-        result = auth_service.register_user(db, payload.email, payload.password)
+        result = await auth_service.register_user(db, payload.email, payload.password)
         return schemas.MessageResponse(message=result["message"], email=result["email"])
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @router.post("/verify-email", response_model=schemas.MessageResponse)
@@ -204,8 +208,21 @@ def resend_verification_email(
         raise HTTPException(status_code=500, detail=f"Lỗi: {str(e)}")
 
 
+def _set_refresh_cookie(response: Response, refresh_token: str) -> None:
+    """Set cookie HTTP-only cho refresh token."""
+    response.set_cookie(
+        key=settings.REFRESH_TOKEN_COOKIE_NAME,
+        value=refresh_token,
+        httponly=True,
+        samesite="lax",
+        secure=False,
+        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+        path="/",
+    )
+
+
 @router.post("/login", response_model=schemas.TokenResponse)
-def login(
+async def login(
     payload: schemas.LoginRequest,
     response: Response,
     db: Session = Depends(get_session),
@@ -221,24 +238,17 @@ def login(
             TokenResponse chứa access token
     """
     try:
-        access_token, refresh_token, user = auth_service.login_user(
+        access_token, refresh_token, user = await auth_service.login_user(
             db, payload.email, payload.password
         )
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
+    except PasswordHasherBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    # Set cookie HTTP-only cho refresh token
-    response.set_cookie(
-        key=settings.REFRESH_TOKEN_COOKIE_NAME,
-        value=refresh_token,
-        httponly=True,
-        samesite="lax",
-        secure=False,
-        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
-        path="/",
-    )
+    _set_refresh_cookie(response, refresh_token)
     return schemas.TokenResponse(access_token=access_token)
 
 
@@ -252,6 +262,9 @@ def refresh(
 ):
     """Gia hạn Access Token dựa trên Refresh Token từ cookie.
 
+    Refresh Token được xoay vòng: cookie được thay bằng token mới, token cũ
+    không dùng lại được (dùng lại sẽ thu hồi cả phiên đăng nhập).
+
     Args:
             response: Response object
             db: Session cơ sở dữ liệu
@@ -263,9 +276,12 @@ def refresh(
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Thiếu refresh token")
 
-    new_access = auth_service.refresh_access_token(db, refresh_token)
-    if not new_access:
+    tokens = auth_service.rotate_refresh_token(db, refresh_token)
+    if not tokens:
         raise HTTPException(status_code=401, detail="Refresh token không hợp lệ")
+
+    new_access, new_refresh = tokens
+    _set_refresh_cookie(response, new_refresh)
     return schemas.TokenResponse(access_token=new_access)
 
 
@@ -295,16 +311,21 @@ def logout(
 
 
 @router.get("/me", response_model=schemas.UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_session),
+):
     """Lấy thông tin của người dùng đang đăng nhập.
 
     Yêu cầu JWT token hợp lệ.
     """
+    # Principal chỉ giữ tên role; response cần chi tiết Role nên đọc từ DB
+    user = crud.get_user_by_id(db, current_user.id)
     return schemas.UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        roles=current_user.roles,  # Trả về list object Role đã được eager load
-        is_active=current_user.is_active,
+        id=user.id,
+        email=user.email,
+        roles=user.roles,
+        is_active=user.is_active,
     )
 
 
@@ -330,7 +351,7 @@ def password_reset(
 
 
 @router.post("/confirm-password-reset", response_model=schemas.MessageResponse)
-def confirm_password_reset(
+async def confirm_password_reset(
     payload: schemas.ConfirmPasswordResetRequest, db: Session = Depends(get_session)
 ):
     """Xác nhận đặt lại mật khẩu (bước 2: verify token + password mới).
@@ -346,7 +367,7 @@ def confirm_password_reset(
             HTTPException 400: Nếu token invalid, hết hạn, hoặc password không hợp lệ
     """
     try:
-        result = token_service.confirm_password_reset(
+        result = await token_service.confirm_password_reset(
             db, payload.token, payload.new_password
         )
         return schemas.MessageResponse(
@@ -354,3 +375,5 @@ def confirm_password_reset(
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
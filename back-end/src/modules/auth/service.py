@@ -16,7 +16,7 @@ from .auth_service import (
 	verify_password,
 	register_user,
 	login_user,
-	refresh_access_token,
+	rotate_refresh_token,
 	logout_user,
 )
 from .token_service import (
@@ -35,7 +35,7 @@ __all__ = [
 	"verify_password",
 	"register_user",
 	"login_user",
-	"refresh_access_token",
+	"rotate_refresh_token",
 	"logout_user",
 	"create_verification_token_value",
 	"create_reset_token_value",
@@ -7,16 +7,17 @@ import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import select
 from sqlmodel import Session
 
 from src.core.config import settings
-from src.core.email import send_verification_email, send_password_reset_email
-from src.core.security import hash_password as _hash_password
-from src.core.security import verify_password as _verify_password
+from src.core.email import queue_password_reset_email, queue_verification_email
+from src.core.password_hasher import password_hasher
 from src.core.utils import get_utc_now, get_expiry_time, is_token_expired
 from . import crud
 from .models import User, VerificationToken, ResetPasswordToken
+from .principal import invalidate_principal
 
 
 def create_verification_token_value() -> str:
@@ -39,7 +40,7 @@ def initiate_email_verification(db: Session, user_id: int) -> bool:
             user_id: ID người dùng cần xác minh lại
 
     Returns:
-            True nếu gửi thành công
+            True nếu đã xếp email vào outbox
     """
     user = db.get(User, user_id)
     if not user:
@@ -57,12 +58,12 @@ def initiate_email_verification(db: Session, user_id: int) -> bool:
     crud.create_verification_token(
         db, user_id=user_id, token=vtoken, expires_at=expires_at
     )
+    # Email được gửi nền từ outbox, cùng transaction với token
+    queue_verification_email(db, user.email, vtoken)
 
-    # Commit thay đổi để token mới được lưu vào DB
+    # Commit thay đổi để token mới và email được lưu vào DB
     db.commit()
-
-    # Gửi email
-    return send_verification_email(user.email, vtoken)
+    return True
 
 
 def confirm_email(db: Session, token: str) -> dict:
@@ -103,6 +104,7 @@ def confirm_email(db: Session, token: str) -> dict:
     # Kích hoạt người dùng
     user.is_active = True
     db.add(user)
+    invalidate_principal(db, [user.id])
     db.commit()
 
     # Xóa token đã sử dụng
@@ -141,19 +143,21 @@ def initiate_password_reset(db: Session, email: str) -> bool:
     # Tạo reset token mới
     reset_token = create_reset_token_value()
     expires_at = get_expiry_time(settings.RESET_TOKEN_EXPIRE_HOURS)
+    # Email vào outbox trước; create_reset_token commit cả hai trong một transaction
+    queue_password_reset_email(db, user.email, reset_token)
     crud.create_reset_token(
         db, user_id=user.id, token=reset_token, expires_at=expires_at
     )
 
-    # Gửi email
-    send_password_reset_email(user.email, reset_token)
-
     return True
 
 
-def confirm_password_reset(db: Session, token: str, new_password: str) -> dict:
+async def confirm_password_reset(db: Session, token: str, new_password: str) -> dict:
     """Đặt lại mật khẩu từ token reset.
 
+    Hash mật khẩu mới chạy trên process pool (xem `password_hasher`), các bước
+    truy cập DB chạy trên threadpool.
+
     Args:
             db: Session cơ sở dữ liệu
             token: Token đặt lại mật khẩu
@@ -165,6 +169,26 @@ def confirm_password_reset(db: Session, token: str, new_password: str) -> dict:
     Raises:
             ValueError: Nếu token invalid, hết hạn, hoặc password không hợp lệ
     """
+    user = await run_in_threadpool(_get_user_for_reset_token, db, token)
+
+    # Validate password mới
+    if len(new_password) < 8:
+        raise ValueError("Mật khẩu phải có ít nhất 8 ký tự")
+
+    # Hash password mới
+    email = user.email
+    new_hash = await password_hasher.hash(new_password)
+    await run_in_threadpool(_apply_password_reset, db, user, token, new_hash)
+
+    return {"message": "Mật khẩu đã được đặt lại thành công", "email": email}
+
+
+def _get_user_for_reset_token(db: Session, token: str) -> User:
+    """Kiểm tra token reset và trả về user tương ứng.
+
+    Raises:
+            ValueError: Nếu token invalid, hết hạn hoặc user không tồn tại
+    """
     rt = crud.get_reset_token(db, token)
     if not rt:
         raise ValueError("Link không hợp lệ hoặc đã hết hạn")
@@ -177,13 +201,11 @@ def confirm_password_reset(db: Session, token: str, new_password: str) -> dict:
     user = db.get(User, rt.user_id)
     if not user:
         raise ValueError("Người dùng không tồn tại")
+    return user
 
-    # Validate password mới
-    if len(new_password) < 8:
-        raise ValueError("Mật khẩu phải có ít nhất 8 ký tự")
 
-    # Hash password mới
-    new_hash = _hash_password(new_password)
+def _apply_password_reset(db: Session, user: User, token: str, new_hash: str) -> None:
+    """Lưu hash mới, thu hồi refresh token cũ và xóa token reset."""
     user.password_hash = new_hash
     db.add(user)
     db.commit()
@@ -193,5 +215,3 @@ def confirm_password_reset(db: Session, token: str, new_password: str) -> dict:
 
     # Xóa reset token
     crud.delete_reset_token(db, token)
-
-    return {"message": "Mật khẩu đã được đặt lại thành công", "email": user.email}
@@ -1,11 +1,91 @@
 """CRUD operations cho module services (catalog)."""
 
+import time
 from typing import List, Optional, Type
 
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.cache import TTLCache
+from src.core.config import settings
+from src.core.pagination import apply_keyset
 
 from . import models, schemas
 
+# Cache cho các endpoint đọc catalog, namespace theo entity.
+# Mọi hàm ghi bên dưới phải gọi `_invalidate_cache` sau khi commit.
+catalog_cache = TTLCache(
+    maxsize=settings.CATALOG_CACHE_MAX_ENTRIES, ttl=settings.CATALOG_CACHE_TTL_SECONDS
+)
+
+# Entity bị ảnh hưởng khi một entity thay đổi (do response lồng nhau,
+# ví dụ ServicePackageRead chứa ServiceRead, ProductRead chứa category)
+_CACHE_DEPENDENTS = {
+    "product_category": ("product_category", "product", "service", "service_package"),
+    "product": ("product", "service", "service_package"),
+    "service_category": ("service_category", "service", "service_package"),
+    "service": ("service", "service_package"),
+    "package_category": ("package_category", "service_package"),
+    "service_package": ("service_package",),
+}
+
+
+# Thời điểm ghi gần nhất (monotonic) theo namespace, dùng để tránh cache dữ liệu
+# đọc từ replica khi replica có thể chưa kịp nhận thay đổi.
+_written_at: dict[str, float] = {}
+
+
+def _invalidate_cache(entity: str) -> None:
+    """Vô hiệu hóa cache của entity và các entity có response lồng nó."""
+    dependents = _CACHE_DEPENDENTS[entity]
+    catalog_cache.invalidate(*dependents)
+    now = time.monotonic()
+    for dependent in dependents:
+        _written_at[dependent] = now
+
+
+def written_recently(namespace: str) -> bool:
+    """True nếu namespace vừa được ghi trong vòng `CATALOG_REPLICA_LAG_SECONDS`."""
+    written_at = _written_at.get(namespace)
+    return (
+        written_at is not None
+        and time.monotonic() - written_at < settings.CATALOG_REPLICA_LAG_SECONDS
+    )
+
+# Eager-load cho các response lồng quan hệ (ProductRead, ServiceRead,
+# ServicePackageRead): số câu truy vấn cố định, không phụ thuộc số bản ghi (N+1).
+_PRODUCT_LOAD_OPTIONS = (selectinload(models.Product.category),)
+_CONSUMPTION_LOAD_OPTIONS = (
+    selectinload(models.ServiceProductConsumption.product).selectinload(models.Product.category),
+)
+_SERVICE_LOAD_OPTIONS = (
+    selectinload(models.Service.category),
+    selectinload(models.Service.consumptions)
+    .selectinload(models.ServiceProductConsumption.product)
+    .selectinload(models.Product.category),
+)
+_PACKAGE_LOAD_OPTIONS = (
+    selectinload(models.ServicePackage.category),
+    selectinload(models.ServicePackage.services).selectinload(models.Service.category),
+    selectinload(models.ServicePackage.services)
+    .selectinload(models.Service.consumptions)
+    .selectinload(models.ServiceProductConsumption.product)
+    .selectinload(models.Product.category),
+)
+
+# Các khóa sắp xếp hỗ trợ keyset pagination (cột NOT NULL, id làm tie-breaker)
+PRODUCT_SORT_COLUMNS = {
+    "id": models.Product.id,
+    "name": models.Product.name,
+    "price": models.Product.price,
+}
+SERVICE_SORT_COLUMNS = {
+    "id": models.Service.id,
+    "name": models.Service.name,
+    "price": models.Service.price,
+}
+
 # --- ProductCategory CRUD ---
 
 def create_product_category(
@@ -16,6 +96,7 @@ def create_product_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    _invalidate_cache("product_category")
     return db_category
 
 def get_product_category(db: Session, category_id: int) -> Optional[models.ProductCategory]:
@@ -29,6 +110,14 @@ def get_all_product_categories(
     statement = select(models.ProductCategory).offset(skip).limit(limit)
     return db.exec(statement).all()
 
+async def get_all_product_categories_async(
+    db: AsyncSession, *, skip: int = 0, limit: int = 100
+) -> List[models.ProductCategory]:
+    """Lấy tất cả danh mục sản phẩm (AsyncSession)."""
+    statement = select(models.ProductCategory).offset(skip).limit(limit)
+    result = await db.exec(statement)
+    return result.all()
+
 def update_product_category(
     db: Session, *, db_category: models.ProductCategory, category_in: schemas.ProductCategoryUpdate
 ) -> models.ProductCategory:
@@ -38,6 +127,7 @@ def update_product_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    _invalidate_cache("product_category")
     return db_category
 
 def delete_product_category(db: Session, *, category_id: int) -> None:
@@ -46,6 +136,7 @@ def delete_product_category(db: Session, *, category_id: int) -> None:
     if category:
         db.delete(category)
         db.commit()
+    _invalidate_cache("product_category")
 
 # --- Product CRUD ---
 
@@ -55,18 +146,49 @@ def create_product(db: Session, *, product_in: schemas.ProductCreate) -> models.
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    _invalidate_cache("product")
     return db_product
 
 def get_product(db: Session, product_id: int) -> Optional[models.Product]:
-    """Lấy sản phẩm theo ID."""
-    return db.get(models.Product, product_id)
+    """Lấy sản phẩm theo ID (eager load danh mục)."""
+    statement = (
+        select(models.Product)
+        .where(models.Product.id == product_id)
+        .options(*_PRODUCT_LOAD_OPTIONS)
+    )
+    return db.exec(statement).first()
 
 def get_all_products(
-    db: Session, *, skip: int = 0, limit: int = 100
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
 ) -> List[models.Product]:
-    """Lấy tất cả sản phẩm."""
-    statement = select(models.Product).offset(skip).limit(limit)
-    return db.exec(statement).all()
+    """Lấy danh sách sản phẩm.
+
+    Có `cursor` thì phân trang keyset (bỏ qua `skip`), ngược lại dùng offset.
+
+    Raises:
+        InvalidCursorError: Nếu khóa sắp xếp không hỗ trợ hoặc cursor không hợp lệ
+    """
+    statement = apply_keyset(
+        select(models.Product).options(*_PRODUCT_LOAD_OPTIONS),
+        PRODUCT_SORT_COLUMNS,
+        models.Product.id,
+        sort=sort,
+        order=order,
+        cursor=cursor,
+    )
+    if cursor is None:
+        statement = statement.offset(skip)
+    return db.exec(statement.limit(limit)).all()
+
+def count_products(db: Session) -> int:
+    """Đếm tổng số sản phẩm."""
+    return db.exec(select(func.count()).select_from(models.Product)).one()
 
 def update_product(
     db: Session, *, db_product: models.Product, product_in: schemas.ProductUpdate
@@ -77,6 +199,7 @@ def update_product(
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    _invalidate_cache("product")
     return db_product
 
 def delete_product(db: Session, *, product_id: int) -> None:
@@ -85,6 +208,7 @@ def delete_product(db: Session, *, product_id: int) -> None:
     if product:
         db.delete(product)
         db.commit()
+    _invalidate_cache("product")
 
 def set_primary_image_for_product(
     db: Session, *, product: models.Product, media_id: int
@@ -94,6 +218,7 @@ def set_primary_image_for_product(
     db.add(product)
     db.commit()
     db.refresh(product)
+    _invalidate_cache("product")
     return product
 
 
@@ -107,6 +232,7 @@ def create_service_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    _invalidate_cache("service_category")
     return db_category
 
 def get_service_category(db: Session, category_id: int) -> Optional[models.ServiceCategory]:
@@ -120,6 +246,14 @@ def get_all_service_categories(
     statement = select(models.ServiceCategory).offset(skip).limit(limit)
     return db.exec(statement).all()
 
+async def get_all_service_categories_async(
+    db: AsyncSession, *, skip: int = 0, limit: int = 100
+) -> List[models.ServiceCategory]:
+    """Lấy tất cả danh mục dịch vụ (AsyncSession)."""
+    statement = select(models.ServiceCategory).offset(skip).limit(limit)
+    result = await db.exec(statement)
+    return result.all()
+
 def update_service_category(
     db: Session, *, db_category: models.ServiceCategory, category_in: schemas.ServiceCategoryUpdate
 ) -> models.ServiceCategory:
@@ -129,6 +263,7 @@ def update_service_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    _invalidate_cache("service_category")
     return db_category
 
 def delete_service_category(db: Session, *, category_id: int) -> None:
@@ -137,6 +272,7 @@ def delete_service_category(db: Session, *, category_id: int) -> None:
     if category:
         db.delete(category)
         db.commit()
+    _invalidate_cache("service_category")
 
 # --- Service CRUD ---
 
@@ -146,18 +282,50 @@ def create_service(db: Session, *, service_in: schemas.ServiceCreate) -> models.
     db.add(db_service)
     db.commit()
     db.refresh(db_service)
+    _invalidate_cache("service")
     return db_service
 
 def get_service(db: Session, service_id: int) -> Optional[models.Service]:
-    """Lấy dịch vụ theo ID."""
-    return db.get(models.Service, service_id)
+    """Lấy dịch vụ theo ID (eager load danh mục và vật tư tiêu hao)."""
+    statement = (
+        select(models.Service)
+        .where(models.Service.id == service_id)
+        .options(*_SERVICE_LOAD_OPTIONS)
+        .execution_options(populate_existing=True)
+    )
+    return db.exec(statement).first()
 
 def get_all_services(
-    db: Session, *, skip: int = 0, limit: int = 100
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
 ) -> List[models.Service]:
-    """Lấy tất cả dịch vụ."""
-    statement = select(models.Service).offset(skip).limit(limit)
-    return db.exec(statement).all()
+    """Lấy danh sách dịch vụ.
+
+    Có `cursor` thì phân trang keyset (bỏ qua `skip`), ngược lại dùng offset.
+
+    Raises:
+        InvalidCursorError: Nếu khóa sắp xếp không hỗ trợ hoặc cursor không hợp lệ
+    """
+    statement = apply_keyset(
+        select(models.Service).options(*_SERVICE_LOAD_OPTIONS),
+        SERVICE_SORT_COLUMNS,
+        models.Service.id,
+        sort=sort,
+        order=order,
+        cursor=cursor,
+    )
+    if cursor is None:
+        statement = statement.offset(skip)
+    return db.exec(statement.limit(limit)).all()
+
+def count_services(db: Session) -> int:
+    """Đếm tổng số dịch vụ."""
+    return db.exec(select(func.count()).select_from(models.Service)).one()
 
 def update_service(
     db: Session, *, db_service: models.Service, service_in: schemas.ServiceUpdate
@@ -167,8 +335,8 @@ def update_service(
     db_service.sqlmodel_update(update_data)
     db.add(db_service)
     db.commit()
-    db.refresh(db_service)
-    return db_service
+    _invalidate_cache("service")
+    return get_service(db, db_service.id)
 
 def delete_service(db: Session, *, service_id: int) -> None:
     """Xóa dịch vụ."""
@@ -176,6 +344,7 @@ def delete_service(db: Session, *, service_id: int) -> None:
     if service:
         db.delete(service)
         db.commit()
+    _invalidate_cache("service")
 
 def set_primary_image_for_service(
     db: Session, *, service: models.Service, media_id: int
@@ -184,8 +353,8 @@ def set_primary_image_for_service(
     service.primary_image_id = media_id
     db.add(service)
     db.commit()
-    db.refresh(service)
-    return service
+    _invalidate_cache("service")
+    return get_service(db, service.id)
 
 
 # --- ServiceProductConsumption CRUD ---
@@ -212,8 +381,9 @@ def add_consumption_to_service(
     
     db.add(link)
     db.commit()
-    db.refresh(service) # Refresh service để thấy thay đổi trong relationship
-    return service
+    _invalidate_cache("service")
+    # Tải lại service kèm quan hệ để thấy thay đổi trong consumptions
+    return get_service(db, service.id)
 
 def remove_consumption_from_service(
     db: Session, *, service: models.Service, product_id: int
@@ -223,14 +393,18 @@ def remove_consumption_from_service(
     if link:
         db.delete(link)
         db.commit()
-        db.refresh(service)
-    return service
+    _invalidate_cache("service")
+    return get_service(db, service.id)
 
 def get_consumptions_for_service(
     db: Session, *, service_id: int
 ) -> List[models.ServiceProductConsumption]:
-    """Lấy danh sách tất cả vật tư tiêu hao của một dịch vụ."""
-    statement = select(models.ServiceProductConsumption).where(models.ServiceProductConsumption.service_id == service_id)
+    """Lấy danh sách tất cả vật tư tiêu hao của một dịch vụ (kèm sản phẩm)."""
+    statement = (
+        select(models.ServiceProductConsumption)
+        .where(models.ServiceProductConsumption.service_id == service_id)
+        .options(*_CONSUMPTION_LOAD_OPTIONS)
+    )
     return db.exec(statement).all()
 
 
@@ -243,6 +417,7 @@ def create_package_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    _invalidate_cache("package_category")
     return db_category
 
 def get_package_category(db: Session, category_id: int) -> Optional[models.PackageCategory]:
@@ -266,12 +441,31 @@ def create_service_package(
 
     db.add(db_package)
     db.commit()
-    db.refresh(db_package)
-    return db_package
+    _invalidate_cache("service_package")
+    return get_service_package(db, db_package.id)
 
 def get_service_package(db: Session, package_id: int) -> Optional[models.ServicePackage]:
-    """Lấy gói liệu trình theo ID."""
-    return db.get(models.ServicePackage, package_id)
+    """Lấy gói liệu trình theo ID (eager load dịch vụ con và quan hệ lồng)."""
+    statement = (
+        select(models.ServicePackage)
+        .where(models.ServicePackage.id == package_id)
+        .options(*_PACKAGE_LOAD_OPTIONS)
+        .execution_options(populate_existing=True)
+    )
+    return db.exec(statement).first()
+
+def get_all_service_packages(
+    db: Session, *, skip: int = 0, limit: int = 100
+) -> List[models.ServicePackage]:
+    """Lấy tất cả gói liệu trình với số câu truy vấn cố định."""
+    statement = (
+        select(models.ServicePackage)
+        .options(*_PACKAGE_LOAD_OPTIONS)
+        .order_by(models.ServicePackage.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return db.exec(statement).all()
 
 def update_service_package(
     db: Session, *, db_package: models.ServicePackage, package_in: schemas.ServicePackageUpdate
@@ -289,8 +483,8 @@ def update_service_package(
 
     db.add(db_package)
     db.commit()
-    db.refresh(db_package)
-    return db_package
+    _invalidate_cache("service_package")
+    return get_service_package(db, db_package.id)
 
 def set_primary_image_for_service_package(
     db: Session, *, package: models.ServicePackage, media_id: int
@@ -299,5 +493,5 @@ def set_primary_image_for_service_package(
     package.primary_image_id = media_id
     db.add(package)
     db.commit()
-    db.refresh(package)
-    return package
+    _invalidate_cache("service_package")
+    return get_service_package(db, package.id)
@@ -42,6 +42,8 @@ class ServiceProductConsumption(SQLModel, table=True):
     product_id: Optional[int] = Field(default=None, foreign_key="product.id", primary_key=True)
     consumed_quantity: float
     unit: str = Field(max_length=50)
+    # Chỉ đọc: dùng để trả về chi tiết sản phẩm trong ServiceConsumptionRead
+    product: Optional["Product"] = Relationship(sa_relationship_kwargs={"viewonly": True})
 
 class PackageServiceLink(SQLModel, table=True):
     """Bảng trung gian cho mối quan hệ Nhiều-Nhiều Service-Package."""
@@ -87,6 +89,8 @@ class Service(SQLModel, table=True):
     category: Optional[ServiceCategory] = Relationship(back_populates="services")
     consumes_products: List[Product] = Relationship(back_populates="consumed_in_services", link_model=ServiceProductConsumption)
     packages: List["ServicePackage"] = Relationship(back_populates="services", link_model=PackageServiceLink)
+    # Chỉ đọc: các dòng liên kết kèm số lượng tiêu hao (ghi qua ServiceProductConsumption)
+    consumptions: List[ServiceProductConsumption] = Relationship(sa_relationship_kwargs={"viewonly": True})
 
 class ServicePackage(SQLModel, table=True):
     """Model Gói liệu trình."""
@@ -1,18 +1,47 @@
 """API Endpoints cho module services (catalog)."""
 
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.core.db import get_session
+from src.core.config import settings
+from src.core.db import get_async_read_session, get_read_session, get_session
+from src.core.http_cache import body_etag_route
+from src.core.pagination import InvalidCursorError, build_next_cursor
 from src.modules.media.models import MediaFile
 
-from . import crud, schemas
+from . import crud, schemas, service
 
 # Khởi tạo router chính cho module services
 # Các router cho service, package sẽ được thêm vào sau
-router = APIRouter(prefix="/catalog", tags=["Catalog"])
+# GET trả về 200 được gắn ETag theo nội dung (xem `body_etag_route`)
+router = APIRouter(
+    prefix="/catalog",
+    tags=["Catalog"],
+    route_class=body_etag_route(settings.CATALOG_HTTP_MAX_AGE),
+)
+
+
+def _set_pagination_headers(
+    response: Response,
+    items: list,
+    *,
+    sort: str,
+    order: str,
+    limit: int,
+    total: Optional[int] = None,
+) -> None:
+    """Gắn header phân trang: `X-Next-Cursor` (nếu còn trang sau), `X-Total-Count`.
+
+    Body của các endpoint danh sách giữ nguyên dạng mảng để tương thích ngược.
+    """
+    next_cursor = build_next_cursor(items, sort=sort, order=order, limit=limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
 
 # === Endpoints for ProductCategory ===
 
@@ -33,20 +62,20 @@ def create_product_category(
     response_model=List[schemas.ProductCategoryRead],
     summary="Lấy danh sách Danh mục Sản phẩm"
 )
-def read_product_categories(
-    *, session: Session = Depends(get_session), skip: int = 0, limit: int = 100
+async def read_product_categories(
+    *, session: AsyncSession = Depends(get_async_read_session), skip: int = 0, limit: int = 100
 ):
     """Lấy danh sách tất cả các danh mục sản phẩm."""
-    return crud.get_all_product_categories(db=session, skip=skip, limit=limit)
+    return await service.get_product_categories(db=session, skip=skip, limit=limit)
 
 @router.get(
     "/product-categories/{category_id}",
     response_model=schemas.ProductCategoryRead,
     summary="Lấy thông tin một Danh mục Sản phẩm"
 )
-def read_product_category(*, session: Session = Depends(get_session), category_id: int):
+def read_product_category(*, session: Session = Depends(get_read_session), category_id: int):
     """Lấy thông tin chi tiết của một danh mục sản phẩm bằng ID."""
-    db_category = crud.get_product_category(db=session, category_id=category_id)
+    db_category = service.get_product_category(db=session, category_id=category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Danh mục sản phẩm không tồn tại")
     return db_category
@@ -100,18 +129,40 @@ def create_product(*, session: Session = Depends(get_session), product_in: schem
     response_model=List[schemas.ProductRead],
     summary="Lấy danh sách Sản phẩm"
 )
-def read_products(*, session: Session = Depends(get_session), skip: int = 0, limit: int = 100):
-    """Lấy danh sách tất cả các sản phẩm."""
-    return crud.get_all_products(db=session, skip=skip, limit=limit)
+def read_products(
+    *,
+    session: Session = Depends(get_read_session),
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Literal["id", "name", "price"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    include_total: bool = False,
+):
+    """Lấy danh sách sản phẩm.
+
+    Truyền `cursor` (lấy từ header `X-Next-Cursor` của trang trước) để phân trang
+    keyset; khi đó `skip` bị bỏ qua. `include_total=true` để nhận `X-Total-Count`.
+    """
+    try:
+        products = service.get_products(
+            db=session, skip=skip, limit=limit, sort=sort, order=order, cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = service.count_products(db=session) if include_total else None
+    _set_pagination_headers(response, products, sort=sort, order=order, limit=limit, total=total)
+    return products
 
 @router.get(
     "/products/{product_id}",
     response_model=schemas.ProductRead,
     summary="Lấy thông tin một Sản phẩm"
 )
-def read_product(*, session: Session = Depends(get_session), product_id: int):
+def read_product(*, session: Session = Depends(get_read_session), product_id: int):
     """Lấy thông tin chi tiết của một sản phẩm bằng ID."""
-    db_product = crud.get_product(db=session, product_id=product_id)
+    db_product = service.get_product(db=session, product_id=product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Sản phẩm không tồn tại")
     return db_product
@@ -190,18 +241,18 @@ def create_service_category(
     response_model=List[schemas.ServiceCategoryRead],
     summary="Lấy danh sách Danh mục Dịch vụ"
 )
-def read_service_categories(
-    *, session: Session = Depends(get_session), skip: int = 0, limit: int = 100
+async def read_service_categories(
+    *, session: AsyncSession = Depends(get_async_read_session), skip: int = 0, limit: int = 100
 ):
-    return crud.get_all_service_categories(db=session, skip=skip, limit=limit)
+    return await service.get_service_categories(db=session, skip=skip, limit=limit)
 
 @router.get(
     "/service-categories/{category_id}",
     response_model=schemas.ServiceCategoryRead,
     summary="Lấy thông tin một Danh mục Dịch vụ"
 )
-def read_service_category(*, session: Session = Depends(get_session), category_id: int):
-    db_category = crud.get_service_category(db=session, category_id=category_id)
+def read_service_category(*, session: Session = Depends(get_read_session), category_id: int):
+    db_category = service.get_service_category(db=session, category_id=category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Danh mục dịch vụ không tồn tại")
     return db_category
@@ -251,16 +302,34 @@ def create_service(*, session: Session = Depends(get_session), service_in: schem
     response_model=List[schemas.ServiceRead],
     summary="Lấy danh sách Dịch vụ"
 )
-def read_services(*, session: Session = Depends(get_session), skip: int = 0, limit: int = 100):
-    return crud.get_all_services(db=session, skip=skip, limit=limit)
+def read_services(
+    *,
+    session: Session = Depends(get_read_session),
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Literal["id", "name", "price"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    include_total: bool = False,
+):
+    try:
+        services = service.get_services(
+            db=session, skip=skip, limit=limit, sort=sort, order=order, cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = service.count_services(db=session) if include_total else None
+    _set_pagination_headers(response, services, sort=sort, order=order, limit=limit, total=total)
+    return services
 
 @router.get(
     "/services/{service_id}",
     response_model=schemas.ServiceRead,
     summary="Lấy thông tin một Dịch vụ"
 )
-def read_service(*, session: Session = Depends(get_session), service_id: int):
-    db_service = crud.get_service(db=session, service_id=service_id)
+def read_service(*, session: Session = Depends(get_read_session), service_id: int):
+    db_service = service.get_service(db=session, service_id=service_id)
     if not db_service:
         raise HTTPException(status_code=404, detail="Dịch vụ không tồn tại")
     return db_service
@@ -371,29 +440,16 @@ def remove_consumption_from_service(
 )
 def get_consumptions_for_service(
     *, 
-    session: Session = Depends(get_session), 
+    session: Session = Depends(get_read_session), 
     service_id: int
 ):
     """Lấy danh sách tất cả các sản phẩm tiêu hao và số lượng tương ứng cho một dịch vụ."""
-    db_service = crud.get_service(db=session, service_id=service_id)
+    db_service = service.get_service(db=session, service_id=service_id)
     if not db_service:
         raise HTTPException(status_code=404, detail="Dịch vụ không tồn tại")
 
-    # Đây là một cách để xây dựng response. 
-    # SQLModel sẽ tự động load `consumes_products` nhưng không có các trường của bảng trung gian.
-    # Chúng ta cần xây dựng response thủ công để có `consumed_quantity` và `unit`.
-    consumptions = []
-    for product in db_service.consumes_products:
-        link = crud.get_consumption_link(db=session, service_id=service_id, product_id=product.id)
-        if link:
-            consumptions.append(schemas.ServiceConsumptionRead(
-                service_id=link.service_id,
-                product_id=link.product_id,
-                consumed_quantity=link.consumed_quantity,
-                unit=link.unit,
-                product=product
-            ))
-    return consumptions
+    # ServiceRead đã chứa sẵn consumptions (eager load kèm sản phẩm)
+    return db_service.consumptions
 
 
 # === Endpoints for PackageCategory ===
@@ -430,13 +486,21 @@ def create_service_package(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.get(
+    "/service-packages/",
+    response_model=List[schemas.ServicePackageRead],
+    summary="Lấy danh sách Gói liệu trình"
+)
+def read_service_packages(*, session: Session = Depends(get_read_session), skip: int = 0, limit: int = 100):
+    return service.get_service_packages(db=session, skip=skip, limit=limit)
+
 @router.get(
     "/service-packages/{package_id}",
     response_model=schemas.ServicePackageRead,
     summary="Lấy thông tin một Gói liệu trình"
 )
-def read_service_package(*, session: Session = Depends(get_session), package_id: int):
-    db_package = crud.get_service_package(db=session, package_id=package_id)
+def read_service_package(*, session: Session = Depends(get_read_session), package_id: int):
+    db_package = service.get_service_package(db=session, package_id=package_id)
     if not db_package:
         raise HTTPException(status_code=404, detail="Gói liệu trình không tồn tại")
     return db_package
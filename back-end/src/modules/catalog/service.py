@@ -0,0 +1,201 @@
+"""Business logic cho module catalog.
+
+Các hàm đọc ở đây đi qua `crud.catalog_cache` (read-through): lần đầu đọc DB và
+lưu schema đã validate, các lần sau trả thẳng từ cache cho đến khi hết TTL
+hoặc bị invalidate bởi một hàm ghi trong crud. Ngay sau một lần ghi, kết quả
+đọc từ read replica không được lưu vì replica có thể còn trễ.
+"""
+
+from typing import Any, Callable, List, Optional
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import crud, schemas
+from .crud import catalog_cache
+
+
+def _cacheable(db: Session | AsyncSession, namespace: str) -> bool:
+    """Không lưu cache dữ liệu đọc từ replica khi namespace vừa được ghi."""
+    return not (db.info.get("replica") and crud.written_recently(namespace))
+
+
+def _read_through(db: Session, key: tuple, load: Callable[[], Any]) -> Any:
+    """Đọc từ cache, nếu trượt thì gọi `load` và lưu kết quả (trừ None)."""
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = catalog_cache.version(key[0])
+    value = load()
+    if value is not None and _cacheable(db, key[0]):
+        catalog_cache.set(key, value, version=version)
+    return value
+
+
+# --- ProductCategory ---
+
+async def get_product_categories(
+    db: AsyncSession, *, skip: int = 0, limit: int = 100
+) -> List[schemas.ProductCategoryRead]:
+    """Danh sách danh mục sản phẩm (có cache)."""
+    key = ("product_category", "list", skip, limit)
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = catalog_cache.version("product_category")
+    categories = await crud.get_all_product_categories_async(db, skip=skip, limit=limit)
+    value = [schemas.ProductCategoryRead.model_validate(c) for c in categories]
+    if _cacheable(db, key[0]):
+        catalog_cache.set(key, value, version=version)
+    return value
+
+
+def get_product_category(
+    db: Session, category_id: int
+) -> Optional[schemas.ProductCategoryRead]:
+    """Danh mục sản phẩm theo ID (có cache)."""
+
+    def load():
+        category = crud.get_product_category(db, category_id)
+        return schemas.ProductCategoryRead.model_validate(category) if category else None
+
+    return _read_through(db, ("product_category", category_id), load)
+
+
+# --- Product ---
+
+def get_products(
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+) -> List[schemas.ProductRead]:
+    """Danh sách sản phẩm (có cache), hỗ trợ phân trang offset hoặc keyset."""
+    return _read_through(
+        db,
+        ("product", "list", skip, limit, sort, order, cursor),
+        lambda: [
+            schemas.ProductRead.model_validate(p)
+            for p in crud.get_all_products(
+                db, skip=skip, limit=limit, sort=sort, order=order, cursor=cursor
+            )
+        ],
+    )
+
+
+def count_products(db: Session) -> int:
+    """Tổng số sản phẩm (có cache)."""
+    return _read_through(db, ("product", "count"), lambda: crud.count_products(db))
+
+
+def get_product(db: Session, product_id: int) -> Optional[schemas.ProductRead]:
+    """Sản phẩm theo ID (có cache)."""
+
+    def load():
+        product = crud.get_product(db, product_id)
+        return schemas.ProductRead.model_validate(product) if product else None
+
+    return _read_through(db, ("product", product_id), load)
+
+
+# --- ServiceCategory ---
+
+async def get_service_categories(
+    db: AsyncSession, *, skip: int = 0, limit: int = 100
+) -> List[schemas.ServiceCategoryRead]:
+    """Danh sách danh mục dịch vụ (có cache)."""
+    key = ("service_category", "list", skip, limit)
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return cached
+
+    version = catalog_cache.version("service_category")
+    categories = await crud.get_all_service_categories_async(db, skip=skip, limit=limit)
+    value = [schemas.ServiceCategoryRead.model_validate(c) for c in categories]
+    if _cacheable(db, key[0]):
+        catalog_cache.set(key, value, version=version)
+    return value
+
+
+def get_service_category(
+    db: Session, category_id: int
+) -> Optional[schemas.ServiceCategoryRead]:
+    """Danh mục dịch vụ theo ID (có cache)."""
+
+    def load():
+        category = crud.get_service_category(db, category_id)
+        return schemas.ServiceCategoryRead.model_validate(category) if category else None
+
+    return _read_through(db, ("service_category", category_id), load)
+
+
+# --- Service ---
+
+def get_services(
+    db: Session,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+) -> List[schemas.ServiceRead]:
+    """Danh sách dịch vụ (có cache), hỗ trợ phân trang offset hoặc keyset."""
+    return _read_through(
+        db,
+        ("service", "list", skip, limit, sort, order, cursor),
+        lambda: [
+            schemas.ServiceRead.model_validate(s)
+            for s in crud.get_all_services(
+                db, skip=skip, limit=limit, sort=sort, order=order, cursor=cursor
+            )
+        ],
+    )
+
+
+def count_services(db: Session) -> int:
+    """Tổng số dịch vụ (có cache)."""
+    return _read_through(db, ("service", "count"), lambda: crud.count_services(db))
+
+
+def get_service(db: Session, service_id: int) -> Optional[schemas.ServiceRead]:
+    """Dịch vụ theo ID (có cache)."""
+
+    def load():
+        service = crud.get_service(db, service_id)
+        return schemas.ServiceRead.model_validate(service) if service else None
+
+    return _read_through(db, ("service", service_id), load)
+
+
+# --- ServicePackage ---
+
+def get_service_packages(
+    db: Session, *, skip: int = 0, limit: int = 100
+) -> List[schemas.ServicePackageRead]:
+    """Danh sách gói liệu trình (có cache)."""
+    return _read_through(
+        db,
+        ("service_package", "list", skip, limit),
+        lambda: [
+            schemas.ServicePackageRead.model_validate(p)
+            for p in crud.get_all_service_packages(db, skip=skip, limit=limit)
+        ],
+    )
+
+
+def get_service_package(
+    db: Session, package_id: int
+) -> Optional[schemas.ServicePackageRead]:
+    """Gói liệu trình theo ID (có cache)."""
+
+    def load():
+        package = crud.get_service_package(db, package_id)
+        return schemas.ServicePackageRead.model_validate(package) if package else None
+
+    return _read_through(db, ("service_package", package_id), load)
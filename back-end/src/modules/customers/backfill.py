@@ -0,0 +1,40 @@
+"""Lệnh backfill cột `search_name` cho bảng customer.
+
+Chạy sau khi migrate hoặc khi thay đổi quy tắc `normalize_search_text`:
+
+    python -m src.modules.customers.backfill              # chỉ dòng còn thiếu
+    python -m src.modules.customers.backfill --all        # tính lại toàn bộ
+    python -m src.modules.customers.backfill --batch-size 5000
+"""
+
+import argparse
+import logging
+
+from sqlmodel import Session
+
+from src.core.db import engine
+from src.modules.customers import crud
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill customer.search_name theo lô")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Số dòng mỗi lô")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Tính lại search_name cho mọi khách hàng (mặc định chỉ dòng còn thiếu)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        updated = crud.backfill_search_names(
+            session, batch_size=args.batch_size, only_missing=not args.all
+        )
+    logger.info(f"✓ Đã cập nhật search_name cho {updated} khách hàng")
+
+
+if __name__ == "__main__":
+    main()
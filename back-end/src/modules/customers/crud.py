@@ -4,14 +4,17 @@ Chỉ chứa các thao tác trực tiếp với database.
 Không chứa logic nghiệp vụ phức tạp.
 """
 
+import re
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-from sqlalchemy import func
+from sqlalchemy import bindparam, func, insert, literal, or_, update
 from sqlmodel import Session, select
 
-from src.core.utils import get_utc_now
+from src.core.pagination import InvalidCursorError, apply_keyset
+from src.core.utils import get_utc_now, normalize_search_text
 from src.modules.customers.models import Customer
+from src.modules.customers.phone_index import phone_index
 
 
 def create_customer(
@@ -31,6 +34,7 @@ def create_customer(
     customer = Customer(
         user_id=user_id,
         full_name=full_name,
+        search_name=normalize_search_text(full_name) if full_name else None,
         phone_number=phone_number,
         date_of_birth=date_of_birth,
         gender=gender,
@@ -43,9 +47,61 @@ def create_customer(
     db.add(customer)
     db.commit()
     db.refresh(customer)
+    phone_index.add(customer.phone_number)
     return customer
 
 
+def get_existing_phone_numbers(
+    db: Session, phone_numbers: Iterable[str], use_phone_index: bool = True
+) -> set[str]:
+    """Tập SĐT (trong danh sách cho trước) đã có trong bảng customer.
+
+    Tính cả khách hàng đã xóa mềm vì ràng buộc UNIQUE áp dụng cho mọi dòng.
+    Với `use_phone_index`, SĐT mà bloom filter khẳng định chưa tồn tại được bỏ
+    qua (nếu không còn SĐT nào cần kiểm tra thì không truy vấn DB). Filter của
+    worker có thể thiếu SĐT do worker khác ghi: kết quả khi đó chỉ dùng được
+    trước một INSERT có UNIQUE bảo vệ; sau khi INSERT lỗi phải kiểm tra lại
+    với `use_phone_index=False`.
+    """
+    phone_numbers = list(phone_numbers)
+    if use_phone_index:
+        candidates = [phone for phone in phone_numbers if phone_index.might_exist(phone)]
+    else:
+        candidates = phone_numbers
+    if not candidates:
+        return set()
+    statement = select(Customer.phone_number).where(Customer.phone_number.in_(candidates))
+    return set(db.exec(statement).all())
+
+
+def bulk_insert_customers(db: Session, rows: list[dict]) -> int:
+    """Thêm nhiều khách hàng trong một câu INSERT executemany rồi commit.
+
+    Mỗi phần tử của `rows` là dict các cột của Customer (tối thiểu `full_name`,
+    `phone_number`); `search_name` và timestamp được điền tại đây. Không tạo
+    đối tượng ORM cho từng dòng.
+
+    Raises:
+        IntegrityError: Nếu có SĐT trùng (ví dụ worker khác vừa ghi); caller
+            cần rollback
+    """
+    if not rows:
+        return 0
+    now = get_utc_now()
+    for row in rows:
+        full_name = row.get("full_name")
+        row["search_name"] = normalize_search_text(full_name) if full_name else None
+        row.setdefault("is_active", True)
+        row["created_at"] = now
+        row["updated_at"] = now
+
+    db.connection().execute(insert(Customer), rows)
+    db.commit()
+    for row in rows:
+        phone_index.add(row.get("phone_number"))
+    return len(rows)
+
+
 def get_customer_by_id(
     db: Session,
     customer_id: int,
@@ -74,8 +130,17 @@ def get_customer_by_phone_number(
     db: Session,
     phone_number: str,
     include_deleted: bool = False,
+    use_phone_index: bool = False,
 ) -> Optional[Customer]:
-    """Lấy khách hàng theo số điện thoại."""
+    """Lấy khách hàng theo số điện thoại.
+
+    Args:
+        use_phone_index: Bỏ qua truy vấn khi bloom filter khẳng định SĐT chưa có.
+            Filter của worker có thể thiếu SĐT do worker khác ghi, nên chỉ bật
+            cho bước kiểm tra trùng trước khi ghi (UNIQUE bắt phần bỏ sót).
+    """
+    if use_phone_index and not phone_index.might_exist(phone_number):
+        return None
     statement = select(Customer).where(Customer.phone_number == phone_number)
     if not include_deleted:
         statement = statement.where(Customer.deleted_at.is_(None))
@@ -107,6 +172,8 @@ def update_customer(
 
     # Cập nhật updated_at
     update_data["updated_at"] = get_utc_now()
+    if update_data.get("full_name") is not None:
+        update_data["search_name"] = normalize_search_text(update_data["full_name"])
 
     for field, value in update_data.items():
         if value is not None:
@@ -114,6 +181,7 @@ def update_customer(
 
     db.commit()
     db.refresh(customer)
+    phone_index.add(update_data.get("phone_number"))
     return customer
 
 
@@ -141,13 +209,98 @@ def restore_customer(db: Session, customer_id: int) -> bool:
     return True
 
 
+# Các khóa sắp xếp hỗ trợ keyset pagination khi tìm kiếm khách hàng
+CUSTOMER_SORT_COLUMNS = {
+    "id": Customer.id,
+    "created_at": Customer.created_at,
+}
+
+# Chuỗi tìm kiếm chỉ gồm chữ số (có thể kèm +, khoảng trắng, dấu chấm/gạch)
+_PHONE_QUERY_RE = re.compile(r"^\+?[\d\s.\-]{3,}$")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def _contains_filter(search_query: str):
+    """Điều kiện tìm kiếm chứa chuỗi theo tên (không dấu) hoặc SĐT.
+
+    Tên được so khớp trên cột `search_name` đã chuẩn hóa sẵn nên "nguyen van a"
+    tìm được "Nguyễn Văn A" mà không cần gọi unaccent() trên từng dòng.
+    """
+    search_term = f"%{search_query}%"
+    normalized = normalize_search_text(search_query)
+    return (Customer.search_name.contains(normalized, autoescape=True)) | (
+        Customer.phone_number.ilike(search_term)
+    )
+
+
+def _fuzzy_filter(db: Session, search_query: str):
+    """Điều kiện lọc và thứ tự xếp hạng cho chế độ tìm kiếm gần đúng.
+
+    - Chuỗi giống SĐT: so khớp tiền tố (`LIKE '09xx%'`), dùng index pattern_ops.
+    - PostgreSQL: so khớp trigram trên `search_name` (GIN pg_trgm), xếp theo
+      `word_similarity` giảm dần.
+    - Database khác (SQLite khi test): trả về None để dùng tìm kiếm chứa chuỗi.
+
+    Returns:
+        Tuple (điều kiện lọc, danh sách ORDER BY) hoặc None
+    """
+    if _PHONE_QUERY_RE.match(search_query):
+        digits = _NON_DIGIT_RE.sub("", search_query)
+        if digits.startswith("84"):
+            digits = "0" + digits[2:]
+        return (
+            Customer.phone_number.like(f"{digits}%"),
+            [Customer.phone_number, Customer.id],
+        )
+
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+
+    normalized = normalize_search_text(search_query)
+    score = func.word_similarity(normalized, Customer.search_name)
+    search_filter = or_(
+        literal(normalized).op("<%")(Customer.search_name),
+        Customer.search_name.contains(normalized, autoescape=True),
+    )
+    return search_filter, [score.desc(), Customer.id]
+
+
+def _search_criteria(db: Session, search_query: Optional[str], mode: str):
+    """Điều kiện lọc và thứ tự xếp hạng (nếu có) cho một truy vấn tìm kiếm.
+
+    Returns:
+        Tuple (điều kiện lọc hoặc None, danh sách ORDER BY xếp hạng hoặc None)
+    """
+    if not search_query:
+        return None, None
+    fuzzy = _fuzzy_filter(db, search_query) if mode == "fuzzy" else None
+    if fuzzy is not None:
+        return fuzzy
+    return _contains_filter(search_query), None
+
+
 def find_customer_by_query(
     db: Session,
     search_query: Optional[str] = None,
     page: int = 1,
     per_page: int = 20,
-) -> tuple[list[Customer], int]:
-    """Tìm kiếm khách hàng theo tên hoặc SĐT (không bao gồm khách hàng bị xóa)."""
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    include_total: bool = True,
+    mode: str = "contains",
+) -> tuple[list[Customer], Optional[int]]:
+    """Tìm kiếm khách hàng theo tên hoặc SĐT (không bao gồm khách hàng bị xóa).
+
+    Có `cursor` thì phân trang keyset (bỏ qua `page`). Tổng số chỉ được đếm khi
+    `include_total=True`, ngược lại trả về None.
+
+    `mode="fuzzy"` xếp hạng theo độ tương đồng (xem `_fuzzy_filter`); kết quả
+    xếp hạng chỉ phân trang theo `page`.
+
+    Raises:
+        InvalidCursorError: Nếu khóa sắp xếp không hỗ trợ hoặc cursor không hợp lệ
+    """
     # Câu lệnh để lấy dữ liệu
     statement = select(Customer).where(Customer.deleted_at.is_(None))
     # Câu lệnh để đếm
@@ -155,22 +308,111 @@ def find_customer_by_query(
         select(func.count()).select_from(Customer).where(Customer.deleted_at.is_(None))
     )
 
-    if search_query:
-        search_term = f"%{search_query}%"
-        search_filter = (Customer.full_name.ilike(search_term)) | (
-            Customer.phone_number.ilike(search_term)
-        )
+    search_filter, ranking = _search_criteria(db, search_query, mode)
+    if search_filter is not None:
         statement = statement.where(search_filter)
         count_statement = count_statement.where(search_filter)
 
-    total = db.exec(count_statement).one()
+    if ranking is not None:
+        if cursor:
+            raise InvalidCursorError("Tìm kiếm gần đúng không hỗ trợ cursor, hãy dùng page")
+        statement = statement.order_by(*ranking).offset((page - 1) * per_page)
+    else:
+        statement = apply_keyset(
+            statement, CUSTOMER_SORT_COLUMNS, Customer.id, sort=sort, order=order, cursor=cursor
+        )
+        if cursor is None:
+            statement = statement.offset((page - 1) * per_page)
 
-    offset = (page - 1) * per_page
-    customers = db.exec(statement.offset(offset).limit(per_page)).all()
+    total = db.exec(count_statement).one() if include_total else None
+    customers = db.exec(statement.limit(per_page)).all()
 
     return customers, total
 
 
+def iter_customers_for_export(
+    db: Session,
+    columns: list[str],
+    search_query: Optional[str] = None,
+    mode: str = "contains",
+    batch_size: int = 2000,
+) -> Iterator[list[tuple]]:
+    """Duyệt khách hàng (chưa xóa) khớp điều kiện tìm kiếm, theo từng lô dòng.
+
+    Điều kiện lọc giống `find_customer_by_query`; thứ tự luôn theo id. Dùng
+    `yield_per` (server-side cursor trên PostgreSQL) và chỉ lấy các cột cần
+    thiết, không dựng đối tượng ORM, nên bộ nhớ không phụ thuộc số dòng.
+
+    Yields:
+        Danh sách tuple giá trị (theo thứ tự `columns`), tối đa `batch_size` dòng
+    """
+    search_filter, _ = _search_criteria(db, search_query, mode)
+    statement = (
+        select(*(getattr(Customer, column) for column in columns))
+        .where(Customer.deleted_at.is_(None))
+        .order_by(Customer.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if search_filter is not None:
+        statement = statement.where(search_filter)
+    for partition in db.exec(statement).partitions():
+        yield [tuple(row) for row in partition]
+
+
+def backfill_search_names(
+    db: Session,
+    batch_size: int = 1000,
+    only_missing: bool = True,
+) -> int:
+    """Tính lại `search_name` cho khách hàng hiện có, theo từng lô.
+
+    Duyệt theo id (keyset) và commit sau mỗi lô để không giữ transaction dài
+    trên bảng lớn. Chỉ ghi các dòng có giá trị thay đổi.
+
+    Args:
+        db: Database session
+        batch_size: Số dòng mỗi lô
+        only_missing: True chỉ xử lý dòng chưa có search_name; False tính lại
+            toàn bộ (khi thay đổi quy tắc chuẩn hóa)
+
+    Returns:
+        Số dòng đã cập nhật
+    """
+    update_statement = (
+        update(Customer)
+        .where(Customer.id == bindparam("customer_id"))
+        .values(search_name=bindparam("new_search_name"))
+        .execution_options(synchronize_session=False)
+    )
+    updated = 0
+    last_id = 0
+    while True:
+        statement = (
+            select(Customer.id, Customer.full_name, Customer.search_name)
+            .where(Customer.id > last_id, Customer.full_name.is_not(None))
+            .order_by(Customer.id)
+            .limit(batch_size)
+        )
+        if only_missing:
+            statement = statement.where(Customer.search_name.is_(None))
+        rows = db.exec(statement).all()
+        if not rows:
+            break
+
+        changes = [
+            {"customer_id": row.id, "new_search_name": normalized}
+            for row in rows
+            if (normalized := normalize_search_text(row.full_name)) != row.search_name
+        ]
+        if changes:
+            db.connection().execute(update_statement, changes)
+            db.commit()
+            updated += len(changes)
+        last_id = rows[-1].id
+
+    return updated
+
+
 def link_customer_with_user(
     db: Session,
     customer_id: int,
@@ -0,0 +1,128 @@
+"""Xuất danh sách khách hàng ra CSV/NDJSON dạng stream.
+
+Dữ liệu được đọc theo lô bằng server-side cursor (`crud.iter_customers_for_export`)
+và ghi ra response ngay khi có, nên xuất vài trăm nghìn khách hàng vẫn dùng bộ
+nhớ cố định và byte đầu tiên được gửi ngay, không chờ truy vấn xong. Mỗi lô được
+mã hóa thành một chunk (không phải từng dòng) để giảm số lần chuyển thread khi
+Starlette đọc generator.
+
+Session đọc được mở bên trong generator: dependency `yield` của FastAPI đã đóng
+trước khi body được stream.
+"""
+
+import csv
+import io
+import json
+import logging
+import zlib
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterable, Iterator, Optional
+
+from src.core.config import settings
+from src.core.db import get_read_session
+from src.modules.customers import crud
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    "id",
+    "user_id",
+    "full_name",
+    "phone_number",
+    "date_of_birth",
+    "gender",
+    "address",
+    "notes",
+    "skin_type",
+    "health_conditions",
+    "is_active",
+    "created_at",
+    "updated_at",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+_read_session = contextmanager(get_read_session)
+
+
+def _csv_chunks(batches: Iterable[list[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM để Excel nhận đúng UTF-8 (tên tiếng Việt)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Không serialize được {type(value).__name__}")
+
+
+def _ndjson_chunks(batches: Iterable[list[tuple]]) -> Iterator[str]:
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+    for rows in batches:
+        yield "".join(
+            encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows
+        )
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # wbits=31: định dạng gzip (header + CRC), nén tăng dần theo từng chunk
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_customer_export(
+    export_format: str = "csv",
+    search_query: Optional[str] = None,
+    mode: str = "contains",
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """Generator byte của file xuất khách hàng (dùng cho StreamingResponse).
+
+    Args:
+        export_format: "csv" hoặc "ndjson"
+        search_query: Lọc như tìm kiếm khách hàng (tên hoặc SĐT)
+        mode: "contains" hoặc "fuzzy" (xem `crud.find_customer_by_query`)
+        gzip: Nén gzip
+    """
+
+    def generate() -> Iterator[bytes]:
+        exported = 0
+        with _read_session() as db:
+            batches = crud.iter_customers_for_export(
+                db,
+                EXPORT_COLUMNS,
+                search_query=search_query,
+                mode=mode,
+                batch_size=settings.CUSTOMER_EXPORT_BATCH_SIZE,
+            )
+
+            def counted() -> Iterator[list[tuple]]:
+                nonlocal exported
+                for rows in batches:
+                    exported += len(rows)
+                    yield rows
+
+            encode = _ndjson_chunks if export_format == "ndjson" else _csv_chunks
+            for chunk in encode(counted()):
+                yield chunk.encode("utf-8")
+        logger.info(f"✓ Đã xuất {exported} khách hàng ({export_format})")
+
+    return _gzip(generate()) if gzip else generate()
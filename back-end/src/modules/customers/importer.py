@@ -0,0 +1,351 @@
+"""Import khách hàng hàng loạt từ file CSV/XLSX.
+
+Dùng khi spa chuyển dữ liệu từ hệ thống cũ sang (hàng chục nghìn khách). File
+được đọc dần (không nạp cả file vào bộ nhớ) và xử lý theo từng lô
+`CUSTOMER_IMPORT_BATCH_SIZE` dòng:
+
+1. Kiểm tra và chuẩn hóa cả lô (SĐT qua `normalize_phone_number`).
+2. Khử trùng: trong chính file (tập SĐT đã gặp) và với DB bằng một truy vấn
+   `IN (...)` cho cả lô (xem `crud.get_existing_phone_numbers`).
+3. Ghi cả lô bằng một INSERT executemany rồi commit.
+
+Dòng lỗi hoặc trùng không làm hỏng lô; mọi dòng bị bỏ qua được ghi vào báo cáo
+kèm số dòng trong file (dòng tiêu đề là dòng 1).
+
+XLSX cần thư viện `openpyxl` (không bắt buộc); thiếu thư viện thì chỉ hỗ trợ CSV.
+"""
+
+import codecs
+import csv
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from src.core.config import settings
+from src.core.utils import normalize_phone_number
+from src.modules.customers import crud
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedImportFormatError(Exception):
+    """Định dạng file import không được hỗ trợ."""
+
+    pass
+
+
+class InvalidImportFileError(Exception):
+    """File import không đọc được hoặc thiếu cột bắt buộc."""
+
+    pass
+
+
+# Cột của Customer được phép import và độ dài tối đa (None: không giới hạn)
+IMPORT_COLUMNS: dict[str, Optional[int]] = {
+    "full_name": 255,
+    "phone_number": 20,
+    "date_of_birth": None,
+    "gender": 10,
+    "address": None,
+    "notes": None,
+    "skin_type": 50,
+    "health_conditions": None,
+}
+
+# Tên cột thường gặp trong file xuất từ hệ thống khác
+_HEADER_ALIASES = {
+    "ho_ten": "full_name",
+    "ho_va_ten": "full_name",
+    "name": "full_name",
+    "so_dien_thoai": "phone_number",
+    "sdt": "phone_number",
+    "phone": "phone_number",
+    "ngay_sinh": "date_of_birth",
+    "gioi_tinh": "gender",
+    "dia_chi": "address",
+    "ghi_chu": "notes",
+    "loai_da": "skin_type",
+}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+
+
+@dataclass
+class ImportRowError:
+    """Một dòng bị bỏ qua khi import."""
+
+    row: int
+    error: str
+    phone_number: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    """Kết quả import.
+
+    Attributes:
+        total_rows: Số dòng dữ liệu đã đọc (không tính tiêu đề, dòng trống)
+        imported: Số khách hàng đã thêm (hoặc sẽ thêm khi dry_run)
+        duplicates: Số dòng bỏ qua do SĐT đã tồn tại hoặc lặp trong file
+        failed: Số dòng bỏ qua do dữ liệu không hợp lệ
+        errors: Chi tiết các dòng bị bỏ qua (tối đa `CUSTOMER_IMPORT_MAX_ERRORS`)
+        errors_truncated: True nếu báo cáo lỗi bị cắt bớt
+    """
+
+    total_rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = field(default_factory=list)
+    errors_truncated: bool = False
+
+    def add_error(self, row: int, error: str, phone_number: Optional[str] = None) -> None:
+        if len(self.errors) < settings.CUSTOMER_IMPORT_MAX_ERRORS:
+            self.errors.append(ImportRowError(row, error, phone_number))
+        else:
+            self.errors_truncated = True
+
+
+# --- Đọc file ---
+
+
+def _normalize_header(name: Any) -> str:
+    key = str(name or "").strip().lower().replace(" ", "_")
+    return _HEADER_ALIASES.get(key, key)
+
+
+def _map_header(header: Iterable[Any]) -> list[Optional[str]]:
+    """Ánh xạ tiêu đề file sang tên cột Customer (None: cột bị bỏ qua)."""
+    columns = [_normalize_header(name) for name in header]
+    mapped = [name if name in IMPORT_COLUMNS else None for name in columns]
+    missing = {"full_name", "phone_number"} - set(mapped)
+    if missing:
+        raise InvalidImportFileError(f"File thiếu cột bắt buộc: {', '.join(sorted(missing))}")
+    return mapped
+
+
+def _iter_csv(file: BinaryIO) -> Iterator[list[Any]]:
+    # utf-8-sig: bỏ BOM do Excel thêm vào khi lưu CSV
+    reader = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+    try:
+        yield from reader
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise InvalidImportFileError(f"Không đọc được file CSV: {e}")
+
+
+def _iter_xlsx(file: BinaryIO) -> Iterator[list[Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise UnsupportedImportFormatError("Chưa cài openpyxl, chỉ hỗ trợ import CSV")
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise InvalidImportFileError(f"Không đọc được file XLSX: {e}")
+    try:
+        # read_only: đọc dần từng dòng, không dựng toàn bộ sheet trong bộ nhớ
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(file: BinaryIO, filename: str) -> Iterator[tuple[int, dict]]:
+    """Đọc file import, trả về từng cặp (số dòng, dict cột -> giá trị thô).
+
+    Raises:
+        UnsupportedImportFormatError: Nếu đuôi file không phải .csv/.xlsx
+        InvalidImportFileError: Nếu file hỏng hoặc thiếu cột bắt buộc
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension == "csv":
+        rows = _iter_csv(file)
+    elif extension == "xlsx":
+        rows = _iter_xlsx(file)
+    else:
+        raise UnsupportedImportFormatError("Chỉ hỗ trợ file .csv hoặc .xlsx")
+
+    header = next(rows, None)
+    if header is None:
+        raise InvalidImportFileError("File rỗng")
+    columns = _map_header(header)
+
+    for line, values in enumerate(rows, start=2):
+        record = {
+            column: value
+            for column, value in zip(columns, values)
+            if column is not None and value is not None and value != ""
+        }
+        if record:
+            yield line, record
+
+
+# --- Chuẩn hóa ---
+
+
+def _parse_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Ngày sinh không hợp lệ: {text}")
+
+
+def _phone_text(value: Any) -> Any:
+    """SĐT lưu dạng số trong Excel bị mất số 0 đầu (912345678): bổ sung lại."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        digits = str(int(value))
+        return "0" + digits if len(digits) == 9 else digits
+    return value
+
+
+def _clean_record(record: dict) -> dict:
+    """Kiểm tra và chuẩn hóa một dòng; trả về dict đủ mọi cột import.
+
+    Raises:
+        ValueError: Nếu dòng không hợp lệ (thông báo dùng cho báo cáo lỗi)
+    """
+    cleaned: dict[str, Any] = {}
+    for column, max_length in IMPORT_COLUMNS.items():
+        value = record.get(column)
+        if column == "phone_number":
+            value = _phone_text(value)
+        if value is None or column == "date_of_birth":
+            cleaned[column] = value
+            continue
+        value = str(value).strip()
+        if max_length is not None and len(value) > max_length:
+            raise ValueError(f"{column} dài quá {max_length} ký tự")
+        cleaned[column] = value or None
+
+    if not cleaned["full_name"]:
+        raise ValueError("Thiếu họ tên")
+    if not cleaned["phone_number"]:
+        raise ValueError("Thiếu số điện thoại")
+    cleaned["phone_number"] = normalize_phone_number(cleaned["phone_number"])
+    if cleaned["date_of_birth"] is not None:
+        cleaned["date_of_birth"] = _parse_date(cleaned["date_of_birth"])
+    return cleaned
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# --- Import ---
+
+
+def _import_batch(
+    db: Session,
+    batch: list[tuple[int, dict]],
+    seen_phones: set[str],
+    report: ImportReport,
+    dry_run: bool,
+) -> None:
+    valid: list[tuple[int, dict]] = []
+    for line, record in batch:
+        try:
+            valid.append((line, _clean_record(record)))
+        except ValueError as e:
+            report.failed += 1
+            report.add_error(line, str(e), record.get("phone_number"))
+
+    # Một truy vấn cho cả lô thay vì tra từng SĐT
+    existing = crud.get_existing_phone_numbers(db, [row["phone_number"] for _, row in valid])
+
+    rows: list[dict] = []
+    for line, row in valid:
+        phone = row["phone_number"]
+        if phone in existing:
+            report.duplicates += 1
+            report.add_error(line, "Số điện thoại đã tồn tại", phone)
+        elif phone in seen_phones:
+            report.duplicates += 1
+            report.add_error(line, "Số điện thoại lặp lại trong file", phone)
+        else:
+            seen_phones.add(phone)
+            rows.append((line, row))
+
+    if dry_run or not rows:
+        report.imported += len(rows)
+        return
+
+    try:
+        report.imported += crud.bulk_insert_customers(db, [row for _, row in rows])
+        return
+    except IntegrityError:
+        db.rollback()
+
+    # SĐT đã có trong DB nhưng bloom filter của worker này chưa biết (worker khác
+    # ghi), hoặc worker khác vừa ghi: kiểm tra lại thẳng với DB và thử một lần nữa
+    existing = crud.get_existing_phone_numbers(
+        db, [row["phone_number"] for _, row in rows], use_phone_index=False
+    )
+    remaining: list[tuple[int, dict]] = []
+    for line, row in rows:
+        if row["phone_number"] in existing:
+            report.duplicates += 1
+            report.add_error(line, "Số điện thoại đã tồn tại", row["phone_number"])
+        else:
+            remaining.append((line, row))
+    try:
+        report.imported += crud.bulk_insert_customers(db, [row for _, row in remaining])
+    except IntegrityError as e:
+        # Vẫn trùng (ghi đồng thời liên tục): bỏ cả lô, các lô đã ghi vẫn giữ nguyên
+        db.rollback()
+        logger.warning(f"✗ Bỏ qua một lô import do trùng SĐT khi ghi: {e.orig}")
+        for line, row in remaining:
+            report.failed += 1
+            report.add_error(line, "Không ghi được do trùng SĐT khi ghi, hãy import lại dòng này", row["phone_number"])
+
+
+def import_customers(
+    db: Session,
+    file: BinaryIO,
+    filename: str,
+    dry_run: bool = False,
+    batch_size: Optional[int] = None,
+) -> ImportReport:
+    """Import khách hàng vãng lai (user_id = NULL) từ file CSV/XLSX.
+
+    Args:
+        db: Database session
+        file: File nhị phân (đọc tuần tự)
+        filename: Tên file gốc (xác định định dạng theo đuôi)
+        dry_run: Chỉ kiểm tra và báo cáo, không ghi DB
+        batch_size: Số dòng mỗi lô (mặc định `CUSTOMER_IMPORT_BATCH_SIZE`)
+
+    Returns:
+        ImportReport
+
+    Raises:
+        UnsupportedImportFormatError: Nếu định dạng không hỗ trợ
+        InvalidImportFileError: Nếu file hỏng hoặc thiếu cột bắt buộc
+    """
+    report = ImportReport()
+    seen_phones: set[str] = set()
+    rows = iter_import_rows(file, filename)
+    for batch in _batched(rows, batch_size or settings.CUSTOMER_IMPORT_BATCH_SIZE):
+        report.total_rows += len(batch)
+        _import_batch(db, batch, seen_phones, report, dry_run)
+    report.errors.sort(key=lambda error: error.row)
+
+    logger.info(
+        f"✓ Import khách hàng {'(dry run) ' if dry_run else ''}từ {filename}: "
+        f"{report.imported}/{report.total_rows} dòng, "
+        f"{report.duplicates} trùng, {report.failed} lỗi"
+    )
+    return report
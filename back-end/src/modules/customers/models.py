@@ -22,6 +22,7 @@ class Customer(SQLModel, table=True):
             id: Primary key
             user_id: Foreign key tới User, nullable cho khách hàng vãng lai
             full_name: Họ tên khách hàng
+            search_name: Họ tên đã bỏ dấu, chữ thường (phục vụ tìm kiếm)
             phone_number: Số điện thoại (dùng làm định danh chính)
             date_of_birth: Ngày sinh
             gender: Giới tính (nam/nữ/khác)
@@ -38,6 +39,7 @@ class Customer(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(default=None, index=True, foreign_key="user.id")
     full_name: Optional[str] = Field(default=None, max_length=255)
+    search_name: Optional[str] = Field(default=None, max_length=255)
     phone_number: Optional[str] = Field(
         default=None, index=True, unique=True, max_length=20
     )
@@ -0,0 +1,109 @@
+"""Bloom filter số điện thoại khách hàng.
+
+Tạo khách vãng lai, hoàn thiện hồ sơ và liên kết tài khoản đều tra cứu theo SĐT
+trước khi ghi; với khách mới, truy vấn đó luôn trượt. Filter được dựng lại từ
+bảng customer khi khởi động và cập nhật mỗi khi ghi SĐT, cho phép trả lời
+"chắc chắn không tồn tại" mà không chạm DB.
+
+Lưu ý: filter nằm trong bộ nhớ từng worker; SĐT do worker khác ghi sẽ không
+có trong filter cho tới lần dựng lại kế tiếp, tức filter có thể trả lời sai
+"chắc chắn không tồn tại". Vì vậy chỉ dùng filter cho bước kiểm tra trước khi
+ghi, nơi ràng buộc UNIQUE trên `customer.phone_number` bắt được trường hợp bỏ
+sót (xem service). Tra cứu để đọc/liên kết hồ sơ luôn truy vấn DB.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from src.core.bloom import BloomFilter
+from src.core.config import settings
+from src.core.db import engine
+from src.modules.customers.models import Customer
+
+logger = logging.getLogger(__name__)
+
+
+class PhoneIndex:
+    """Bloom filter SĐT có thể dựng lại khi đang phục vụ request."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        # SĐT được thêm trong lúc đang dựng lại, áp vào filter mới trước khi thay
+        self._pending: Optional[list[str]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def rebuild(self, db: Session) -> int:
+        """Dựng lại filter từ toàn bộ SĐT trong bảng customer (kể cả đã xóa mềm).
+
+        Returns:
+            Số SĐT đã nạp
+        """
+        with self._lock:
+            self._pending = []
+
+        try:
+            total = db.exec(
+                select(func.count())
+                .select_from(Customer)
+                .where(Customer.phone_number.is_not(None))
+            ).one()
+            bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+            statement = (
+                select(Customer.phone_number)
+                .where(Customer.phone_number.is_not(None))
+                .execution_options(yield_per=10_000)
+            )
+            bloom.update(db.exec(statement))
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            bloom.update(self._pending)
+            self._pending = None
+            self._filter = bloom
+        return total
+
+    def add(self, phone_number: Optional[str]) -> None:
+        """Ghi nhận SĐT vừa được lưu vào DB."""
+        if not phone_number:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(phone_number)
+            bloom = self._filter
+        if bloom is not None:
+            bloom.add(phone_number)
+
+    def might_exist(self, phone_number: str) -> bool:
+        """False nếu SĐT chắc chắn chưa có trong DB; True nếu cần truy vấn DB.
+
+        Khi filter chưa sẵn sàng (chưa dựng hoặc bị tắt) luôn trả về True.
+        """
+        bloom = self._filter
+        if bloom is None:
+            return True
+        return bloom.might_contain(phone_number)
+
+
+phone_index = PhoneIndex(settings.PHONE_BLOOM_CAPACITY, settings.PHONE_BLOOM_ERROR_RATE)
+
+
+def rebuild_phone_index() -> None:
+    """Dựng lại filter nếu được bật trong cấu hình (gọi khi khởi động)."""
+    if not settings.PHONE_BLOOM_ENABLED:
+        return
+    with Session(engine) as session:
+        total = phone_index.rebuild(session)
+    logger.info(f"✓ Đã dựng bloom filter SĐT khách hàng: {total} số")
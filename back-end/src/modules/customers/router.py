@@ -3,14 +3,18 @@
 Định nghĩa tất cả API endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 
-from src.core.db import get_session
-from src.core.dependencies import get_current_user
+from src.core.db import get_read_session, get_session
+from src.core.dependencies import get_admin_user, get_current_user, get_read_principal
+from src.core.pagination import InvalidCursorError, build_next_cursor
 from src.core.utils import normalize_phone_number
-from src.modules.auth.models import User
-from src.modules.customers import schemas, service, crud
+from src.modules.auth.principal import Principal
+from src.modules.customers import schemas, service, crud, exporter, importer
 from src.modules.customers.models import Customer
 
 router = APIRouter(prefix="/customers", tags=["customers"])
@@ -37,10 +41,75 @@ def create_walk_in_customer(
         )
 
 
+@router.post("/import", response_model=schemas.CustomerImportResponse)
+def import_customers(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    current_user: Principal = Depends(get_admin_user),
+    db: Session = Depends(get_session),
+):
+    """Import khách hàng vãng lai hàng loạt từ file CSV/XLSX (chỉ admin).
+
+    Cột bắt buộc: full_name, phone_number; cột tùy chọn: date_of_birth, gender,
+    address, notes, skin_type, health_conditions. Dòng lỗi hoặc SĐT trùng bị bỏ
+    qua và được liệt kê trong báo cáo.
+
+    Args:
+            file: File .csv (UTF-8) hoặc .xlsx
+            dry_run: Chỉ kiểm tra, không ghi DB
+    """
+    try:
+        # Đọc trực tiếp file tạm của upload, không nạp cả file vào bộ nhớ
+        report = importer.import_customers(
+            db, file.file, file.filename or "", dry_run=dry_run
+        )
+    except importer.UnsupportedImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)
+        )
+    except importer.InvalidImportFileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return schemas.CustomerImportResponse(
+        total_rows=report.total_rows,
+        imported=report.imported,
+        duplicates=report.duplicates,
+        failed=report.failed,
+        dry_run=dry_run,
+        errors=report.errors,
+        errors_truncated=report.errors_truncated,
+    )
+
+
+@router.get("/export")
+def export_customers(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    search_query: str | None = Query(None, min_length=1, max_length=255),
+    mode: Literal["contains", "fuzzy"] = Query("contains"),
+    gzip: bool = Query(False),
+    current_user: Principal = Depends(get_admin_user),
+):
+    """Xuất khách hàng (không bao gồm khách hàng bị xóa) dạng stream (chỉ admin).
+
+    Lọc giống `GET /customers`; dữ liệu được gửi dần nên không giới hạn số dòng.
+
+    Args:
+            export_format: "csv" hoặc "ndjson" (query `format`)
+            search_query: Chuỗi tìm kiếm theo tên hoặc SĐT
+            mode: "contains" hoặc "fuzzy"
+            gzip: Nén gzip (file .gz)
+    """
+    filename = f"customers.{export_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        exporter.stream_customer_export(export_format, search_query, mode, gzip=gzip),
+        media_type="application/gzip" if gzip else exporter.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.post("/profile", response_model=schemas.CustomerResponse)
 def complete_profile(
     request: schemas.CustomerCompleteProfileRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Hoàn thiện hồ sơ khi user đã có tài khoản (Luồng 2b).
@@ -95,7 +164,7 @@ def get_customer(
 def update_customer(
     customer_id: int,
     request: schemas.CustomerUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Cập nhật thông tin khách hàng.
@@ -133,7 +202,7 @@ def update_customer(
 @router.delete("/{customer_id}")
 def delete_customer_endpoint(
     customer_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Xóa mềm khách hàng (Luồng 4).
@@ -156,7 +225,7 @@ def delete_customer_endpoint(
 @router.post("/{customer_id}/restore", response_model=schemas.CustomerResponse)
 def restore_customer_endpoint(
     customer_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Khôi phục khách hàng (Luồng 5).
@@ -178,7 +247,12 @@ def search_customers(
     search_query: str | None = Query(None, min_length=1, max_length=255),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_session),
+    cursor: str | None = Query(None, max_length=512),
+    sort: Literal["id", "created_at"] = Query("id"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    include_total: bool = Query(True),
+    mode: Literal["contains", "fuzzy"] = Query("contains"),
+    db: Session = Depends(get_read_session),
 ):
     """Tìm kiếm khách hàng (không bao gồm khách hàng bị xóa).
 
@@ -186,24 +260,46 @@ def search_customers(
 
     Args:
             search_query: Chuỗi tìm kiếm (max 255 ký tự)
-            page: Số trang (bắt đầu từ 1)
+            page: Số trang (bắt đầu từ 1), bỏ qua khi có cursor
             per_page: Số items trên mỗi trang (max 100)
+            cursor: `next_cursor` của trang trước (phân trang keyset)
+            sort: Khóa sắp xếp
+            order: Chiều sắp xếp
+            include_total: Có đếm tổng số hay không
+            mode: "fuzzy" để tìm không dấu, xếp hạng theo độ tương đồng
+                (chỉ phân trang theo page)
     """
-    customers, total, total_pages = service.search_customers(
-        db, search_query=search_query, page=page, per_page=per_page
-    )
+    try:
+        customers, total, total_pages = service.search_customers(
+            db,
+            search_query=search_query,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            sort=sort,
+            order=order,
+            include_total=include_total,
+            mode=mode,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return schemas.CustomerListResponse(
         customers=customers,
         total=total,
-        page=page,
+        page=None if cursor else page,
         per_page=per_page,
+        next_cursor=(
+            build_next_cursor(customers, sort=sort, order=order, limit=per_page)
+            if mode == "contains" or not search_query
+            else None
+        ),
     )
 
 
 @router.post("/link-account/initiate")
 def initiate_account_linking(
     request: schemas.CustomerLinkRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Bắt đầu liên kết tài khoản - gửi OTP (Luồng 3c).
@@ -228,7 +324,7 @@ def initiate_account_linking(
 @router.post("/link-account/verify", response_model=schemas.CustomerResponse)
 def verify_otp_and_link(
     request: schemas.CustomerVerifyOTPRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_session),
 ):
     """Xác minh OTP và hoàn tất liên kết tài khoản (Luồng 3d).
@@ -259,7 +355,7 @@ def verify_otp_and_link(
 
 @router.get("/me/profile", response_model=schemas.CustomerResponse)
 def get_my_customer_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_read_principal),
     db: Session = Depends(get_session),
 ):
     """Lấy hồ sơ khách hàng của user hiện tại (Luồng 3b).
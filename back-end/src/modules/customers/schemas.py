@@ -112,6 +112,30 @@ class CustomerListResponse(BaseModel):
     """Response danh sách khách hàng."""
 
     customers: list[CustomerResponse]
-    total: int
-    page: int
+    total: int | None = None
+    page: int | None = None
     per_page: int
+    next_cursor: str | None = None
+
+
+class CustomerImportRowError(BaseModel):
+    """Một dòng bị bỏ qua khi import."""
+
+    row: int
+    error: str
+    phone_number: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CustomerImportResponse(BaseModel):
+    """Báo cáo import khách hàng hàng loạt."""
+
+    total_rows: int
+    imported: int
+    duplicates: int
+    failed: int
+    dry_run: bool
+    errors: list[CustomerImportRowError]
+    errors_truncated: bool = False
@@ -7,6 +7,7 @@ import logging
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
 
 from src.core.utils import get_utc_now
@@ -69,7 +70,7 @@ def create_walk_in_customer(
 
     # Kiểm tra SĐT đã tồn tại chưa
     existing = crud.get_customer_by_phone_number(
-        db, normalized_phone, include_deleted=False
+        db, normalized_phone, include_deleted=False, use_phone_index=True
     )
     if existing:
         logger.warning(f"SĐT {normalized_phone} đã tồn tại khi tạo khách hàng vãng lai")
@@ -78,13 +79,20 @@ def create_walk_in_customer(
         )
 
     # Tạo khách hàng với user_id = NULL
-    customer = crud.create_customer(
-        db,
-        full_name=full_name,
-        phone_number=normalized_phone,
-        user_id=None,
-        **kwargs,
-    )
+    try:
+        customer = crud.create_customer(
+            db,
+            full_name=full_name,
+            phone_number=normalized_phone,
+            user_id=None,
+            **kwargs,
+        )
+    except IntegrityError:
+        # Trùng UNIQUE phone_number: bản ghi đã xóa mềm, hoặc do worker khác vừa ghi
+        db.rollback()
+        raise PhoneNumberAlreadyExistsError(
+            f"Số điện thoại {normalized_phone} đã tồn tại"
+        )
     logger.info(f"✓ Tạo khách hàng vãng lai thành công: ID={customer.id}, {full_name}")
     return customer
 
@@ -116,20 +124,28 @@ def create_online_customer_with_user(
         normalized_phone = normalize_phone_number(phone_number)
         # Kiểm tra không trùng lặp
         existing = crud.get_customer_by_phone_number(
-            db, normalized_phone, include_deleted=False
+            db, normalized_phone, include_deleted=False, use_phone_index=True
         )
         if existing:
             raise PhoneNumberAlreadyExistsError(
                 f"Số điện thoại {normalized_phone} đã tồn tại"
             )
 
-    customer = crud.create_customer(
-        db,
-        full_name=full_name,
-        phone_number=normalized_phone,
-        user_id=user_id,
-        **kwargs,
-    )
+    try:
+        customer = crud.create_customer(
+            db,
+            full_name=full_name,
+            phone_number=normalized_phone,
+            user_id=user_id,
+            **kwargs,
+        )
+    except IntegrityError:
+        db.rollback()
+        if normalized_phone:
+            raise PhoneNumberAlreadyExistsError(
+                f"Số điện thoại {normalized_phone} đã tồn tại"
+            )
+        raise
     return customer
 
 
@@ -167,7 +183,7 @@ def complete_customer_profile(
 
     # Kiểm tra SĐT không trùng (trừ chính nó)
     existing = crud.get_customer_by_phone_number(
-        db, normalized_phone, include_deleted=False
+        db, normalized_phone, include_deleted=False, use_phone_index=True
     )
     if existing and existing.id != customer_id:
         raise PhoneNumberAlreadyExistsError(
@@ -177,7 +193,13 @@ def complete_customer_profile(
     # Cập nhật
     update_data["full_name"] = full_name
     update_data["phone_number"] = normalized_phone
-    updated = crud.update_customer(db, customer_id, update_data)
+    try:
+        updated = crud.update_customer(db, customer_id, update_data)
+    except IntegrityError:
+        db.rollback()
+        raise PhoneNumberAlreadyExistsError(
+            f"Số điện thoại {normalized_phone} đã tồn tại"
+        )
 
     if not updated:
         raise CustomerNotFoundError(f"Khách hàng {customer_id} không tìm thấy")
@@ -345,20 +367,43 @@ def search_customers(
     search_query: Optional[str] = None,
     page: int = 1,
     per_page: int = 20,
-) -> tuple[list[Customer], int, int]:
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    include_total: bool = True,
+    mode: str = "contains",
+) -> tuple[list[Customer], Optional[int], Optional[int]]:
     """Tìm kiếm khách hàng (không bao gồm khách hàng bị xóa).
 
     Args:
             db: Database session
             search_query: Chuỗi tìm kiếm
-            page: Trang (1-based)
+            page: Trang (1-based), bỏ qua khi có cursor
             per_page: Số item trên mỗi trang
+            cursor: Cursor keyset của trang trước
+            sort: Khóa sắp xếp ("id" hoặc "created_at")
+            order: Chiều sắp xếp ("asc" hoặc "desc")
+            include_total: Có đếm tổng số hay không (COUNT tốn kém trên bảng lớn)
+            mode: "contains" (chứa chuỗi) hoặc "fuzzy" (không dấu, xếp hạng
+                theo độ tương đồng, tìm SĐT theo tiền tố)
 
     Returns:
-            Tuple (danh sách Customer, tổng số, số trang)
+            Tuple (danh sách Customer, tổng số, số trang); tổng số và số trang là
+            None khi include_total=False
+
+    Raises:
+            InvalidCursorError: Nếu cursor không hợp lệ
     """
     customers, total = crud.find_customer_by_query(
-        db, search_query=search_query, page=page, per_page=per_page
+        db,
+        search_query=search_query,
+        page=page,
+        per_page=per_page,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        include_total=include_total,
+        mode=mode,
     )
-    total_pages = (total + per_page - 1) // per_page
+    total_pages = (total + per_page - 1) // per_page if total is not None else None
     return customers, total, total_pages
@@ -3,46 +3,60 @@
 Chứa các hàm CRUD (Create, Read, Update, Delete) cho bảng MediaFile.
 """
 
+from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import func
 from sqlmodel import Session, select
 
-from src.modules.media.models import MediaFile
+from src.modules.media.models import MEDIA_STATUS_ACTIVE, MEDIA_STATUS_PENDING, MediaFile
 
 
 def create_media_record(
     file_path: str,
-    public_url: str,
     file_type: str,
     file_size: int,
     owner_id: Optional[int] = None,
     related_entity_id: Optional[int] = None,
     related_entity_type: Optional[str] = None,
     session: Optional[Session] = None,
+    status: str = MEDIA_STATUS_ACTIVE,
+    parent_id: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    content_hash: Optional[str] = None,
 ) -> MediaFile:
     """Tạo record ảnh mới trong CSDL.
 
     Args:
-        file_path: Đường dẫn file trong Supabase
-        public_url: URL công khai của file
+        file_path: Đường dẫn file trong Supabase (URL được dựng lại từ đây khi trả về)
         file_type: MIME type của file
         file_size: Kích thước file (byte)
         owner_id: ID người tải lên (tùy chọn)
         related_entity_id: ID đối tượng liên quan
         related_entity_type: Loại đối tượng (customer|service|staff)
         session: Database session
+        status: Trạng thái ban đầu ("pending" cho luồng tải lên trực tiếp)
+        parent_id: ID ảnh gốc (chỉ với ảnh phái sinh)
+        width: Chiều rộng ảnh phái sinh (px)
+        height: Chiều cao ảnh phái sinh (px)
+        content_hash: SHA-256 (hex) của nội dung file
 
     Returns:
         MediaFile: Record ảnh vừa tạo
     """
     media = MediaFile(
         file_path=file_path,
-        public_url=public_url,
         file_type=file_type,
         file_size=file_size,
         owner_id=owner_id,
         related_entity_id=related_entity_id,
         related_entity_type=related_entity_type,
+        status=status,
+        parent_id=parent_id,
+        width=width,
+        height=height,
+        content_hash=content_hash,
     )
 
     session.add(media)
@@ -84,6 +98,7 @@ def get_media_list_by_entity(
         .where(
             (MediaFile.related_entity_type == entity_type)
             & (MediaFile.related_entity_id == entity_id)
+            & (MediaFile.status == MEDIA_STATUS_ACTIVE)
         )
         .order_by(MediaFile.created_at.desc())
     )
@@ -108,3 +123,107 @@ def delete_media_record(media_id: int, session: Session) -> bool:
         return True
 
     return False
+
+
+def get_stale_pending_media(
+    older_than: datetime, limit: int, session: Session
+) -> list[MediaFile]:
+    """Lấy các record chờ tải lên (pending) được tạo trước `older_than`.
+
+    Args:
+        older_than: Mốc thời gian (UTC)
+        limit: Số record tối đa
+        session: Database session
+
+    Returns:
+        list[MediaFile]: Các upload bỏ dở, cũ nhất trước
+    """
+    statement = (
+        select(MediaFile)
+        .where(
+            (MediaFile.status == MEDIA_STATUS_PENDING)
+            & (MediaFile.created_at < older_than)
+        )
+        .order_by(MediaFile.id)
+        .limit(limit)
+    )
+    return session.exec(statement).all()
+
+
+def get_media_derivatives(
+    parent_ids: list[int], session: Session
+) -> dict[int, list[MediaFile]]:
+    """Lấy ảnh phái sinh của nhiều ảnh gốc trong một truy vấn.
+
+    Args:
+        parent_ids: Danh sách ID ảnh gốc
+        session: Database session
+
+    Returns:
+        dict[int, list[MediaFile]]: ID ảnh gốc -> ảnh phái sinh (chiều rộng tăng dần)
+    """
+    if not parent_ids:
+        return {}
+    statement = (
+        select(MediaFile)
+        .where(MediaFile.parent_id.in_(parent_ids))
+        .order_by(MediaFile.parent_id, MediaFile.width)
+    )
+    derivatives: dict[int, list[MediaFile]] = {}
+    for media in session.exec(statement).all():
+        derivatives.setdefault(media.parent_id, []).append(media)
+    return derivatives
+
+
+def get_media_by_content_hash(
+    content_hash: str, session: Session, exclude_id: Optional[int] = None
+) -> Optional[MediaFile]:
+    """Lấy một ảnh gốc (đã kích hoạt) có cùng nội dung.
+
+    Args:
+        content_hash: SHA-256 (hex) của nội dung
+        session: Database session
+        exclude_id: Bỏ qua record có ID này
+
+    Returns:
+        MediaFile: Ảnh gốc cùng nội dung hoặc None
+    """
+    statement = select(MediaFile).where(
+        (MediaFile.content_hash == content_hash)
+        & (MediaFile.parent_id.is_(None))
+        & (MediaFile.status == MEDIA_STATUS_ACTIVE)
+    )
+    if exclude_id is not None:
+        statement = statement.where(MediaFile.id != exclude_id)
+    return session.exec(statement.order_by(MediaFile.id).limit(1)).first()
+
+
+def count_media_by_file_path(file_path: str, session: Session) -> int:
+    """Đếm số record đang tham chiếu tới một file trong storage.
+
+    Args:
+        file_path: Đường dẫn file
+        session: Database session
+
+    Returns:
+        int: Số record (0 nghĩa là có thể xóa file)
+    """
+    statement = select(func.count()).select_from(MediaFile).where(MediaFile.file_path == file_path)
+    return session.exec(statement).one()
+
+
+def lock_file_path(file_path: str, session: Session) -> None:
+    """Khóa theo đường dẫn file cho tới hết transaction hiện tại của `session`.
+
+    Nhiều record có thể dùng chung một file (lưu theo nội dung), nên bước "đếm
+    tham chiếu rồi tải lên/xóa file" phải giữ khóa này tới khi commit để tải lên
+    và xóa đồng thời cùng một file không giẫm lên nhau. Dùng advisory lock của
+    PostgreSQL; trên DB khác (SQLite khi test) là no-op.
+
+    Args:
+        file_path: Đường dẫn file
+        session: Database session
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    session.exec(select(func.pg_advisory_xact_lock(func.hashtextextended(file_path, 0))))
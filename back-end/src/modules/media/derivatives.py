@@ -0,0 +1,258 @@
+"""Tạo ảnh phái sinh (thumbnail nhiều kích thước, định dạng hiện đại) cho MediaFile.
+
+Ảnh gốc có thể tới `MAX_FILE_SIZE` (kể cả BMP); trang catalog chỉ cần bản nhỏ.
+Sau khi ảnh được tải lên, `derivative_pipeline.submit(media_id)` lên lịch một
+tác vụ nền: tải ảnh gốc từ storage, resize theo `MEDIA_DERIVATIVE_WIDTHS` và mã
+hóa theo `MEDIA_DERIVATIVE_FORMATS` trên process pool riêng (Pillow giữ GIL khi
+mã hóa AVIF/WebP), rồi lưu mỗi biến thể thành một MediaFile con (`parent_id`).
+Request tải lên không chờ việc này.
+
+Ảnh gốc trùng nội dung (`content_hash`) với một ảnh đã có biến thể thì chỉ sao
+chép record biến thể, không resize hay tải lên lại.
+
+Cần Pillow; thiếu thư viện thì bỏ qua (ảnh gốc vẫn dùng được, `srcset` rỗng).
+Tác vụ chưa xong khi worker dừng sẽ mất; gọi lại `submit` là idempotent.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from src.core.config import settings
+from src.core.db import engine
+from src.core.storage import download_file, upload_file_to_storage
+from src.modules.media.crud import (
+    count_media_by_file_path,
+    create_media_record,
+    get_media_by_content_hash,
+    get_media_by_id,
+    get_media_derivatives,
+    lock_file_path,
+)
+from src.modules.media.models import MEDIA_STATUS_ACTIVE, MediaFile
+
+logger = logging.getLogger(__name__)
+
+FORMAT_MIME_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+def render_derivatives(
+    data: bytes, widths: list[int], formats: list[str], quality: int
+) -> list[tuple[int, int, str, bytes]]:
+    """Resize và mã hóa ảnh (chạy trong process con).
+
+    Không phóng to: chiều rộng lớn hơn ảnh gốc được thay bằng chiều rộng gốc.
+    Định dạng mà bản Pillow hiện tại không mã hóa được sẽ bị bỏ qua.
+
+    Returns:
+        Danh sách (width, height, format, nội dung), width giảm dần
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        largest = max(widths)
+        # JPEG: giải mã thẳng ở tỉ lệ nhỏ hơn (DCT scaling) thay vì full-size
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+    targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+    results = []
+    current = image
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        if current.width != width:
+            # Resize từ bản lớn kế trước: rẻ hơn nhiều so với từ ảnh gốc
+            current = current.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for image_format in formats:
+            frame = current.convert("RGB") if image_format == "jpeg" else current
+            buffer = io.BytesIO()
+            try:
+                frame.save(buffer, image_format.upper(), quality=quality)
+            except (KeyError, OSError):
+                continue
+            results.append((width, height, image_format, buffer.getvalue()))
+    return results
+
+
+def _derivative_path(file_path: str, width: int, image_format: str) -> str:
+    stem = file_path.rsplit(".", 1)[0]
+    return f"{stem}_{width}w.{image_format}"
+
+
+class DerivativePipeline:
+    """Hàng đợi tạo ảnh phái sinh chạy nền trên process pool.
+
+    Attributes:
+        max_workers: Số process resize/mã hóa
+        widths: Các chiều rộng cần tạo (px)
+        formats: Các định dạng cần tạo
+        quality: Chất lượng mã hóa
+        processed: Số ảnh gốc đã tạo xong biến thể
+        failed: Số ảnh gốc tạo biến thể thất bại
+    """
+
+    def __init__(self, max_workers: int, widths: list[int], formats: list[str], quality: int):
+        self.max_workers = max_workers
+        self.widths = widths
+        self.formats = formats
+        self.quality = quality
+        self.processed = 0
+        self.failed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max(1, max_workers) * 2)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: tránh fork một process đang có thread (uvicorn/anyio)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def submit(self, media_id: int) -> None:
+        """Lên lịch tạo biến thể cho ảnh gốc (gọi trong event loop, không chờ)."""
+        if not settings.MEDIA_DERIVATIVES_ENABLED:
+            return
+        task = asyncio.get_running_loop().create_task(self._process(media_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _load(self, media_id: int) -> Optional[MediaFile]:
+        with Session(engine, expire_on_commit=False) as db:
+            media = get_media_by_id(media_id, db)
+            if (
+                media is None
+                or media.status != MEDIA_STATUS_ACTIVE
+                or media.parent_id is not None
+                or get_media_derivatives([media_id], db)
+            ):
+                return None
+            return media
+
+    def _copy_from_duplicate(self, parent: MediaFile) -> bool:
+        """Dùng lại biến thể của ảnh gốc cùng nội dung (nếu có); trả về True nếu đã sao chép."""
+        if not parent.content_hash:
+            return False
+        with Session(engine) as db:
+            duplicate = get_media_by_content_hash(parent.content_hash, db, exclude_id=parent.id)
+            if duplicate is None:
+                return False
+            derivatives = get_media_derivatives([duplicate.id], db).get(duplicate.id, [])
+            if not derivatives:
+                return False
+            # Giữ khóa từng file tới khi commit và kiểm tra lại: ảnh kia có thể
+            # vừa bị xóa cùng file của nó
+            for derivative in derivatives:
+                lock_file_path(derivative.file_path, db)
+                if count_media_by_file_path(derivative.file_path, db) == 0:
+                    db.rollback()
+                    return False
+            for derivative in derivatives:
+                create_media_record(
+                    file_path=derivative.file_path,
+                    file_type=derivative.file_type,
+                    file_size=derivative.file_size,
+                    owner_id=parent.owner_id,
+                    session=db,
+                    parent_id=parent.id,
+                    width=derivative.width,
+                    height=derivative.height,
+                    content_hash=derivative.content_hash,
+                )
+            db.commit()
+            return True
+
+    async def _upload(self, parent: MediaFile, variants: list[tuple[int, int, str, bytes]]) -> None:
+        for width, _, image_format, content in variants:
+            file_path = _derivative_path(parent.file_path, width, image_format)
+            await upload_file_to_storage(io.BytesIO(content), file_path, FORMAT_MIME_TYPES[image_format])
+
+    def _store(self, parent: MediaFile, variants: list[tuple[int, int, str, bytes]]) -> None:
+        with Session(engine) as db:
+            for width, height, image_format, content in variants:
+                file_path = _derivative_path(parent.file_path, width, image_format)
+                content_type = FORMAT_MIME_TYPES[image_format]
+                create_media_record(
+                    file_path=file_path,
+                    file_type=content_type,
+                    file_size=len(content),
+                    owner_id=parent.owner_id,
+                    session=db,
+                    parent_id=parent.id,
+                    width=width,
+                    height=height,
+                    content_hash=hashlib.sha256(content).hexdigest(),
+                )
+            db.commit()
+
+    async def _process(self, media_id: int) -> None:
+        async with self._semaphore:
+            try:
+                parent = await run_in_threadpool(self._load, media_id)
+                if parent is None:
+                    return
+                if await run_in_threadpool(self._copy_from_duplicate, parent):
+                    self.processed += 1
+                    logger.info(f"✓ Dùng lại ảnh phái sinh của ảnh cùng nội dung cho ảnh ID {media_id}")
+                    return
+                data = await download_file(parent.file_path)
+                loop = asyncio.get_running_loop()
+                variants = await loop.run_in_executor(
+                    self._get_executor(),
+                    render_derivatives,
+                    data,
+                    self.widths,
+                    self.formats,
+                    self.quality,
+                )
+                await self._upload(parent, variants)
+                await run_in_threadpool(self._store, parent, variants)
+                self.processed += 1
+                logger.info(f"✓ Đã tạo {len(variants)} ảnh phái sinh cho ảnh ID {media_id}")
+            except ImportError:
+                self.failed += 1
+                logger.warning("✗ Chưa cài Pillow, bỏ qua tạo ảnh phái sinh")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"✗ Lỗi tạo ảnh phái sinh cho ảnh ID {media_id}: {e}")
+
+    async def stop(self) -> None:
+        """Chờ các tác vụ đang chạy rồi dừng process pool (gọi khi shutdown)."""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=30)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """Thống kê hiện tại (dùng cho health/metrics)."""
+        return {
+            "workers": self.max_workers,
+            "pending": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+derivative_pipeline = DerivativePipeline(
+    max_workers=settings.MEDIA_DERIVATIVE_WORKERS,
+    widths=settings.MEDIA_DERIVATIVE_WIDTHS,
+    formats=settings.MEDIA_DERIVATIVE_FORMATS,
+    quality=settings.MEDIA_DERIVATIVE_QUALITY,
+)
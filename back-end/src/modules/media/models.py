@@ -11,33 +11,49 @@ from sqlmodel import Field, SQLModel
 
 from src.core.utils import get_utc_now
 
+MEDIA_STATUS_PENDING = "pending"
+MEDIA_STATUS_ACTIVE = "active"
+
 
 class MediaFile(SQLModel, table=True):
     """Bảng quản lý metadata ảnh trên Supabase Storage.
 
     Lưu trữ thông tin về các file ảnh được tải lên, bao gồm đường dẫn,
-    URL công khai, kích thước và thông tin về đối tượng liên quan.
+    kích thước và thông tin về đối tượng liên quan. URL không được lưu: dựng lại
+    từ `file_path` mỗi khi trả về (xem `storage.get_media_url`), nên đổi CDN
+    hoặc bật URL ký không cần sửa dữ liệu.
 
     Attributes:
         id: Primary key
-        file_path: Đường dẫn file trong Supabase Storage (unique)
-        public_url: URL công khai để truy cập ảnh
+        file_path: Đường dẫn file trong Supabase Storage; ảnh cùng nội dung dùng
+            chung một file (`blobs/<sha256>...`) nên nhiều record có thể trùng path
         file_type: MIME type của file (ví dụ: image/jpeg)
         file_size: Kích thước file tính bằng byte
+        content_hash: SHA-256 (hex) của nội dung file, NULL với ảnh tải lên trước
+            khi có lưu trữ theo nội dung
         owner_id: ID của người tải lên (nullable)
         related_entity_id: ID của đối tượng liên quan
         related_entity_type: Loại đối tượng (customer|service|staff)
+        status: "pending" khi đã cấp URL tải lên trực tiếp nhưng chưa finalize,
+            "active" khi ảnh dùng được
+        parent_id: ID ảnh gốc nếu đây là ảnh phái sinh (thumbnail), NULL với ảnh gốc
+        width: Chiều rộng (px) của ảnh phái sinh
+        height: Chiều cao (px) của ảnh phái sinh
         created_at: Thời điểm tạo record (UTC)
         updated_at: Thời điểm cập nhật cuối cùng (UTC)
     """
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    file_path: str = Field(unique=True, index=True, max_length=500)
-    public_url: str = Field(max_length=1000)
+    file_path: str = Field(index=True, max_length=500)
     file_type: str = Field(max_length=100)
     file_size: int = Field(default=0)
+    content_hash: Optional[str] = Field(default=None, index=True, max_length=64)
     owner_id: Optional[int] = Field(default=None)
     related_entity_id: Optional[int] = Field(default=None, index=True)
     related_entity_type: Optional[str] = Field(default=None, index=True, max_length=50)
+    status: str = Field(default=MEDIA_STATUS_ACTIVE, index=True, max_length=20)
+    parent_id: Optional[int] = Field(default=None, foreign_key="mediafile.id", index=True)
+    width: Optional[int] = Field(default=None)
+    height: Optional[int] = Field(default=None)
     created_at: datetime = Field(default_factory=get_utc_now)
     updated_at: datetime = Field(default_factory=get_utc_now)
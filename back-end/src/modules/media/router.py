@@ -3,24 +3,40 @@
 Định nghĩa các endpoint để tải lên, xóa và truy vấn ảnh.
 """
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlmodel import Session
 
+from src.core.config import settings
 from src.core.db import get_session
 from src.core.dependencies import get_current_user
-from src.modules.auth.models import User
+from src.modules.auth.principal import Principal
 from src.modules.customers import crud as customer_crud # Thêm import
+from src.core.storage import (
+    get_local_file_path,
+    open_upload,
+    verify_local_upload_signature,
+    verify_url_signature,
+)
 from src.modules.media.schemas import (
     DeleteMessageResponse,
     MediaListResponse,
     MediaResponse,
+    UploadUrlRequest,
+    UploadUrlResponse,
 )
 from src.modules.media.service import (
+    create_upload_url,
     delete_media_file,
+    finalize_upload,
     get_media_for_entity,
     upload_avatar_for_customer,
     upload_image_for_service,
 )
+from src.modules.media.validation import StreamingImageValidator
 
 router = APIRouter(prefix="/media", tags=["media"])
 
@@ -33,12 +49,14 @@ router = APIRouter(prefix="/media", tags=["media"])
 )
 async def upload_my_customer_avatar(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ) -> MediaResponse:
     """Người dùng đã đăng nhập tự tải lên ảnh đại diện của chính mình."""
     # Tìm hồ sơ khách hàng từ user đang đăng nhập
-    customer = customer_crud.get_customer_by_user_id(db=session, user_id=current_user.id)
+    customer = await run_in_threadpool(
+        customer_crud.get_customer_by_user_id, db=session, user_id=current_user.id
+    )
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -58,7 +76,7 @@ async def upload_my_customer_avatar(
 async def upload_customer_avatar(
     customer_id: int,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ) -> MediaResponse:
     """Tải ảnh đại diện cho khách hàng.
@@ -77,7 +95,7 @@ async def upload_customer_avatar(
 async def upload_service_image(
     service_id: int,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ) -> MediaResponse:
     """Tải ảnh cho dịch vụ.
@@ -87,6 +105,121 @@ async def upload_service_image(
     return await upload_image_for_service(service_id, file, session)
 
 
+@router.post(
+    "/customers/{customer_id}/avatar/upload-url",
+    response_model=UploadUrlResponse,
+    status_code=201,
+    summary="Cấp URL tải ảnh đại diện trực tiếp lên storage",
+)
+async def request_customer_avatar_upload(
+    customer_id: int,
+    request: UploadUrlRequest,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+) -> UploadUrlResponse:
+    """Bước 1: cấp URL tải lên; client gửi file thẳng tới storage rồi gọi finalize.
+
+    **Yêu cầu:** JWT token (xác thực)
+    """
+    return await create_upload_url("customer", customer_id, request, current_user.id, session)
+
+
+@router.post(
+    "/services/{service_id}/images/upload-url",
+    response_model=UploadUrlResponse,
+    status_code=201,
+    summary="Cấp URL tải ảnh dịch vụ trực tiếp lên storage",
+)
+async def request_service_image_upload(
+    service_id: int,
+    request: UploadUrlRequest,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+) -> UploadUrlResponse:
+    """Bước 1: cấp URL tải lên; client gửi file thẳng tới storage rồi gọi finalize.
+
+    **Yêu cầu:** JWT token (xác thực)
+    """
+    return await create_upload_url("service", service_id, request, current_user.id, session)
+
+
+@router.post(
+    "/{media_id}/finalize",
+    response_model=MediaResponse,
+    status_code=200,
+    summary="Xác nhận ảnh đã tải lên trực tiếp",
+)
+async def finalize_media_upload(
+    media_id: int,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+) -> MediaResponse:
+    """Bước 2: kiểm tra file trong storage (kích thước, MIME type) và kích hoạt ảnh.
+
+    **Yêu cầu:** JWT token (người đã yêu cầu URL tải lên)
+    """
+    return await finalize_upload(media_id, current_user.id, session)
+
+
+@router.put(
+    "/local/{file_path:path}",
+    status_code=200,
+    include_in_schema=False,
+)
+async def local_storage_upload(
+    file_path: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+) -> dict:
+    """Nhận file cho local storage (thay cho URL tải lên của Supabase khi dev/test)."""
+    if settings.STORAGE_BACKEND != "local":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not verify_local_upload_signature(file_path, expires, signature):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="URL tải lên không hợp lệ hoặc đã hết hạn")
+
+    # Như storage thật: kiểm tra giới hạn kích thước/loại ngay khi nhận, dừng sớm khi vi phạm
+    validator = StreamingImageValidator()
+    upload = await open_upload(file_path)
+    try:
+        async for chunk in request.stream():
+            validator.feed(chunk)
+            await upload.write(chunk)
+        validator.finish()
+        await upload.complete()
+    except BaseException:
+        await upload.abort()
+        raise
+    return {"path": file_path}
+
+
+@router.get(
+    "/local/{file_path:path}",
+    include_in_schema=False,
+)
+async def local_storage_download(
+    file_path: str,
+    expires: Optional[int] = Query(None),
+    signature: Optional[str] = Query(None),
+) -> FileResponse:
+    """Phục vụ file của local storage (dev/test); yêu cầu URL ký khi bật MEDIA_SIGNED_URLS."""
+    if settings.STORAGE_BACKEND != "local":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if settings.MEDIA_SIGNED_URLS and not (
+        expires is not None
+        and signature is not None
+        and verify_url_signature(file_path, expires, signature)
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="URL không hợp lệ hoặc đã hết hạn")
+    try:
+        target = get_local_file_path(file_path)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not target.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return FileResponse(target)
+
+
 @router.get(
     "/customers/{customer_id}",
     response_model=MediaListResponse,
@@ -123,7 +256,7 @@ async def get_service_media(
 )
 async def delete_media(
     media_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ) -> DeleteMessageResponse:
     """Xóa ảnh khỏi Supabase Storage và CSDL.
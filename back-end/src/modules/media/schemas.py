@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class MediaResponse(BaseModel):
@@ -12,12 +12,15 @@ class MediaResponse(BaseModel):
     Attributes:
         id: ID ảnh
         file_path: Đường dẫn file trong Supabase Storage
-        public_url: URL công khai để truy cập ảnh
+        public_url: URL truy cập ảnh (qua CDN nếu có; URL ký có hạn khi bucket private)
         file_type: MIME type của file
         file_size: Kích thước file (byte)
         related_entity_type: Loại đối tượng liên quan
         related_entity_id: ID của đối tượng liên quan
         created_at: Thời điểm tạo
+        srcset: MIME type -> chuỗi srcset của ảnh phái sinh (ví dụ
+            {"image/webp": "https://.../a_64w.webp 64w, ..."}), dùng cho
+            `<picture><source type=... srcset=...>`; rỗng khi chưa tạo xong
     """
 
     id: int
@@ -28,6 +31,7 @@ class MediaResponse(BaseModel):
     related_entity_type: Optional[str] = None
     related_entity_id: Optional[int] = None
     created_at: datetime
+    srcset: dict[str, str] = {}
 
 
 class MediaListResponse(BaseModel):
@@ -48,3 +52,40 @@ class DeleteMessageResponse(BaseModel):
     """
 
     message: str
+
+
+class UploadUrlRequest(BaseModel):
+    """Yêu cầu cấp URL để tải ảnh trực tiếp lên storage.
+
+    Attributes:
+        filename: Tên file gốc (lấy phần mở rộng)
+        content_type: MIME type của file
+        file_size: Kích thước file dự kiến (byte)
+    """
+
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field(..., max_length=100)
+    file_size: int = Field(..., gt=0)
+
+
+class UploadUrlResponse(BaseModel):
+    """URL tải lên trực tiếp và record ảnh đang chờ.
+
+    Client gửi file bằng `method` tới `upload_url` kèm `headers`, sau đó gọi
+    `POST /media/{media_id}/finalize` để kích hoạt ảnh.
+
+    Attributes:
+        media_id: ID record ảnh (trạng thái pending)
+        file_path: Đường dẫn file trong storage
+        upload_url: URL tải lên (có hạn)
+        method: HTTP method dùng để tải lên
+        headers: Header cần gửi kèm
+        expires_at: Thời điểm URL hết hạn (UTC)
+    """
+
+    media_id: int
+    file_path: str
+    upload_url: str
+    method: str
+    headers: dict[str, str]
+    expires_at: datetime
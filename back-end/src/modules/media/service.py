@@ -2,71 +2,212 @@
 
 Chứa các hàm xử lý tải lên, xóa và truy vấn ảnh từ Supabase Storage
 và cơ sở dữ liệu.
+
+File được lưu theo nội dung: đường dẫn là SHA-256 của bytes
+(`blobs/ab/abcd....jpg`), nên cùng một ảnh tải lên cho nhiều đối tượng chỉ được
+lưu và truyền một lần; mỗi lần tải vẫn có record MediaFile riêng. File chỉ bị xóa
+khỏi storage khi không còn record nào tham chiếu; việc đếm tham chiếu rồi tải
+lên/xóa luôn giữ `lock_file_path` tới khi commit.
+
+Session DB là session đồng bộ: mọi truy vấn/commit trong các hàm async ở đây
+chạy qua `run_in_threadpool` để không chặn event loop.
 """
 
 import logging
 import time
-from typing import Optional
+from contextlib import aclosing
+from datetime import timedelta
+from typing import AsyncIterator, Optional
 
+from anyio import from_thread
 from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
 from src.core.config import settings
 from src.core.storage import (
+    create_signed_upload_url,
     delete_file_from_storage,
-    get_public_url,
+    get_file_info,
+    get_media_url,
+    iter_file,
+    move_file,
     upload_file_to_storage,
 )
+from src.core.utils import get_utc_now
 from src.modules.media.crud import (
+    count_media_by_file_path,
     create_media_record,
     delete_media_record,
     get_media_by_id,
+    get_media_derivatives,
     get_media_list_by_entity,
+    get_stale_pending_media,
+    lock_file_path,
 )
-from src.modules.media.models import MediaFile
-from src.modules.media.schemas import MediaListResponse, MediaResponse
+from src.modules.media.derivatives import derivative_pipeline
+from src.modules.media.models import MEDIA_STATUS_ACTIVE, MEDIA_STATUS_PENDING, MediaFile
+from src.modules.media.schemas import (
+    MediaListResponse,
+    MediaResponse,
+    UploadUrlRequest,
+    UploadUrlResponse,
+)
+from src.modules.media.validation import StreamingImageValidator
 
 logger = logging.getLogger(__name__)
 
 
-def map_media_model_to_response(media: MediaFile) -> MediaResponse:
-    """Chuyển đổi MediaFile model sang MediaResponse schema."""
+def _build_srcset(derivatives: list[MediaFile]) -> dict[str, str]:
+    """Gom ảnh phái sinh thành chuỗi srcset theo từng MIME type."""
+    entries: dict[str, list[str]] = {}
+    for derivative in derivatives:
+        entries.setdefault(derivative.file_type, []).append(
+            f"{get_media_url(derivative.file_path)} {derivative.width}w"
+        )
+    return {file_type: ", ".join(items) for file_type, items in entries.items()}
+
+
+def map_media_model_to_response(
+    media: MediaFile, derivatives: Optional[list[MediaFile]] = None
+) -> MediaResponse:
+    """Chuyển đổi MediaFile model (kèm ảnh phái sinh nếu có) sang MediaResponse schema."""
     return MediaResponse(
         id=media.id,
         file_path=media.file_path,
-        public_url=media.public_url,
+        public_url=get_media_url(media.file_path),
         file_type=media.file_type,
         file_size=media.file_size,
         related_entity_type=media.related_entity_type,
         related_entity_id=media.related_entity_id,
         created_at=media.created_at,
+        srcset=_build_srcset(derivatives or []),
     )
 
 
 def _validate_image_file(file: UploadFile) -> None:
-    """Kiểm tra tính hợp lệ của file ảnh.
+    """Loại sớm file quá lớn khi đã biết kích thước (chỉ là kiểm tra nhanh).
+
+    Loại file và kích thước thực được kiểm tra trên nội dung bởi
+    `StreamingImageValidator`; `content_type`/`size` của client không được tin.
 
     Args:
         file: File được tải lên
 
     Raises:
-        HTTPException: Nếu file không hợp lệ
+        HTTPException: Nếu file quá lớn
     """
-    # Kiểm tra MIME type
-    if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
+    if file.size:
+        _check_file_size(file.size)
+
+
+async def _validate_stream(chunks: AsyncIterator[bytes]) -> StreamingImageValidator:
+    """Chạy validator qua toàn bộ nội dung; dừng ngay ở chunk vi phạm đầu tiên."""
+    validator = StreamingImageValidator()
+    # aclosing: dừng sớm thì đóng ngay nguồn đọc (kết nối HTTP tới storage)
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            validator.feed(chunk)
+    validator.finish()
+    return validator
+
+
+async def _iter_upload_file(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(settings.MEDIA_UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+def _check_image_type(content_type: Optional[str]) -> None:
+    """Kiểm tra MIME type thuộc danh sách ảnh được phép."""
+    if content_type not in settings.ALLOWED_IMAGE_TYPES:
         raise HTTPException(
             status_code=400,
             detail=f"Loại file không được phép. Chỉ hỗ trợ: {', '.join(settings.ALLOWED_IMAGE_TYPES)}",
         )
 
-    # Kiểm tra kích thước file
-    if file.size and file.size > settings.MAX_FILE_SIZE:
+
+def _check_file_size(file_size: int) -> None:
+    """Kiểm tra kích thước file không vượt MAX_FILE_SIZE."""
+    if file_size > settings.MAX_FILE_SIZE:
         raise HTTPException(
             status_code=413,  # Payload Too Large
             detail=f"Kích thước file quá lớn. Tối đa: {settings.MAX_FILE_SIZE // 1024 // 1024}MB",
         )
 
 
+def _build_file_path(entity_type: str, entity_id: int, filename: Optional[str]) -> str:
+    """Tạo đường dẫn file duy nhất cho ảnh của một đối tượng."""
+    file_extension = filename.split(".")[-1] if filename and "." in filename else "jpg"
+    timestamp = int(time.time() * 1000)
+    if entity_type == "customer":
+        return f"customers/{entity_id}/avatar_{timestamp}.{file_extension}"
+    return f"{entity_type}s/{entity_id}/image_{timestamp}.{file_extension}"
+
+
+_IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "image/bmp": "bmp",
+    "image/avif": "avif",
+}
+
+
+def _blob_path(content_hash: str, content_type: Optional[str]) -> str:
+    """Đường dẫn file theo nội dung (cùng bytes thì cùng đường dẫn)."""
+    extension = _IMAGE_EXTENSIONS.get(content_type, "bin")
+    return f"blobs/{content_hash[:2]}/{content_hash}.{extension}"
+
+
+def _commit_new_media(session: Session, **fields) -> MediaFile:
+    """Tạo record MediaFile, commit và nạp lại (chạy trong threadpool)."""
+    media = create_media_record(session=session, **fields)
+    session.commit()
+    session.refresh(media)
+    return media
+
+
+def _is_unreferenced(file_path: str, session: Session) -> bool:
+    """Khóa đường dẫn file (tới khi commit) và kiểm tra không còn record tham chiếu."""
+    lock_file_path(file_path, session)
+    return count_media_by_file_path(file_path, session) == 0
+
+
+async def _store_uploaded_image(
+    entity_type: str, entity_id: int, file: UploadFile, session: Session
+) -> MediaFile:
+    """Lưu ảnh tải qua API: băm nội dung, chỉ tải lên storage nếu chưa có, tạo record."""
+    # Kiểm tra file hợp lệ
+    _validate_image_file(file)
+
+    # Lượt 1 (trên file tạm cục bộ): nhận diện loại, giới hạn kích thước, băm nội dung
+    validator = await _validate_stream(_iter_upload_file(file))
+    await file.seek(0)
+    file_path = _blob_path(validator.content_hash, validator.content_type)
+
+    # Lượt 2: gửi theo chunk lên Supabase nếu nội dung này chưa được lưu.
+    # Giữ khóa tới khi commit record để không bị xóa song song giữa chừng.
+    if await run_in_threadpool(_is_unreferenced, file_path, session):
+        await upload_file_to_storage(file.file, file_path, validator.content_type)
+    else:
+        logger.info(f"✓ Nội dung đã có trong storage, dùng lại: {file_path}")
+
+    # Tạo record trong DB
+    media = await run_in_threadpool(
+        _commit_new_media,
+        session,
+        file_path=file_path,
+        file_type=validator.content_type,
+        file_size=validator.size,
+        related_entity_id=entity_id,
+        related_entity_type=entity_type,
+        content_hash=validator.content_hash,
+    )
+    derivative_pipeline.submit(media.id)
+    return media
+
+
 async def upload_avatar_for_customer(
     customer_id: int, file: UploadFile, session: Session
 ) -> MediaResponse:
@@ -86,39 +227,13 @@ async def upload_avatar_for_customer(
     from src.modules.customers.models import Customer
 
     # Kiểm tra khách hàng tồn tại
-    customer = session.get(Customer, customer_id)
+    customer = await run_in_threadpool(session.get, Customer, customer_id)
     if not customer:
         raise HTTPException(
             status_code=404, detail=f"Khách hàng ID {customer_id} không tìm thấy"
         )
 
-    # Kiểm tra file hợp lệ
-    _validate_image_file(file)
-
-    # Tạo đường dẫn file duy nhất
-    file_extension = file.filename.split(".")[-1] if file.filename else "jpg"
-    timestamp = int(time.time() * 1000)
-    file_path = f"customers/{customer_id}/avatar_{timestamp}.{file_extension}"
-
-    # Tải file lên Supabase
-    public_url = upload_file_to_storage(file.file, file_path, file.content_type)
-
-    # Lấy kích thước file
-    file_size = file.size or 0
-
-    # Tạo record trong DB
-    media = create_media_record(
-        file_path=file_path,
-        public_url=public_url,
-        file_type=file.content_type or "image/jpeg",
-        file_size=file_size,
-        related_entity_id=customer_id,
-        related_entity_type="customer",
-        session=session,
-    )
-
-    session.commit()
-    session.refresh(media)
+    media = await _store_uploaded_image("customer", customer_id, file, session)
 
     logger.info(f"✓ Tải ảnh đại diện cho khách hàng {customer_id} thành công")
 
@@ -150,44 +265,180 @@ async def upload_image_for_service(
     #         status_code=404, detail=f"Dịch vụ ID {service_id} không tìm thấy"
     #     )
 
-    # Kiểm tra file hợp lệ
-    _validate_image_file(file)
+    media = await _store_uploaded_image("service", service_id, file, session)
 
-    # Tạo đường dẫn file duy nhất
-    file_extension = file.filename.split(".")[-1] if file.filename else "jpg"
-    timestamp = int(time.time() * 1000)
-    file_path = f"services/{service_id}/image_{timestamp}.{file_extension}"
+    logger.info(f"✓ Tải ảnh cho dịch vụ {service_id} thành công")
 
-    # Tải file lên Supabase
-    public_url = upload_file_to_storage(file.file, file_path, file.content_type)
+    return map_media_model_to_response(media)
 
-    # Lấy kích thước file
-    file_size = file.size or 0
 
-    # Tạo record trong DB
-    media = create_media_record(
+async def create_upload_url(
+    entity_type: str,
+    entity_id: int,
+    request: UploadUrlRequest,
+    owner_id: int,
+    session: Session,
+) -> UploadUrlResponse:
+    """Cấp URL để client tải ảnh trực tiếp lên storage (bước 1 của 2).
+
+    Tạo record MediaFile trạng thái pending; file không đi qua API. Ảnh chỉ
+    xuất hiện trong danh sách sau khi được `finalize_upload`.
+
+    Args:
+        entity_type: Loại đối tượng (customer|service)
+        entity_id: ID của đối tượng
+        request: Tên file, MIME type và kích thước dự kiến
+        owner_id: ID người yêu cầu (chỉ người này được finalize)
+        session: Database session
+
+    Returns:
+        UploadUrlResponse: URL tải lên và ID record đang chờ
+
+    Raises:
+        HTTPException: Nếu đối tượng không tìm thấy hoặc file không hợp lệ
+    """
+    if entity_type == "customer":
+        from src.modules.customers.models import Customer
+
+        if not await run_in_threadpool(session.get, Customer, entity_id):
+            raise HTTPException(
+                status_code=404, detail=f"Khách hàng ID {entity_id} không tìm thấy"
+            )
+
+    # Kiểm tra sớm theo thông tin client khai báo; kiểm tra lại khi finalize
+    _check_image_type(request.content_type)
+    _check_file_size(request.file_size)
+
+    file_path = _build_file_path(entity_type, entity_id, request.filename)
+    upload = await create_signed_upload_url(file_path, request.content_type)
+
+    media = await run_in_threadpool(
+        _commit_new_media,
+        session,
         file_path=file_path,
-        public_url=public_url,
-        file_type=file.content_type or "image/jpeg",
-        file_size=file_size,
-        related_entity_id=service_id,
-        related_entity_type="service",
-        session=session,
+        file_type=request.content_type,
+        file_size=request.file_size,
+        owner_id=owner_id,
+        related_entity_id=entity_id,
+        related_entity_type=entity_type,
+        status=MEDIA_STATUS_PENDING,
     )
 
+    return UploadUrlResponse(
+        media_id=media.id,
+        file_path=file_path,
+        upload_url=upload["url"],
+        method=upload["method"],
+        headers=upload["headers"],
+        expires_at=get_utc_now() + timedelta(seconds=settings.MEDIA_UPLOAD_URL_EXPIRE_SECONDS),
+    )
+
+
+async def finalize_upload(media_id: int, owner_id: int, session: Session) -> MediaResponse:
+    """Xác nhận ảnh đã được tải lên trực tiếp và kích hoạt record (bước 2 của 2).
+
+    Nội dung được đọc lại từ storage theo chunk để nhận diện loại ảnh (magic
+    bytes), kiểm tra kích thước và băm (không tin thông tin client khai báo).
+    File vi phạm bị xóa khỏi storage cùng record.
+
+    Args:
+        media_id: ID record ảnh đang chờ
+        owner_id: ID người gọi (phải là người đã yêu cầu URL)
+        session: Database session
+
+    Returns:
+        MediaResponse: Thông tin ảnh đã kích hoạt
+
+    Raises:
+        HTTPException: Nếu record không tồn tại, file chưa được tải lên hoặc
+            không hợp lệ
+    """
+    media = await run_in_threadpool(get_media_by_id, media_id, session)
+    if not media or media.owner_id != owner_id:
+        raise HTTPException(status_code=404, detail=f"Ảnh ID {media_id} không tìm thấy")
+    if media.status == MEDIA_STATUS_ACTIVE:
+        return map_media_model_to_response(media)
+
+    info = await get_file_info(media.file_path)
+    if info is None:
+        raise HTTPException(status_code=409, detail="File chưa được tải lên storage")
+
+    try:
+        # Kích thước theo metadata loại sớm file quá lớn mà không cần đọc nội dung
+        _check_file_size(info["size"])
+        validator = await _validate_stream(iter_file(media.file_path))
+    except HTTPException:
+        await delete_file_from_storage(media.file_path)
+        await run_in_threadpool(_delete_and_commit, [media.id], session)
+        logger.warning(f"✗ Ảnh tải lên trực tiếp không hợp lệ, đã xóa: {media.file_path}")
+        raise
+
+    # Chuyển file về đường dẫn theo nội dung; nội dung đã có thì bỏ bản vừa tải
+    content_hash = validator.content_hash
+    blob_path = _blob_path(content_hash, validator.content_type)
+    if await run_in_threadpool(_is_unreferenced, blob_path, session):
+        await move_file(media.file_path, blob_path)
+    else:
+        await delete_file_from_storage(media.file_path)
+        logger.info(f"✓ Nội dung đã có trong storage, dùng lại: {blob_path}")
+
+    media.file_path = blob_path
+    media.content_hash = content_hash
+    media.file_size = validator.size
+    media.file_type = validator.content_type
+    media.status = MEDIA_STATUS_ACTIVE
+    media.updated_at = get_utc_now()
+    await run_in_threadpool(_commit_and_refresh, media, session)
+
+    logger.info(f"✓ Kích hoạt ảnh tải lên trực tiếp ID {media.id}")
+    derivative_pipeline.submit(media.id)
+    return map_media_model_to_response(media)
+
+
+def delete_stale_pending_uploads(db: Session, batch_size: int) -> int:
+    """Xóa một lô upload bỏ dở (pending quá hạn URL tải lên), cả file lẫn record.
+
+    Dùng bởi job dọn dẹp nền (chạy trong worker thread; thao tác storage được
+    chuyển về event loop).
+
+    Returns:
+        Số record đã xóa
+    """
+    grace = timedelta(seconds=settings.MEDIA_UPLOAD_URL_EXPIRE_SECONDS * 2)
+    stale = get_stale_pending_media(get_utc_now() - grace, batch_size, db)
+    for media in stale:
+        try:
+            from_thread.run(delete_file_from_storage, media.file_path)
+        except Exception:
+            pass  # File thường chưa từng được tải lên
+        db.delete(media)
+    db.commit()
+    return len(stale)
+
+
+def _commit_and_refresh(media: MediaFile, session: Session) -> None:
     session.commit()
     session.refresh(media)
 
-    logger.info(f"✓ Tải ảnh cho dịch vụ {service_id} thành công")
 
-    return map_media_model_to_response(media)
+def _delete_and_commit(media_ids: list[int], session: Session) -> None:
+    """Xóa các record theo thứ tự và commit; lỗi thì rollback rồi ném lại."""
+    try:
+        for media_id in media_ids:
+            delete_media_record(media_id, session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
 
 
 async def delete_media_file(media_id: int, session: Session) -> dict:
-    """Xóa ảnh khỏi Supabase Storage và CSDL.
+    """Xóa ảnh (kèm ảnh phái sinh) khỏi CSDL và Supabase Storage.
 
-    Sử dụng transaction để đảm bảo cả xóa file và record đều thành công
-    hoặc thất bại cùng nhau.
+    Record được xóa trong một transaction; sau khi commit, file nào không còn
+    record nào tham chiếu (đếm lại theo đường dẫn, dưới `lock_file_path`) mới
+    bị xóa khỏi storage. Lỗi xóa file chỉ để lại file mồ côi, không làm hỏng
+    dữ liệu.
 
     Args:
         media_id: ID của ảnh cần xóa
@@ -200,29 +451,40 @@ async def delete_media_file(media_id: int, session: Session) -> dict:
         HTTPException: Nếu ảnh không tìm thấy
     """
     # Tìm record trong DB
-    media = get_media_by_id(media_id, session)
+    media = await run_in_threadpool(get_media_by_id, media_id, session)
     if not media:
         raise HTTPException(status_code=404, detail=f"Ảnh ID {media_id} không tìm thấy")
 
-    # Bắt đầu transaction
-    try:
-        # Xóa file từ Supabase
-        delete_file_from_storage(media.file_path)
-
-        # Xóa record từ DB
-        delete_media_record(media_id, session)
-
-        session.commit()
-
-        logger.info(f"✓ Xóa ảnh ID {media_id} thành công")
-
-        return {"message": "Xóa ảnh thành công"}
+    derivatives = (
+        await run_in_threadpool(get_media_derivatives, [media_id], session)
+    ).get(media_id, [])
+    file_paths = list(dict.fromkeys([d.file_path for d in derivatives] + [media.file_path]))
 
+    # Xóa record từ DB trong một transaction (ảnh phái sinh trước, ảnh gốc sau)
+    try:
+        await run_in_threadpool(
+            _delete_and_commit, [d.id for d in derivatives] + [media_id], session
+        )
     except Exception as e:
-        session.rollback()
         logger.error(f"✗ Lỗi xóa ảnh: {str(e)}")
         raise HTTPException(status_code=500, detail="Lỗi xóa ảnh")
 
+    # Xóa file từ Supabase khi không còn tham chiếu
+    # Mỗi file một transaction ngắn: upload cùng nội dung chờ tới khi xóa xong
+    # rồi mới đếm, nên sẽ tải lại file thay vì trỏ vào file đã bị xóa.
+    for file_path in file_paths:
+        try:
+            if await run_in_threadpool(_is_unreferenced, file_path, session):
+                await delete_file_from_storage(file_path)
+        except Exception as e:
+            logger.error(f"✗ Không xóa được file {file_path}, để lại file mồ côi: {e}")
+        finally:
+            await run_in_threadpool(session.commit)
+
+    logger.info(f"✓ Xóa ảnh ID {media_id} thành công")
+
+    return {"message": "Xóa ảnh thành công"}
+
 
 async def get_media_for_entity(
     entity_type: str, entity_id: int, session: Session
@@ -249,10 +511,18 @@ async def get_media_for_entity(
         )
 
     # Truy vấn danh sách ảnh
-    media_list = get_media_list_by_entity(entity_type, entity_id, session)
+    media_list = await run_in_threadpool(get_media_list_by_entity, entity_type, entity_id, session)
+
+    # Ảnh phái sinh của cả danh sách trong một truy vấn
+    derivatives = await run_in_threadpool(
+        get_media_derivatives, [media.id for media in media_list], session
+    )
 
     # Map thành MediaResponse
-    responses = [map_media_model_to_response(media) for media in media_list]
+    responses = [
+        map_media_model_to_response(media, derivatives.get(media.id))
+        for media in media_list
+    ]
 
     return MediaListResponse(media_list=responses)
 
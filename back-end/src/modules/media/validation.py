@@ -0,0 +1,89 @@
+"""Kiểm tra ảnh tải lên theo dạng stream.
+
+Không tin `content_type` hay `size` do client gửi: loại file được xác định từ
+magic bytes ở đầu nội dung, kích thước được đếm dần khi đọc từng chunk và vượt
+`MAX_FILE_SIZE` thì dừng ngay, không chờ đọc hết. SHA-256 được tính trong cùng
+lượt đọc. Bộ nhớ dùng cho mỗi upload chỉ là một chunk.
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException
+
+from src.core.config import settings
+
+# Số byte đầu cần để nhận diện mọi định dạng bên dưới
+SNIFF_SIZE = 16
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Xác định MIME type ảnh từ magic bytes; None nếu không phải ảnh được hỗ trợ."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "image/avif"
+    if head.startswith(b"BM"):
+        return "image/bmp"
+    return None
+
+
+class StreamingImageValidator:
+    """Kiểm tra một ảnh qua từng chunk: loại file, kích thước và SHA-256.
+
+    Dùng: gọi `feed(chunk)` cho mỗi chunk theo thứ tự, rồi `finish()`. Cả hai
+    ném HTTPException ngay khi phát hiện vi phạm để caller hủy upload.
+
+    Attributes:
+        max_size: Kích thước tối đa (byte)
+        content_type: MIME type nhận diện được (sau khi đủ byte đầu)
+        size: Số byte đã đọc
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or settings.MAX_FILE_SIZE
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self._head = b""
+        self._digest = hashlib.sha256()
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 (hex) của phần đã đọc."""
+        return self._digest.hexdigest()
+
+    def _check_type(self) -> None:
+        content_type = sniff_image_type(self._head)
+        if content_type not in settings.ALLOWED_IMAGE_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Nội dung không phải ảnh hợp lệ. Chỉ hỗ trợ: {', '.join(settings.ALLOWED_IMAGE_TYPES)}",
+            )
+        self.content_type = content_type
+
+    def feed(self, chunk: bytes) -> None:
+        """Kiểm tra chunk kế tiếp."""
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise HTTPException(
+                status_code=413,  # Payload Too Large
+                detail=f"Kích thước file quá lớn. Tối đa: {self.max_size // 1024 // 1024}MB",
+            )
+        if self.content_type is None:
+            self._head += chunk[: SNIFF_SIZE - len(self._head)]
+            if len(self._head) >= SNIFF_SIZE:
+                self._check_type()
+        self._digest.update(chunk)
+
+    def finish(self) -> None:
+        """Kết thúc stream (file ngắn hơn SNIFF_SIZE vẫn được kiểm tra loại)."""
+        if self.size == 0:
+            raise HTTPException(status_code=400, detail="File rỗng")
+        if self.content_type is None:
+            self._check_type()
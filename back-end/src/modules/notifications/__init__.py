@@ -0,0 +1 @@
+"""Module notifications - outbox email và bộ gửi nền."""
@@ -0,0 +1,144 @@
+"""Lớp truy cập dữ liệu (CRUD) cho module notifications."""
+
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session, delete, select, update
+
+from src.core.utils import get_utc_now
+
+from .models import EmailOutbox
+
+# Key trong Session.info: có email mới trong transaction hiện tại (đánh thức bộ gửi khi commit)
+OUTBOX_ENQUEUED = "email_outbox_enqueued"
+
+
+def enqueue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: Optional[str] = None,
+) -> EmailOutbox:
+    """Ghi email vào outbox (không commit: đi cùng transaction của caller)."""
+    email = EmailOutbox(
+        to_email=to_email, subject=subject, html_body=html_body, text_body=text_body
+    )
+    db.add(email)
+    db.info[OUTBOX_ENQUEUED] = True
+    return email
+
+
+def enqueue_emails(
+    db: Session,
+    emails: Iterable[tuple[str, str, str, Optional[str]]],
+    batch_size: int = 1000,
+) -> int:
+    """Ghi hàng loạt (to_email, subject, html_body, text_body) vào outbox bằng
+    executemany theo lô (không commit). Trả về số email đã ghi.
+    """
+    now = get_utc_now()
+    emails = iter(emails)
+    total = 0
+    while True:
+        rows = [
+            {
+                "to_email": to_email,
+                "subject": subject,
+                "html_body": html_body,
+                "text_body": text_body,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for to_email, subject, html_body, text_body in islice(emails, batch_size)
+        ]
+        if not rows:
+            break
+        db.connection().execute(insert(EmailOutbox), rows)
+        total += len(rows)
+    if total:
+        db.info[OUTBOX_ENQUEUED] = True
+    return total
+
+
+def claim_due_emails(db: Session, limit: int, lease_seconds: int) -> list[EmailOutbox]:
+    """Nhận tối đa `limit` email đến hạn gửi và commit.
+
+    Email được "cho thuê" bằng cách đẩy `next_attempt_at` thêm `lease_seconds`:
+    nếu worker chết giữa chừng, email tự đến hạn lại sau lease. Trên PostgreSQL
+    dùng `FOR UPDATE SKIP LOCKED` để nhiều worker không nhận trùng.
+    """
+    now = get_utc_now()
+    stmt = (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    emails = list(db.exec(stmt).all())
+    for email in emails:
+        email.attempts += 1
+        email.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        db.add(email)
+    db.commit()
+    return emails
+
+
+def mark_emails_sent(db: Session, email_ids: list[int]) -> None:
+    """Đánh dấu đã gửi (không commit)."""
+    if not email_ids:
+        return
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(email_ids))
+        .values(status="sent", sent_at=get_utc_now(), last_error=None)
+    )
+    db.exec(stmt)
+
+
+def reschedule_email(
+    db: Session,
+    email_id: int,
+    next_attempt_at: datetime,
+    error: Optional[str] = None,
+    refund_attempt: bool = False,
+) -> None:
+    """Hẹn lại lần gửi kế tiếp (không commit).
+
+    `refund_attempt`: không tính lượt vừa nhận là một lần thử (ví dụ bị hoãn do
+    giới hạn tốc độ theo domain, chưa hề gửi).
+    """
+    values = {"next_attempt_at": next_attempt_at}
+    if error is not None:
+        values["last_error"] = error[:1000]
+    if refund_attempt:
+        values["attempts"] = EmailOutbox.attempts - 1
+    db.exec(update(EmailOutbox).where(EmailOutbox.id == email_id).values(**values))
+
+
+def mark_email_failed(db: Session, email_id: int, error: str) -> None:
+    """Đánh dấu gửi thất bại vĩnh viễn (không commit)."""
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id == email_id)
+        .values(status="failed", last_error=error[:1000])
+    )
+    db.exec(stmt)
+
+
+def delete_sent_emails(db: Session, batch_size: int, older_than_days: int = 7) -> int:
+    """Xóa một lô email đã gửi xong quá `older_than_days` ngày; trả về số dòng đã xóa."""
+    cutoff = get_utc_now() - timedelta(days=older_than_days)
+    sent_ids = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff)
+        .limit(batch_size)
+    )
+    result = db.exec(delete(EmailOutbox).where(EmailOutbox.id.in_(sent_ids)))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,43 @@
+"""Các model CSDL cho module notifications.
+
+Định nghĩa bảng EmailOutbox: email được ghi vào outbox trong cùng transaction
+với dữ liệu nghiệp vụ (token xác minh, token đặt lại mật khẩu, ...) và được bộ
+gửi nền (`outbox.outbox_sender`) gửi đi sau khi commit.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+from src.core.utils import get_utc_now
+
+
+class EmailOutbox(SQLModel, table=True):
+    """Email chờ gửi.
+
+    Attributes:
+        id: Primary key
+        to_email: Địa chỉ người nhận
+        subject: Tiêu đề
+        html_body: Nội dung HTML
+        text_body: Nội dung plain-text thay thế (nullable)
+        status: pending | sent | failed
+        attempts: Số lần đã thử gửi
+        next_attempt_at: Thời điểm sớm nhất được gửi (lần thử kế tiếp / hết lease)
+        last_error: Lỗi của lần thử gần nhất
+        created_at: Thời điểm ghi vào outbox (UTC)
+        sent_at: Thời điểm gửi thành công (UTC)
+    """
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    to_email: str = Field(max_length=255)
+    subject: str = Field(max_length=255)
+    html_body: str
+    text_body: Optional[str] = Field(default=None)
+    status: str = Field(default="pending", max_length=20, index=True)
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=get_utc_now, index=True)
+    last_error: Optional[str] = Field(default=None, max_length=1000)
+    created_at: datetime = Field(default_factory=get_utc_now)
+    sent_at: Optional[datetime] = Field(default=None, index=True)
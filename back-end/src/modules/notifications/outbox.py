@@ -0,0 +1,336 @@
+"""Bộ gửi nền cho outbox email.
+
+`OutboxSender` chạy trong lifespan của ứng dụng: nhận từng lô email đến hạn
+trong bảng outbox, gửi song song qua một pool kết nối SMTP được giữ mở (không
+bắt tay SMTP cho mỗi email), rồi ghi kết quả trong một transaction. Email lỗi
+tạm thời được thử lại với backoff lũy thừa; lỗi vĩnh viễn (5xx từ máy chủ nhận)
+chuyển sang `failed`. Mỗi domain người nhận có giới hạn tốc độ riêng (token
+bucket, tính trên từng worker); email vượt giới hạn được hoãn mà không tính là
+một lần thử.
+
+Request chỉ ghi outbox (xem `crud.enqueue_email`); khi transaction commit, bộ
+gửi được đánh thức ngay thay vì chờ chu kỳ quét.
+"""
+
+import asyncio
+import logging
+import queue
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlmodel import Session
+
+from src.core.config import settings
+from src.core.db import engine
+from src.core.email import build_email_message
+from src.core.utils import get_utc_now
+
+from . import crud
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Lỗi 5xx từ máy chủ nhận cho người nhận/nội dung là vĩnh viễn."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPDataError):
+        return error.smtp_code >= 500
+    return False
+
+
+class SMTPConnection:
+    """Một kết nối SMTP được giữ mở và dùng lại giữa các email."""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> None:
+        self.close()
+        timeout = settings.EMAIL_SMTP_TIMEOUT_SECONDS
+        if settings.MAIL_SSL_TLS:
+            server = smtplib.SMTP_SSL(settings.MAIL_SERVER, settings.MAIL_PORT, timeout=timeout)
+        else:
+            server = smtplib.SMTP(settings.MAIL_SERVER, settings.MAIL_PORT, timeout=timeout)
+            if settings.MAIL_STARTTLS:
+                server.starttls()
+        if settings.MAIL_USERNAME and settings.MAIL_PASSWORD:
+            server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
+        self._server = server
+
+    def _ensure_alive(self) -> None:
+        if self._server is None:
+            self._connect()
+            return
+        # Máy chủ SMTP thường đóng kết nối nhàn rỗi; kiểm tra bằng NOOP trước khi dùng
+        if time.monotonic() - self._last_used > settings.EMAIL_SMTP_IDLE_SECONDS:
+            try:
+                code, _ = self._server.noop()
+                if code != 250:
+                    self._connect()
+            except (smtplib.SMTPException, OSError):
+                self._connect()
+
+    def send(self, email: EmailOutbox) -> None:
+        """Gửi một email; tự kết nối lại một lần nếu kết nối đã bị đóng."""
+        message = build_email_message(
+            email.to_email, email.subject, email.html_body, email.text_body
+        )
+        recipients = [email.to_email]
+        self._ensure_alive()
+        try:
+            self._server.sendmail(settings.MAIL_USERNAME, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._server.sendmail(settings.MAIL_USERNAME, recipients, message)
+        self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+class DomainRateLimiter:
+    """Token bucket theo domain người nhận (số email mỗi phút)."""
+
+    def __init__(self, default_per_minute: int, overrides: dict[str, int]):
+        self.default_per_minute = default_per_minute
+        self.overrides = {domain.lower(): rate for domain, rate in overrides.items()}
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, domain: str) -> float:
+        """Lấy một lượt gửi cho domain; trả về 0 nếu được gửi ngay, ngược lại số giây phải chờ."""
+        rate = self.overrides.get(domain, self.default_per_minute)
+        if rate <= 0:
+            return 0.0
+        per_second = rate / 60
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(domain, (float(rate), now))
+            tokens = min(float(rate), tokens + (now - updated) * per_second)
+            if tokens >= 1:
+                self._buckets[domain] = (tokens - 1, now)
+                return 0.0
+            self._buckets[domain] = (tokens, now)
+            return (1 - tokens) / per_second
+
+
+class OutboxSender:
+    """Gửi email từ outbox bằng pool kết nối SMTP.
+
+    Attributes:
+        connections: Số kết nối SMTP (cũng là số email gửi song song)
+        batch_size: Số email nhận mỗi lượt
+        sent: Tổng số email đã gửi
+        retried: Tổng số lần hẹn gửi lại do lỗi tạm thời
+        failed: Tổng số email thất bại vĩnh viễn
+        deferred: Tổng số lần hoãn do giới hạn tốc độ theo domain
+    """
+
+    def __init__(self, connections: int, batch_size: int):
+        self.connections = connections
+        self.batch_size = batch_size
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.deferred = 0
+        self.rate_limiter = DomainRateLimiter(
+            settings.EMAIL_DOMAIN_RATE_PER_MINUTE, settings.EMAIL_DOMAIN_RATE_LIMITS
+        )
+        self._pool: "queue.Queue[SMTPConnection]" = queue.Queue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    # --- Gửi ---
+
+    def _send_one(self, email: EmailOutbox) -> Optional[Exception]:
+        """Gửi trên một kết nối mượn từ pool; trả về lỗi (nếu có) thay vì ném."""
+        connection = self._pool.get()
+        try:
+            connection.send(email)
+            return None
+        except Exception as e:
+            # Kết nối có thể ở trạng thái lỗi: đóng để lần sau kết nối lại
+            connection.close()
+            return e
+        finally:
+            self._pool.put(connection)
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = settings.EMAIL_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+        return min(delay, settings.EMAIL_RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+
+    def _record_results(
+        self,
+        results: list[tuple[EmailOutbox, Optional[Exception]]],
+        deferred: list[tuple[EmailOutbox, float]],
+    ) -> None:
+        """Ghi kết quả cả lô trong một transaction."""
+        now = get_utc_now()
+        sent_ids = [email.id for email, error in results if error is None]
+        failed = retried = 0
+        with Session(engine) as db:
+            crud.mark_emails_sent(db, sent_ids)
+            for email, error in results:
+                if error is None:
+                    continue
+                message = f"{type(error).__name__}: {error}"
+                if _is_permanent(error) or email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                    crud.mark_email_failed(db, email.id, message)
+                    failed += 1
+                    logger.error(f"✗ Gửi email #{email.id} thất bại: {message}")
+                else:
+                    retry_at = now + timedelta(seconds=self._retry_delay(email.attempts))
+                    crud.reschedule_email(db, email.id, retry_at, error=message)
+                    retried += 1
+                    logger.warning(f"✗ Gửi email #{email.id} lỗi (lần {email.attempts}), thử lại sau: {message}")
+            for email, wait in deferred:
+                crud.reschedule_email(
+                    db, email.id, now + timedelta(seconds=wait), refund_attempt=True
+                )
+            db.commit()
+
+        self.sent += len(sent_ids)
+        self.failed += failed
+        self.retried += retried
+        self.deferred += len(deferred)
+
+    def _claim(self) -> list[EmailOutbox]:
+        with Session(engine, expire_on_commit=False) as db:
+            return crud.claim_due_emails(
+                db, self.batch_size, settings.EMAIL_OUTBOX_LEASE_SECONDS
+            )
+
+    async def drain_once(self) -> int:
+        """Xử lý một lô email đến hạn; trả về số email đã nhận."""
+        emails = await run_in_threadpool(self._claim)
+        if not emails:
+            return 0
+
+        allowed: list[EmailOutbox] = []
+        deferred: list[tuple[EmailOutbox, float]] = []
+        for email in emails:
+            domain = email.to_email.rsplit("@", 1)[-1].lower()
+            wait = self.rate_limiter.acquire(domain)
+            if wait > 0:
+                deferred.append((email, wait))
+            else:
+                allowed.append(email)
+
+        loop = asyncio.get_running_loop()
+        errors = await asyncio.gather(
+            *(loop.run_in_executor(self._get_executor(), self._send_one, e) for e in allowed)
+        )
+        await run_in_threadpool(self._record_results, list(zip(allowed, errors)), deferred)
+        return len(emails)
+
+    # --- Vòng đời ---
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.connections, thread_name_prefix="smtp"
+            )
+            for _ in range(self.connections):
+                self._pool.put(SMTPConnection())
+        return self._executor
+
+    def notify(self) -> None:
+        """Đánh thức bộ gửi (an toàn khi gọi từ thread khác)."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"✗ Lỗi bộ gửi email outbox: {e}")
+                claimed = 0
+            if self._stopping:
+                break
+            if claimed >= self.batch_size:
+                continue  # còn email đến hạn, xử lý lô tiếp ngay
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Khởi động bộ gửi (gọi trong event loop của ứng dụng)."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="email-outbox")
+        logger.info(f"✓ Đã khởi động bộ gửi email ({self.connections} kết nối SMTP)")
+
+    async def stop(self) -> None:
+        """Dừng bộ gửi sau khi lô đang gửi ghi xong kết quả, rồi đóng các kết nối SMTP.
+
+        Không hủy giữa lô: email đã gửi nhưng chưa được ghi kết quả sẽ bị gửi lại
+        khi hết lease.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._loop = None
+        # shutdown/QUIT là thao tác chặn (chờ SMTP): chạy ngoài event loop
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await run_in_threadpool(executor.shutdown, wait=True)
+        connections = []
+        while not self._pool.empty():
+            connections.append(self._pool.get_nowait())
+        for connection in connections:
+            await run_in_threadpool(connection.close)
+
+    def stats(self) -> dict:
+        """Thống kê hiện tại (dùng cho health/metrics)."""
+        return {
+            "connections": self.connections,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "deferred": self.deferred,
+        }
+
+
+outbox_sender = OutboxSender(
+    connections=settings.EMAIL_SENDER_CONNECTIONS,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_sender_after_commit(session: Session) -> None:
+    if session.info.pop(crud.OUTBOX_ENQUEUED, False):
+        outbox_sender.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_enqueued_flag(session: Session) -> None:
+    session.info.pop(crud.OUTBOX_ENQUEUED, None)
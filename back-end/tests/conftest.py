@@ -0,0 +1,109 @@
+"""Fixture dùng chung cho test.
+
+Test chạy trên SQLite (file tạm) và local storage, không cần Postgres hay
+Supabase. Biến môi trường phải được đặt trước khi import `src` vì `settings`
+và engine được tạo lúc import.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+_TMP_DIR = tempfile.mkdtemp(prefix="spa-tests-")
+
+os.environ["ENV_FILE"] = os.path.join(_TMP_DIR, "missing.env")
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}",
+        "SECRET_KEY": "test-secret-key",
+        "ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "MAIL_USERNAME": "spa@example.com",
+        "MAIL_PASSWORD": "password",
+        "MAIL_FROM": "spa@example.com",
+        "MAIL_PORT": "25",
+        "MAIL_SERVER": "localhost",
+        "MAIL_STARTTLS": "0",
+        "MAIL_SSL_TLS": "0",
+        "GOOGLE_CLIENT_ID": "test",
+        "GOOGLE_CLIENT_SECRET": "test",
+        "SUPABASE_URL": "http://supabase.invalid",
+        "SUPABASE_KEY": "test",
+        "SUPABASE_BUCKET_NAME": "test",
+        "BACKEND_URL": "http://testserver",
+        "STORAGE_BACKEND": "local",
+        "MEDIA_LOCAL_DIR": os.path.join(_TMP_DIR, "media"),
+        "MEDIA_DERIVATIVES_ENABLED": "0",
+        "EMAIL_OUTBOX_ENABLED": "0",
+        "CLEANUP_JOBS_ENABLED": "0",
+        "BCRYPT_ROUNDS": "4",
+    }
+)
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import src.main  # noqa: E402,F401  (đăng ký mọi model vào metadata)
+from src.core.db import engine  # noqa: E402
+from src.core.dependencies import get_current_user, get_read_principal  # noqa: E402
+from src.modules.auth.principal import Principal, principal_cache  # noqa: E402
+from src.modules.catalog.crud import catalog_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _schema():
+    """Mỗi test một schema sạch."""
+    SQLModel.metadata.create_all(engine)
+    yield
+    SQLModel.metadata.drop_all(engine)
+
+
+@pytest.fixture(autouse=True)
+def _caches():
+    """Cache in-process không được mang dữ liệu từ test trước sang."""
+    catalog_cache.invalidate_all()
+    principal_cache.invalidate_all()
+
+
+@pytest.fixture
+def count_queries():
+    """Đếm câu SQL gửi tới DB: `with count_queries() as statements: ...`."""
+
+    @contextmanager
+    def counter():
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counter
+
+
+@pytest.fixture
+def db():
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def principal() -> Principal:
+    """Người dùng đã đăng nhập (admin) cho các endpoint cần xác thực."""
+    return Principal(id=1, roles=frozenset({"admin"}))
+
+
+@pytest.fixture
+def client(principal):
+    app = src.main.app
+    app.dependency_overrides[get_current_user] = lambda: principal
+    app.dependency_overrides[get_read_principal] = lambda: principal
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
@@ -0,0 +1,49 @@
+"""ETag và read-through cache của catalog."""
+
+from src.core.config import settings
+from src.modules.catalog import crud, schemas, service
+
+PRODUCT = {
+    "name": "Serum",
+    "sku": "SR-01",
+    "product_type": "retail",
+    "price": 100000,
+    "stock_unit": "chai",
+}
+
+
+def test_etag_follows_response_body(client):
+    product_id = client.post("/catalog/products/", json=PRODUCT).json()["id"]
+
+    first = client.get(f"/catalog/products/{product_id}")
+    etag = first.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+    assert "last-modified" not in first.headers
+
+    cached = client.get(f"/catalog/products/{product_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    client.put(f"/catalog/products/{product_id}", json={"price": 120000})
+    changed = client.get(f"/catalog/products/{product_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_missing_product_is_never_not_modified(client):
+    response = client.get("/catalog/products/999", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_replica_reads_right_after_write_are_not_cached(db, monkeypatch):
+    product = crud.create_product(db, product_in=schemas.ProductCreate(**PRODUCT))
+    key = ("product", product.id)
+
+    db.info["replica"] = True
+    assert service.get_product(db, product.id) is not None
+    assert crud.catalog_cache.get(key) is None
+
+    monkeypatch.setattr(settings, "CATALOG_REPLICA_LAG_SECONDS", 0)
+    service.get_product(db, product.id)
+    assert crud.catalog_cache.get(key) is not None
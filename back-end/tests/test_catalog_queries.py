@@ -0,0 +1,107 @@
+"""Số câu truy vấn của các GET endpoint catalog không tăng theo số bản ghi (N+1)."""
+
+import pytest
+
+from src.modules.catalog.crud import catalog_cache
+
+
+def _seed(client, count: int, tag: str = "a") -> dict[str, int]:
+    """Tạo `count` bản ghi mỗi loại, có đủ quan hệ lồng nhau trong response.
+
+    Mỗi gói chứa toàn bộ dịch vụ vừa tạo. Trả về ID bản ghi tạo sau cùng theo loại.
+    """
+    product_category = client.post("/catalog/product-categories/", json={"name": f"Chăm sóc da {tag}"}).json()
+    service_category = client.post("/catalog/service-categories/", json={"name": f"Spa {tag}"}).json()
+    package_category = client.post("/catalog/package-categories/", json={"name": f"Liệu trình {tag}"}).json()
+
+    service_ids = []
+    for i in range(count):
+        product = client.post(
+            "/catalog/products/",
+            json={
+                "name": f"Serum {tag}{i}",
+                "sku": f"SR-{tag}{i}",
+                "product_type": "PROFESSIONAL",
+                "price": 100000,
+                "stock_unit": "chai",
+                "category_id": product_category["id"],
+            },
+        ).json()
+        service = client.post(
+            "/catalog/services/",
+            json={
+                "name": f"Chăm sóc da {tag}{i}",
+                "price": 300000,
+                "duration_minutes": 60,
+                "category_id": service_category["id"],
+            },
+        ).json()
+        client.post(
+            f"/catalog/services/{service['id']}/consumptions",
+            json={"product_id": product["id"], "consumed_quantity": 1, "unit": "ml"},
+        )
+        service_ids.append(service["id"])
+
+    for i in range(count):
+        package = client.post(
+            "/catalog/service-packages/",
+            json={
+                "name": f"Gói {i}",
+                "total_price": 1000000,
+                "validity_period_days": 90,
+                "category_id": package_category["id"],
+                "service_ids": service_ids,
+            },
+        ).json()
+    return {"products": product["id"], "services": service["id"], "service-packages": package["id"]}
+
+
+def _queries_for(client, count_queries, url: str) -> int:
+    catalog_cache.invalidate_all()
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize("resource", ["products", "services", "service-packages"])
+def test_list_query_count_does_not_grow_with_rows(client, count_queries, resource):
+    _seed(client, 1)
+    baseline = _queries_for(client, count_queries, f"/catalog/{resource}/")
+
+    _seed(client, 4, tag="b")
+    assert _queries_for(client, count_queries, f"/catalog/{resource}/") == baseline
+
+
+@pytest.mark.parametrize("resource", ["products", "services", "service-packages"])
+def test_detail_query_count_does_not_grow_with_nested_rows(client, count_queries, resource):
+    small = _seed(client, 1)
+    large = _seed(client, 4, tag="b")
+
+    large_count = _queries_for(client, count_queries, f"/catalog/{resource}/{large[resource]}")
+    assert large_count == _queries_for(client, count_queries, f"/catalog/{resource}/{small[resource]}")
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        # Sản phẩm + danh mục
+        ("/catalog/products/", 2),
+        # Dịch vụ + danh mục + vật tư + sản phẩm + danh mục sản phẩm
+        ("/catalog/services/", 5),
+        # Gói + danh mục + dịch vụ + (5 câu của dịch vụ trừ câu gốc)
+        ("/catalog/service-packages/", 7),
+    ],
+)
+def test_list_query_count(client, count_queries, url, expected):
+    _seed(client, 3)
+    assert _queries_for(client, count_queries, url) == expected
+
+
+def test_cached_list_skips_database(client, count_queries):
+    _seed(client, 2)
+    _queries_for(client, count_queries, "/catalog/service-packages/")
+
+    with count_queries() as statements:
+        assert client.get("/catalog/service-packages/").status_code == 200
+    assert statements == []
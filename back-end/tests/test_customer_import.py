@@ -0,0 +1,56 @@
+import io
+
+import pytest
+from sqlmodel import select
+
+from src.core.utils import normalize_phone_number
+from src.modules.customers.importer import import_customers
+from src.modules.customers.models import Customer
+from src.modules.customers.phone_index import phone_index
+
+
+@pytest.fixture
+def stale_phone_index(db):
+    """Filter đã dựng nhưng thiếu SĐT do "worker khác" ghi sau đó."""
+    phone_index.rebuild(db)
+    db.add(Customer(full_name="Khách cũ", phone_number=normalize_phone_number("0912345678")))
+    db.commit()
+    yield
+    phone_index._filter = None
+
+
+def _csv(*lines: str) -> io.BytesIO:
+    return io.BytesIO(("\n".join(["full_name,phone_number", *lines]) + "\n").encode("utf-8"))
+
+
+def test_import_skips_phone_missing_from_worker_filter(db, stale_phone_index):
+    report = import_customers(db, _csv("Nguyễn Văn A,0912345678", "Trần Thị B,0987654321"), "a.csv")
+
+    assert report.imported == 1
+    assert report.duplicates == 1
+    assert [error.row for error in report.errors] == [2]
+    phones = set(db.exec(select(Customer.phone_number)).all())
+    assert phones == {normalize_phone_number("0912345678"), normalize_phone_number("0987654321")}
+
+
+def test_import_reports_duplicates_within_file(db):
+    report = import_customers(db, _csv("A,0911111111", "B,0911111111", ",0922222222"), "a.csv")
+
+    assert (report.imported, report.duplicates, report.failed) == (1, 1, 1)
+    assert [error.row for error in report.errors] == [3, 4]
+
+
+def test_import_reports_batch_that_keeps_failing(db, stale_phone_index, monkeypatch):
+    # Mô phỏng trùng không phát hiện được trước khi ghi (ghi đồng thời liên tục)
+    monkeypatch.setattr(
+        "src.modules.customers.crud.get_existing_phone_numbers", lambda *args, **kwargs: set()
+    )
+
+    report = import_customers(
+        db, _csv("Trần Thị B,0987654321", "Nguyễn Văn A,0912345678"), "a.csv", batch_size=1
+    )
+
+    assert report.imported == 1
+    assert report.failed == 1
+    assert [error.row for error in report.errors] == [3]
+    assert db.exec(select(Customer).where(Customer.full_name == "Trần Thị B")).first() is not None
@@ -0,0 +1,172 @@
+"""`OutboxSender.drain_once` gửi tới máy chủ SMTP thật (aiosmtpd) chạy cục bộ."""
+
+import asyncio
+import socket
+import threading
+from datetime import timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from src.core.config import settings
+from src.core.utils import get_utc_now
+from src.modules.notifications import crud
+from src.modules.notifications.models import EmailOutbox
+from src.modules.notifications.outbox import DomainRateLimiter, OutboxSender
+
+
+class RecordingHandler:
+    """Handler aiosmtpd: ghi nhận email, từ chối hoặc ngắt kết nối theo cấu hình."""
+
+    def __init__(self):
+        self.messages: list[tuple[list[str], bytes]] = []
+        self.rejected_recipients: set[str] = set()
+        self.drop_connection = False
+        self.data_delay = 0.0
+        self.data_started = threading.Event()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected_recipients:
+            return "550 5.1.1 Mailbox không tồn tại"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.data_started.set()
+        await asyncio.sleep(self.data_delay)
+        if self.drop_connection:
+            server.transport.close()
+            return "421 Đóng kết nối"
+        self.messages.append((list(envelope.rcpt_tos), envelope.content))
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    monkeypatch.setattr(settings, "MAIL_SERVER", "127.0.0.1")
+    monkeypatch.setattr(settings, "MAIL_PORT", controller.port)
+    monkeypatch.setattr(settings, "MAIL_STARTTLS", False)
+    monkeypatch.setattr(settings, "MAIL_SSL_TLS", False)
+    monkeypatch.setattr(settings, "MAIL_PASSWORD", "")  # máy chủ test không có AUTH
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def sender() -> OutboxSender:
+    outbox_sender = OutboxSender(connections=2, batch_size=10)
+    outbox_sender.rate_limiter = DomainRateLimiter(0, {})
+    return outbox_sender
+
+
+def _drain(sender: OutboxSender) -> int:
+    async def run() -> int:
+        try:
+            return await sender.drain_once()
+        finally:
+            await sender.stop()
+
+    return asyncio.run(run())
+
+
+def _enqueue(db, *recipients: str) -> list[int]:
+    emails = [crud.enqueue_email(db, to, "Xin chào", "<p>Xin chào</p>", "Xin chào") for to in recipients]
+    db.commit()
+    return [email.id for email in emails]
+
+
+def _reload(db, email_id: int) -> EmailOutbox:
+    db.expire_all()
+    return db.get(EmailOutbox, email_id)
+
+
+def test_sends_due_emails(db, smtp, sender):
+    first, second = _enqueue(db, "a@example.com", "b@example.org")
+
+    assert _drain(sender) == 2
+
+    assert sorted(rcpt for rcpts, _ in smtp.messages for rcpt in rcpts) == ["a@example.com", "b@example.org"]
+    for email_id in (first, second):
+        email = _reload(db, email_id)
+        assert email.status == "sent"
+        assert email.sent_at is not None
+        assert email.attempts == 1
+    assert sender.sent == 2
+
+
+def test_permanent_rejection_marks_failed(db, smtp, sender):
+    smtp.rejected_recipients.add("missing@example.com")
+    (email_id,) = _enqueue(db, "missing@example.com")
+
+    _drain(sender)
+
+    email = _reload(db, email_id)
+    assert email.status == "failed"
+    assert "550" in email.last_error
+    assert smtp.messages == []
+    assert sender.failed == 1
+
+
+def test_disconnect_is_retried_with_backoff(db, smtp, sender):
+    smtp.drop_connection = True
+    (email_id,) = _enqueue(db, "a@example.com")
+    before = get_utc_now()
+
+    _drain(sender)
+
+    email = _reload(db, email_id)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.last_error.startswith("SMTPServerDisconnected")
+    min_delay = timedelta(seconds=settings.EMAIL_RETRY_BASE_SECONDS * 0.8)
+    assert email.next_attempt_at.replace(tzinfo=None) >= (before + min_delay).replace(tzinfo=None)
+    assert sender.retried == 1
+
+
+def test_domain_rate_limit_defers_without_consuming_attempt(db, smtp, sender):
+    sender.rate_limiter = DomainRateLimiter(0, {"example.com": 1})
+    first, second = _enqueue(db, "a@example.com", "b@example.com")
+
+    assert _drain(sender) == 2
+
+    assert len(smtp.messages) == 1
+    statuses = {email_id: _reload(db, email_id) for email_id in (first, second)}
+    sent = [email for email in statuses.values() if email.status == "sent"]
+    deferred = [email for email in statuses.values() if email.status == "pending"]
+    assert len(sent) == 1 and len(deferred) == 1
+    assert deferred[0].attempts == 0
+    assert deferred[0].next_attempt_at.replace(tzinfo=None) > get_utc_now().replace(tzinfo=None)
+    assert sender.deferred == 1
+
+
+def test_stop_waits_for_in_flight_batch(db, smtp, sender):
+    smtp.data_delay = 0.5
+    (email_id,) = _enqueue(db, "a@example.com")
+
+    async def run() -> None:
+        sender.start()
+        while not smtp.data_started.is_set():
+            await asyncio.sleep(0.01)
+        # Event loop vẫn phục vụ được việc khác trong lúc chờ lô đang gửi
+        stop = asyncio.create_task(sender.stop())
+        ticks = 0
+        while not stop.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        await stop
+        assert ticks > 10
+
+    asyncio.run(run())
+
+    email = _reload(db, email_id)
+    assert email.status == "sent"
+    assert len(smtp.messages) == 1
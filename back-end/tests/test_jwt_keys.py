@@ -0,0 +1,24 @@
+"""Key ring JWT bất đối xứng: bắt buộc có thư mục khóa dùng chung."""
+
+import pytest
+
+from src.core.jwt_keys import KeyRing
+
+
+def test_reload_without_keys_dir_fails():
+    key_ring = KeyRing(directory=None, algorithm="RS256", activation_delay=0, reload_interval=60)
+
+    with pytest.raises(RuntimeError, match="JWT_KEYS_DIR"):
+        key_ring.reload()
+
+
+def test_workers_share_keys_from_directory(tmp_path):
+    def make_ring() -> KeyRing:
+        return KeyRing(directory=str(tmp_path), algorithm="EdDSA", activation_delay=0, reload_interval=60)
+
+    first = make_ring()
+    first.rotate(rotation_days=30, retention_seconds=3600)
+    second = make_ring()
+
+    token = first.sign({"sub": "1"})
+    assert second.decode(token)["sub"] == "1"
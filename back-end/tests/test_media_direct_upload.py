@@ -0,0 +1,90 @@
+"""Tải ảnh trực tiếp lên local storage: upload-url → PUT → finalize."""
+
+import io
+
+import pytest
+from PIL import Image
+
+from src.core.config import settings
+from src.core.storage import get_local_file_path
+from src.modules.customers.models import Customer
+from src.modules.media.models import MEDIA_STATUS_ACTIVE, MediaFile
+
+
+def _png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def customer_id(db) -> int:
+    customer = Customer(full_name="Nguyễn Văn A", phone_number="0900000001")
+    db.add(customer)
+    db.commit()
+    return customer.id
+
+
+def _request_upload(client, customer_id: int, size: int) -> dict:
+    response = client.post(
+        f"/media/customers/{customer_id}/avatar/upload-url",
+        json={"filename": "avatar.png", "content_type": "image/png", "file_size": size},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_upload_url_put_finalize(client, db, customer_id):
+    content = _png_bytes()
+    upload = _request_upload(client, customer_id, len(content))
+
+    put = client.request(upload["method"], upload["upload_url"], content=content, headers=upload["headers"])
+    assert put.status_code == 200
+
+    response = client.post(f"/media/{upload['media_id']}/finalize")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["file_path"].startswith("blobs/")
+    assert body["file_type"] == "image/png"
+    assert get_local_file_path(body["file_path"]).read_bytes() == content
+    assert not get_local_file_path(upload["file_path"]).exists()
+    assert db.get(MediaFile, upload["media_id"]).status == MEDIA_STATUS_ACTIVE
+
+    listed = client.get(f"/media/customers/{customer_id}").json()["media_list"]
+    assert [media["id"] for media in listed] == [upload["media_id"]]
+
+
+def test_put_rejects_non_image_bytes(client, customer_id):
+    upload = _request_upload(client, customer_id, 16)
+
+    put = client.put(upload["upload_url"], content=b"definitely not an image")
+
+    assert put.status_code == 400
+    assert not get_local_file_path(upload["file_path"]).exists()
+
+
+@pytest.mark.parametrize(
+    "content, max_file_size",
+    [
+        (b"definitely not an image", None),
+        (_png_bytes() + b"\0" * 2048, 1024),
+    ],
+    ids=["non-image", "oversized"],
+)
+def test_finalize_rejects_invalid_file_and_cleans_up(
+    client, db, customer_id, monkeypatch, content, max_file_size
+):
+    upload = _request_upload(client, customer_id, 16)
+    # Storage thật không kiểm tra nội dung: ghi thẳng file vào storage
+    target = get_local_file_path(upload["file_path"])
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+    if max_file_size:
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", max_file_size)
+
+    response = client.post(f"/media/{upload['media_id']}/finalize")
+
+    assert response.status_code in (400, 413)
+    assert not target.exists()
+    db.expire_all()
+    assert db.get(MediaFile, upload["media_id"]) is None
@@ -0,0 +1,42 @@
+"""Cursor của phân trang keyset: cursor sai định dạng luôn trả 400."""
+
+import base64
+import json
+
+import pytest
+
+from src.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+MALFORMED_CURSORS = {
+    "non-dict-json": _b64(b"[1]"),
+    "json-string": _b64(b'"abc"'),
+    "bad-base64": "!!!",
+    "not-json": _b64(b"not json"),
+    "missing-id": _b64(json.dumps({"s": "id", "o": "asc", "v": 1}).encode()),
+    "non-int-id": _b64(json.dumps({"s": "id", "o": "asc", "v": 1, "id": "x"}).encode()),
+    "missing-sort": _b64(json.dumps({"o": "asc", "v": 1, "id": 1}).encode()),
+    "bad-datetime": _b64(json.dumps({"s": "created_at", "o": "asc", "v": "x", "t": "dt", "id": 1}).encode()),
+}
+
+
+def test_round_trip():
+    cursor = encode_cursor("id", "desc", 42, 42)
+    assert decode_cursor(cursor) == {"s": "id", "o": "desc", "id": 42, "v": 42}
+
+
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS.values(), ids=MALFORMED_CURSORS.keys())
+def test_decode_rejects_malformed_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("url", ["/catalog/products/", "/catalog/services/", "/customers"])
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS.values(), ids=MALFORMED_CURSORS.keys())
+def test_endpoints_answer_400_for_malformed_cursor(client, url, cursor):
+    response = client.get(url, params={"cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,37 @@
+"""Vô hiệu hóa principal cache khi vai trò thay đổi."""
+
+from src.modules.auth import crud, schemas
+from src.modules.auth.models import Role, User
+from src.modules.auth.principal import load_principal, principal_cache
+
+
+def _user_with_role(db, role_name: str) -> tuple[User, Role]:
+    role = Role(name=role_name)
+    user = User(email="staff@example.com", password_hash="x", is_active=True, roles=[role])
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.refresh(role)
+    return user, role
+
+
+def test_rename_role_refreshes_principal_without_loading_users(db, count_queries):
+    user, role = _user_with_role(db, "staff")
+    assert load_principal(db, user.id).roles == {"staff"}
+    db.expire_all()
+
+    with count_queries() as statements:
+        crud.update_role(db, role, schemas.RoleUpdate(name="technician"))
+
+    assert not any("user_role" in s.lower() for s in statements)
+    assert principal_cache.get((user.id,)) is None
+    assert load_principal(db, user.id).roles == {"technician"}
+
+
+def test_delete_role_refreshes_principal(db):
+    user, role = _user_with_role(db, "staff")
+    assert load_principal(db, user.id).roles == {"staff"}
+
+    crud.delete_role(db, role.id)
+
+    assert load_principal(db, user.id).roles == frozenset()
@@ -0,0 +1,85 @@
+"""Xoay vòng refresh token: family, phát hiện dùng lại và chỉ lưu digest."""
+
+from datetime import timedelta
+
+import pytest
+from sqlmodel import select
+
+from src.core.utils import get_utc_now
+from src.modules.auth import auth_service, crud
+from src.modules.auth.models import RefreshToken, User
+
+
+@pytest.fixture
+def user(db) -> User:
+    user = User(email="staff@example.com", password_hash="x", is_active=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _login(db, user: User) -> str:
+    _, refresh_token = auth_service._issue_tokens(db, user)
+    return refresh_token
+
+
+def _family(db, family_id: str) -> list[RefreshToken]:
+    db.expire_all()
+    return db.exec(select(RefreshToken).where(RefreshToken.family_id == family_id)).all()
+
+
+def test_only_digest_is_stored(db, user):
+    token = _login(db, user)
+
+    rt = crud.get_refresh_token(db, token)
+    assert rt.token_hash == crud.hash_refresh_token(token)
+    assert len(rt.token_hash) == 32
+    assert token.encode() not in rt.token_hash
+
+
+def test_rotation_issues_new_token_in_same_family(db, user):
+    old_token = _login(db, user)
+    family_id = crud.get_refresh_token(db, old_token).family_id
+
+    access_token, new_token = auth_service.rotate_refresh_token(db, old_token)
+
+    assert access_token and new_token != old_token
+    assert crud.is_refresh_token_valid(db, old_token) is None
+    new_rt = crud.is_refresh_token_valid(db, new_token)
+    assert new_rt is not None and new_rt.family_id == family_id
+
+
+def test_reusing_rotated_token_revokes_family(db, user):
+    first = _login(db, user)
+    other_session = _login(db, user)
+    family_id = crud.get_refresh_token(db, first).family_id
+    _, second = auth_service.rotate_refresh_token(db, first)
+    _, third = auth_service.rotate_refresh_token(db, second)
+
+    assert auth_service.rotate_refresh_token(db, first) is None
+
+    family = _family(db, family_id)
+    assert len(family) == 3
+    assert all(rt.is_revoked for rt in family)
+    assert auth_service.rotate_refresh_token(db, third) is None
+    # Phiên đăng nhập khác (family khác) không bị ảnh hưởng
+    assert crud.is_refresh_token_valid(db, other_session) is not None
+
+
+def test_expired_token_is_rejected(db, user):
+    token = _login(db, user)
+    rt = crud.get_refresh_token(db, token)
+    rt.expires_at = get_utc_now() - timedelta(seconds=1)
+    db.add(rt)
+    db.commit()
+
+    assert auth_service.rotate_refresh_token(db, token) is None
+    assert crud.is_refresh_token_valid(db, token) is None
+    assert len(_family(db, rt.family_id)) == 1
+
+
+def test_unknown_token_is_rejected(db, user):
+    _login(db, user)
+
+    assert auth_service.rotate_refresh_token(db, "not-a-token") is None
@@ -0,0 +1,12 @@
+"""Hash mật khẩu: điều kiện hash lại khi đăng nhập."""
+
+from src.core.security import hash_password, needs_rehash
+
+
+def test_needs_rehash_only_upgrades_bcrypt_cost():
+    hashed = hash_password("secret", rounds=5)
+
+    assert needs_rehash(hashed, "bcrypt", 6)
+    assert not needs_rehash(hashed, "bcrypt", 5)
+    assert not needs_rehash(hashed, "bcrypt", 4)
+    assert needs_rehash("not-a-bcrypt-hash", "bcrypt", 4)
@@ -0,0 +1,28 @@
+"""Giao diện `StorageBackend`/`StorageUpload` là lớp trừu tượng."""
+
+import pytest
+
+from src.core.storage import LocalStorageBackend, StorageBackend, StorageUpload, SupabaseStorageBackend
+
+
+@pytest.mark.parametrize("backend_class", [LocalStorageBackend, SupabaseStorageBackend])
+def test_backends_implement_interface(backend_class):
+    assert isinstance(backend_class(), StorageBackend)
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class PartialBackend(StorageBackend):
+        async def delete(self, file_path: str) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="open_upload"):
+        PartialBackend()
+
+
+def test_incomplete_upload_fails_at_instantiation():
+    class PartialUpload(StorageUpload):
+        async def write(self, chunk: bytes) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="complete"):
+        PartialUpload()